@@ -73,4 +73,51 @@ def match(embedding: np.ndarray, known: List[Tuple[np.ndarray, str]], thresholds
         final_label = "Unknown"
 
     confidence = float(max(0.0, 1.0 - min(best_dist, 1.0)))
-    return {"label": final_label, "distance": best_dist, "confidence": confidence}
\ No newline at end of file
+    return {"label": final_label, "distance": best_dist, "confidence": confidence}
+
+def match_batch(
+    embeddings: np.ndarray,
+    known: List[Tuple[np.ndarray, str]],
+    thresholds: Dict[str, float],
+) -> List[Dict[str, Any]]:
+    """Vectorized `match` for many embeddings at once.
+
+    embeddings: (N, D) array. Computes all cosine distances against the known set in
+    one matrix product and applies the same thresholds/labels as `match`.
+    Returns a list of N dicts: {label, distance, confidence}
+    """
+    emb = np.asarray(embeddings, dtype=np.float32)
+    if emb.ndim == 1:
+        emb = emb.reshape(1, -1)
+    n = emb.shape[0]
+    if n == 0:
+        return []
+    if not known:
+        return [{"label": "Unknown", "distance": 1.0, "confidence": 0.0} for _ in range(n)]
+
+    gallery = np.stack([vec.astype(np.float32).reshape(-1) for vec, _ in known])
+    gallery_labels = [label for _, label in known]
+    g_norm = np.linalg.norm(gallery, axis=1)
+    e_norm = np.linalg.norm(emb, axis=1)
+    sims = emb @ gallery.T
+    denom = np.outer(e_norm, g_norm)
+    # Zero-norm vectors get distance 1.0, same as cosine_distance
+    dists = np.where(denom > 0, 1.0 - sims / np.where(denom > 0, denom, 1.0), 1.0)
+    best_idx = np.argmin(dists, axis=1)
+    best_dist = dists[np.arange(n), best_idx]
+
+    same_t = thresholds.get("same", 0.6)
+    maybe_t = thresholds.get("maybe", 0.8)
+    out: List[Dict[str, Any]] = []
+    for i in range(n):
+        d = float(min(best_dist[i], 1.0))
+        label = gallery_labels[int(best_idx[i])]
+        if d < same_t:
+            final_label = label
+        elif d < maybe_t:
+            final_label = f"Maybe:{label}"
+        else:
+            final_label = "Unknown"
+        confidence = float(max(0.0, 1.0 - d))
+        out.append({"label": final_label, "distance": d, "confidence": confidence})
+    return out
@@ -2,7 +2,6 @@ import argparse
 import os
 import sys
 import time
-import json
 from typing import Dict, Any, List, Tuple
 
 import cv2
@@ -24,7 +23,8 @@ from pipeline.utils import (
     HAS_TORCH,
 )
 from pipeline.video import download_video, extract_frames
-from pipeline.render import make_video_from_images
+from pipeline.render import StreamingVideoWriter
+from pipeline.result_stream import JsonlRecordWriter, iter_records, write_json_array
 
 from face_pipeline.detection import load_detector as load_face_detector, detect_faces
 from pipeline.detection import _resolve_model_path, OBJECT_MODEL_CHOICES
@@ -95,10 +95,12 @@ def run_parallel_pipeline(
     yolo_model: str = "yolov8n",
     fps: int = 1,
     video_id: str = "",
+    save_frames: bool = True,
 ) -> Dict[str, Any]:
     os.makedirs(output_base, exist_ok=True)
     combined_frames_dir = os.path.join(output_base, "combined_frames")
-    os.makedirs(combined_frames_dir, exist_ok=True)
+    if save_frames:
+        os.makedirs(combined_frames_dir, exist_ok=True)
 
     # Init models (YOLO path: prefer local .pt, else Ultralytics downloads)
     yolo_path = _resolve_model_path(yolo_model, os.getcwd())
@@ -109,22 +111,30 @@ def run_parallel_pipeline(
     if not frames:
         raise RuntimeError(f"No frames found in {frames_dir}")
 
-    combined_json = {
+    combined_header = {
         "video_id": video_id,
         "yolo_conf": yolo_conf,
         "yolo_model": yolo_model,
         "face_conf": face_conf,
         "face_model": face_model,
-        "frames": [],
     }
-    metrics = {"per_frame": [], "summary": {"avg_yolo_ms": 0.0, "avg_face_ms": 0.0, "avg_total_ms": 0.0}}
+    # Frame records are appended to a JSONL stream as they are produced (memory stays
+    # flat on long videos); the JSON files are written from the stream at the end
+    stream_path = os.path.join(output_base, "combined_results.jsonl")
+    stream = JsonlRecordWriter(stream_path)
+    sums = {"yolo_ms": 0.0, "face_ms": 0.0, "total_ms": 0.0}
+    timed_frames = 0
+
+    # Combined video is encoded while frames are processed
+    out_video_path = os.path.join(output_base, "combined_detections_video.mp4")
+    video_writer = StreamingVideoWriter(out_video_path, fps=fps)
 
     # Use a thread pool to process frames concurrently per detector
-    with ThreadPoolExecutor(max_workers=4) as executor:
+    with stream, video_writer, ThreadPoolExecutor(max_workers=4) as executor:
         for frame_path in frames:
             img = cv2.imread(frame_path)
             if img is None:
-                combined_json["frames"].append({
+                stream.write({
                     "frame": os.path.basename(frame_path),
                     "error": "failed_to_load_frame"
                 })
@@ -156,43 +166,51 @@ def run_parallel_pipeline(
 
             # Render overlay
             overlay = _draw_overlay(img, faces, yolo_objects)
-            out_img_path = os.path.join(combined_frames_dir, os.path.basename(frame_path))
-            cv2.imwrite(out_img_path, overlay)
+            video_writer.write(overlay)
+            if save_frames:
+                out_img_path = os.path.join(combined_frames_dir, os.path.basename(frame_path))
+                cv2.imwrite(out_img_path, overlay)
 
             # Record JSON
-            combined_json["frames"].append({
+            stream.write({
                 "frame": os.path.basename(frame_path),
                 "faces": [{"bbox": f["bbox"], "confidence": f["confidence"]} for f in faces],
                 "objects": yolo_objects,
                 "timings_ms": {"yolo": yolo_ms, "face": face_ms, "total": total_ms},
             })
-            metrics["per_frame"].append({"frame": os.path.basename(frame_path), "yolo_ms": yolo_ms, "face_ms": face_ms, "total_ms": total_ms})
-
-    # Compute summary metrics
-    if metrics["per_frame"]:
-        ay = sum(m["yolo_ms"] for m in metrics["per_frame"]) / len(metrics["per_frame"])
-        af = sum(m["face_ms"] for m in metrics["per_frame"]) / len(metrics["per_frame"])
-        at = sum(m["total_ms"] for m in metrics["per_frame"]) / len(metrics["per_frame"])
-        metrics["summary"].update({"avg_yolo_ms": ay, "avg_face_ms": af, "avg_total_ms": at})
-
-    # Write JSON outputs
+            sums["yolo_ms"] += yolo_ms
+            sums["face_ms"] += face_ms
+            sums["total_ms"] += total_ms
+            timed_frames += 1
+
+    # Compute summary metrics from running sums
+    summary = {"avg_yolo_ms": 0.0, "avg_face_ms": 0.0, "avg_total_ms": 0.0}
+    if timed_frames:
+        summary.update({
+            "avg_yolo_ms": sums["yolo_ms"] / timed_frames,
+            "avg_face_ms": sums["face_ms"] / timed_frames,
+            "avg_total_ms": sums["total_ms"] / timed_frames,
+        })
+
+    # Write JSON outputs from the stream, one frame at a time
     combined_json_path = os.path.join(output_base, "combined_results.json")
-    with open(combined_json_path, "w", encoding="utf-8") as f:
-        json.dump(combined_json, f, indent=2)
+    write_json_array(combined_json_path, combined_header, "frames", iter_records(stream_path))
 
-    metrics_path = os.path.join(output_base, "combined_metrics.json")
-    with open(metrics_path, "w", encoding="utf-8") as f:
-        json.dump(metrics, f, indent=2)
+    def per_frame():
+        for rec in iter_records(stream_path):
+            t = rec.get("timings_ms")
+            if t:
+                yield {"frame": rec["frame"], "yolo_ms": t["yolo"], "face_ms": t["face"], "total_ms": t["total"]}
 
-    # Make a combined video
-    out_video_path = os.path.join(output_base, "combined_detections_video.mp4")
-    make_video_from_images(combined_frames_dir, out_video_path, fps=fps)
+    metrics_path = os.path.join(output_base, "combined_metrics.json")
+    write_json_array(metrics_path, {"summary": summary}, "per_frame", per_frame())
 
     return {
         "combined_json": combined_json_path,
         "metrics_json": metrics_path,
+        "combined_stream": stream_path,
         "combined_frames_dir": combined_frames_dir,
-        "combined_video": out_video_path,
+        "combined_video": video_writer.output_path,
     }
 
 
@@ -206,6 +224,7 @@ def parse_args():
     parser.add_argument("--face-device", choices=["cuda", "cpu"], default="cuda", help="Device for InsightFace detector")
     parser.add_argument("--face-model", default="buffalo_l", choices=["buffalo_l", "buffalo_s", "buffalo_sc"], help="Face model: buffalo_l (best), buffalo_s, buffalo_sc")
     parser.add_argument("--yolo-model", default="yolov8n", choices=list(OBJECT_MODEL_CHOICES), help="YOLO model: yolov8n/s/m/l/x (nano to extra-large)")
+    parser.add_argument("--no-save-frames", action="store_true", help="Do not write combined_frames/*.jpg (video only)")
     return parser.parse_args()
 
 
@@ -262,6 +281,7 @@ def main():
         yolo_model=args.yolo_model,
         fps=args.fps,
         video_id=video_id,
+        save_frames=not args.no_save_frames,
     )
 
     # Write a small metadata entry for fusion
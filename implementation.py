@@ -19,13 +19,17 @@ from pipeline.utils import (
 from pipeline.video import download_video, extract_frames
 from pipeline.detection import (
     run_yolo,
-    generate_summary,
-    save_detection_results,
     write_metadata,
     _resolve_model_path,
     OBJECT_MODEL_CHOICES,
 )
-from pipeline.render import make_video_from_images
+from pipeline.render import StreamingVideoWriter
+from pipeline.annotate import annotate_frames
+from pipeline.manifest import StageManifest
+from pipeline.locks import video_lock
+from pipeline.result_stream import JsonlRecordWriter, completed_frames, finalize_results, iter_records
+from pipeline.stage_cache import stage_key
+from pipeline.timeline import FrameStore
 
 
 def parse_args():
@@ -36,6 +40,7 @@ def parse_args():
     parser.add_argument("--fps", type=int, default=1, help="Frames per second for the output video")
     parser.add_argument("--conf-threshold", type=float, default=0.7, help="Confidence threshold for detections")
     parser.add_argument("--model", choices=list(OBJECT_MODEL_CHOICES), default="yolov8n", help="YOLOv8 model: n/s/m/l/x (nano to extra-large)")
+    parser.add_argument("--no-save-frames", action="store_true", help="Do not write annotated frames to processed_frames/ (video only)")
     return parser.parse_args()
 
 
@@ -55,9 +60,17 @@ def main():
         video_id = sanitize_id(base)
     elif args.url:
         source_desc = args.url
-        # Try pytube, fallback to yt-dlp via download_video
-        video_path = download_video(args.url, VIDEOS_DIR)  # type: ignore[name-defined]
-        video_id = extract_video_id_from_url(args.url) or sanitize_id(os.path.splitext(os.path.basename(video_path))[0])
+        video_id = extract_video_id_from_url(args.url)
+        # Reuse the download of an interrupted run of this video (see the stage manifest)
+        if video_id and validate_video_id(video_id):
+            done = StageManifest(get_video_results_paths(video_id)["manifest"]).completed(
+                "download", {"url": args.url}, validate=lambda out: os.path.isfile(out["video_path"]),
+            )
+            video_path = done["video_path"] if done else None
+        if not video_path:
+            # Try pytube, fallback to yt-dlp via download_video
+            video_path = download_video(args.url, VIDEOS_DIR)  # type: ignore[name-defined]
+        video_id = video_id or sanitize_id(os.path.splitext(os.path.basename(video_path or ""))[0])
     else:
         print("Error: Provide either --url or --video.", file=sys.stderr)
         sys.exit(1)
@@ -74,12 +87,24 @@ def main():
     vid_id = video_id or "unknown"
     paths = get_video_results_paths(vid_id)
 
+    # One run per video at a time (web requests take the same lock); released on exit
+    lock = video_lock(vid_id)
+    if not lock.acquire(timeout=0):
+        print(f"Video '{vid_id}' is being processed by another run; waiting for it to finish...")
+        lock.acquire()
+
     # Ensure per-video results directories and prevent overwrite
     if not ensure_video_results_dirs(vid_id):
         print("Error: Failed to create per-video results directories.", file=sys.stderr)
         sys.exit(1)
 
-    if os.path.exists(paths["detection_json"]) or (
+    # A run that stopped before its last stage is resumed; completed results are never overwritten
+    manifest = StageManifest(paths["manifest"], vid_id)
+    stages = (["download"] if args.url else []) + ["extract", "objects", "render", "results"]
+    resuming = os.path.isfile(paths["manifest"]) and manifest.first_incomplete(stages) is not None
+    if resuming:
+        print(f"Resuming '{vid_id}' from stage '{manifest.first_incomplete(stages)}'.")
+    elif os.path.exists(paths["detection_json"]) or (
         os.path.isdir(paths["processed_frames"]) and any(os.scandir(paths["processed_frames"]))
     ):
         print(
@@ -88,29 +113,108 @@ def main():
         )
         sys.exit(1)
 
-    # Extract frames
-    extract_frames(video_path, FRAMES_DIR)
-
-    # Run detection with selected model (Ultralytics downloads .pt if missing)
+    if args.url:
+        manifest.commit("download", {"url": args.url}, {"video_path": video_path})
+
+    # Extract frames into the video's own frames directory, named by absolute time and indexed
+    # by its FrameStore like the web app's (skipped when all of them are still there)
+    frames_dir = os.path.join(FRAMES_DIR, vid_id)
+    frame_store = FrameStore(frames_dir)
+    extract_params = {"video_path": video_path, "frames_dir": frames_dir}
+    if manifest.completed(
+        "extract", extract_params, validate=lambda out: len(frame_store.frame_times) == out["frame_count"],
+    ) is None:
+        manifest.begin("extract", extract_params)
+        os.makedirs(frames_dir, exist_ok=True)
+        new_times = {}
+        extract_frames(video_path, frames_dir, frame_times=new_times, absolute_names=True)
+        if not new_times:
+            manifest.fail("extract", "no frames extracted")
+            print("Error: No frames could be extracted from the video.", file=sys.stderr)
+            sys.exit(1)
+        # One frame per second: the last sample covers the second after it
+        frame_store.add(0.0, max(new_times.values(), default=-1.0) + 1.0, new_times)
+        manifest.commit("extract", extract_params, {"frame_count": len(frame_store.frame_times)})
+    frame_names = sorted(frame_store.frame_times)
+
+    # Run detection with selected model (Ultralytics downloads .pt if missing).
+    # Annotated frames are streamed into the video encoder while detection runs, and each
+    # frame's detections are appended to a JSONL stream instead of being kept in memory, so
+    # memory stays flat on long videos and a crash keeps the frames already detected.
     model_path = _resolve_model_path(args.model, os.getcwd())
-    results_by_frame = run_yolo(
-        frames_dir=FRAMES_DIR,
-        detections_dir=paths["processed_frames"],
-        model_path=model_path,
-        conf_threshold=args.conf_threshold,
-    )
-
-    total_dets, by_class = generate_summary(results_by_frame)
-    total_frames = len(results_by_frame)
-
-    # Write single detection_results.json and metadata.txt
-    save_detection_results(
-        results_by_frame=results_by_frame,
-        output_json_path=paths["detection_json"],
+    out_video = args.out_video or os.path.join(paths["base"], "detections_video.mp4")
+    objects_key = stage_key("objects", args.model, 0, 0, floor=args.conf_threshold, video=video_path)
+    objects_stream = os.path.join(paths["stage_cache"], objects_key + ".jsonl")
+    objects_params = {"cache_key": objects_key}
+    render_params = {"cache_key": objects_key, "out_video": out_video, "fps": args.fps}
+    objects_done = manifest.completed(
+        "objects", objects_params, validate=lambda out: os.path.isfile(out["stream"]),
+    ) is not None
+    render_done = manifest.completed(
+        "render", render_params, validate=lambda out: os.path.isfile(out["video"]),
+    ) is not None
+    video_writer = None
+    rendered = False
+    if not objects_done:
+        manifest.begin("objects", objects_params)
+        # Resume after the frames an interrupted run already recorded
+        done_frames = completed_frames(objects_stream)
+        remaining = [f for f in frame_names if f not in done_frames]
+        if done_frames:
+            print(f"Resuming detection: {len(done_frames)} frames already done, {len(remaining)} left.")
+        # The encoder cannot continue a partial video: encode during detection only on a fresh run
+        if not render_done and not done_frames:
+            video_writer = StreamingVideoWriter(out_video, fps=args.fps)
+        with JsonlRecordWriter(objects_stream, append=bool(done_frames)) as stream:
+            try:
+                run_yolo(
+                    frames_dir=frames_dir,
+                    detections_dir=paths["processed_frames"],
+                    model_path=model_path,
+                    conf_threshold=args.conf_threshold,
+                    save_annotated=not args.no_save_frames,
+                    frame_sink=video_writer.write if video_writer else None,
+                    record_sink=stream.sink("detections"),
+                    keep_results=False,
+                    frame_names=remaining,
+                )
+            finally:
+                if video_writer is not None:
+                    rendered = video_writer.close()
+        manifest.commit("objects", objects_params, {"cache_key": objects_key, "stream": objects_stream})
+    if not render_done and video_writer is None:
+        # Detection finished (or resumed) without encoding: draw and encode from the stream
+        results_by_frame = {rec["frame"]: rec.get("detections") or [] for rec in iter_records(objects_stream)}
+        video_writer = StreamingVideoWriter(out_video, fps=args.fps)
+        try:
+            annotate_frames(
+                frames_dir,
+                paths["processed_frames"],
+                results_by_frame,
+                frame_sink=video_writer.write,
+                write_images=not args.no_save_frames,
+            )
+        finally:
+            rendered = video_writer.close()
+        del results_by_frame
+    if rendered:
+        manifest.commit("render", render_params, {"video": video_writer.output_path})
+    elif not render_done:
+        # Not committed, so the next run renders again
+        manifest.fail("render", video_writer.error or "no frames were encoded")
+        print(f"Warning: Video rendering failed; '{out_video}' is incomplete.", file=sys.stderr)
+
+    # Single detection_results.json, written from the stream one frame at a time
+    summary = finalize_results(
+        paths["detection_json"],
+        {"detections": objects_stream},
         video_id=vid_id,
         conf_threshold=args.conf_threshold,
         object_model=args.model,
     )
+    total_frames = summary["total_frames"]
+    total_dets = summary["total_detections"]
+    by_class = summary["by_class"]
 
     device = "cpu"
     try:
@@ -131,13 +235,7 @@ def main():
         conf_threshold=args.conf_threshold,
     )
 
-    # Render final annotated video
-    out_video = args.out_video or os.path.join(paths["base"], "detections_video.mp4")
-    make_video_from_images(
-        images_dir=paths["processed_frames"],
-        output_path=out_video,
-        fps=args.fps,
-    )
+    manifest.commit("results", {"cache_key": objects_key}, {"detection_json": paths["detection_json"]})
 
     print(f"Completed. Results in '{paths['base']}'.")
 
@@ -0,0 +1,148 @@
+"""Annotation compositor: draw objects, faces and monument layers on a frame in one pass.
+
+Detection stages only produce records (detections, faces, monument); this module
+reads each clean source frame once, draws every layer, and writes it once, instead
+of each stage re-reading and re-writing the annotated JPEG.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .utils import safe_print
+
+# BGR colors per layer (faces cyan and monuments green, as drawn by the stages before)
+FACE_COLOR = (255, 255, 0)
+MONUMENT_COLOR = (0, 255, 0)
+# Object boxes: stable color per class name
+_OBJECT_PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+]
+
+
+def _object_color(class_name: str) -> tuple:
+    return _OBJECT_PALETTE[sum(class_name.encode("utf-8")) % len(_OBJECT_PALETTE)]
+
+
+def draw_objects(img: np.ndarray, detections: List[Dict[str, Any]]) -> None:
+    """Draw YOLO detections ({bbox, class, label, conf}) in place."""
+    h, w = img.shape[:2]
+    for d in detections or []:
+        bbox = d.get("bbox") or []
+        if len(bbox) < 4:
+            continue
+        x1, y1, x2, y2 = [int(round(v)) for v in bbox[:4]]
+        x1, y1 = max(0, min(x1, w - 1)), max(0, min(y1, h - 1))
+        x2, y2 = max(0, min(x2, w)), max(0, min(y2, h))
+        color = _object_color(d.get("class", ""))
+        text = f"{d.get('label') or d.get('class', 'object')} {float(d.get('conf', 0)):.2f}"
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        ty = y1 - 4 if y1 - th - 6 >= 0 else y1 + th + 4
+        cv2.rectangle(img, (x1, ty - th - 2), (x1 + tw + 2, ty + 2), color, -1)
+        cv2.putText(img, text, (x1 + 1, ty), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+
+def draw_faces(img: np.ndarray, faces: List[Dict[str, Any]]) -> None:
+    """Draw face records ({bbox, confidence, label}) in place."""
+    for rec in faces or []:
+        bbox = rec.get("bbox") or []
+        if len(bbox) < 4:
+            continue
+        x1, y1, x2, y2 = [int(v) for v in bbox[:4]]
+        cv2.rectangle(img, (x1, y1), (x2, y2), FACE_COLOR, 2)
+        label = rec.get("label", "Unknown")
+        conf = rec.get("confidence", 0)
+        text = f"{label} {conf:.2f}" if label != "Unknown" else f"face {conf:.2f}"
+        cv2.putText(img, text, (x1, y1 - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.5, FACE_COLOR, 1)
+
+
+def draw_monument(img: np.ndarray, info: Dict[str, Any]) -> Optional[List[int]]:
+    """Draw the frame-level monument banner in place. Returns the pseudo bbox, or None if not drawn.
+
+    The monument model is a frame-level classifier, so the box highlights the frame region
+    rather than a true detected monument box.
+    """
+    label = (info or {}).get("label")
+    if not label or label == "Unknown":
+        return None
+    conf = float(info.get("confidence", 0))
+    h_img, w_img = img.shape[:2]
+    margin = max(6, int(round(0.02 * min(h_img, w_img))))
+    x1, y1 = margin, margin
+    x2, y2 = max(x1 + 1, w_img - margin), max(y1 + 1, h_img - margin)
+    cv2.rectangle(img, (x1, y1), (x2, y2), MONUMENT_COLOR, 3)
+    cv2.putText(
+        img, f"Monument: {label} ({conf:.2f})",
+        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, MONUMENT_COLOR, 2,
+    )
+    return [int(x1), int(y1), int(x2), int(y2)]
+
+
+def compose_annotations(
+    img: np.ndarray,
+    detections: Optional[List[Dict[str, Any]]] = None,
+    faces: Optional[List[Dict[str, Any]]] = None,
+    monument: Optional[Dict[str, Any]] = None,
+) -> np.ndarray:
+    """Return a copy of img with all layers drawn (objects, then faces, then monument).
+
+    When a monument banner is drawn, its pseudo bbox is stored in monument["bbox"].
+    """
+    out = img.copy()
+    draw_objects(out, detections or [])
+    draw_faces(out, faces or [])
+    if monument:
+        bbox = draw_monument(out, monument)
+        if bbox is not None:
+            monument["bbox"] = bbox
+    return out
+
+
+def annotate_frames(
+    frames_dir: str,
+    output_dir: str,
+    results_by_frame: Dict[str, List[Dict[str, Any]]],
+    faces_by_frame: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    monuments_by_frame: Optional[Dict[str, Dict[str, Any]]] = None,
+    frame_sink: Optional[Callable[[np.ndarray], None]] = None,
+    write_images: bool = True,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Read each clean frame once, draw every layer, write it once to output_dir.
+
+    Frames are those keyed in results_by_frame, in sorted order.
+    frame_sink: called with every annotated frame (e.g. StreamingVideoWriter.write).
+    write_images: if False, annotated JPEGs are not written (only frame_sink gets the frames).
+    progress_callback: called with (frames done, frames total) after each frame.
+    Returns the number of frames annotated.
+    """
+    if write_images:
+        os.makedirs(output_dir, exist_ok=True)
+    fbf = faces_by_frame or {}
+    mbf = monuments_by_frame or {}
+    written = 0
+    names = sorted(results_by_frame.keys())
+    for done, fname in enumerate(names):
+        if progress_callback is not None and done:
+            progress_callback(done, len(names))
+        img = cv2.imread(os.path.join(frames_dir, fname))
+        if img is None:
+            safe_print(f"Warning: could not read {fname}; skipping annotation.")
+            continue
+        annotated = compose_annotations(img, results_by_frame.get(fname), fbf.get(fname), mbf.get(fname))
+        if frame_sink is not None:
+            frame_sink(annotated)
+        if write_images and not cv2.imwrite(os.path.join(output_dir, fname), annotated):
+            continue
+        written += 1
+    if progress_callback is not None and names:
+        progress_callback(len(names), len(names))
+    return written
@@ -0,0 +1,289 @@
+"""Columnar detection results stored alongside detection_results.json.
+
+detection_results.json is one document that must be parsed in full, even just to
+count detections. The columnar format stores the same data as flat numpy arrays
+(one uncompressed .npy file per column) in results/<video_id>/detection_columns/,
+so columns can be memory-mapped and a frame range read without touching the rest:
+
+    meta.json         header fields (video_id, models, threshold, run_stats, ...) and
+                      label dictionaries (classes, colors, labels, faces, monuments)
+    frame_name.npy    (F,)   frame filenames, sorted
+    frame_time.npy    (F,)   source time in seconds (NaN when unknown)
+    obj_offsets.npy   (F+1,) objects of frame i are rows obj_offsets[i]:obj_offsets[i+1]
+    obj_bbox.npy      (N, 4) float32 x1, y1, x2, y2
+    obj_class.npy / obj_color.npy / obj_label.npy   (N,) int16 dictionary ids
+    obj_conf.npy      (N,)   float32
+    face_offsets.npy  (F+1,) same layout for faces
+    face_bbox.npy, face_conf.npy, face_label.npy (-1 = no label), face_rec_conf.npy (NaN = none)
+    mon_label.npy     (F,)   monument label id per frame (-1 = no monument record)
+    mon_conf.npy, mon_inferred.npy (-1 = unknown), mon_shot.npy (-1 = unknown), mon_bbox.npy (F, 4; -1 = none)
+
+Use save_columnar_results / json_to_columnar to write, ColumnarResults to read, and
+columnar_to_json to convert back to the JSON payload.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+COLUMNAR_VERSION = 1
+
+_HEADER_FIELDS = ("video_id", "confidence_threshold", "object_model", "face_model", "run_stats", "source_video")
+
+
+class _Dictionary:
+    """Assign small integer ids to strings in first-seen order."""
+
+    def __init__(self, names: Optional[List[str]] = None) -> None:
+        self.names: List[str] = list(names or [])
+        self.ids: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+
+    def id(self, name: str) -> int:
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+
+def _bbox4(bbox: Any) -> List[float]:
+    bbox = list(bbox or [])[:4]
+    return [float(v) for v in bbox] + [0.0] * (4 - len(bbox))
+
+
+def save_columnar_results(payload: Dict[str, Any], columns_dir: str) -> str:
+    """Write a detection_results.json payload (see build_detection_payload) as columns.
+
+    The directory is written next to columns_dir and swapped in, so readers never see
+    a partial set of columns. Returns columns_dir.
+    """
+    frames = sorted(payload.get("frames") or [], key=lambda fr: fr.get("frame") or "")
+    classes, colors, labels = _Dictionary(), _Dictionary(), _Dictionary()
+    face_labels, monuments = _Dictionary(), _Dictionary()
+
+    frame_name, frame_time = [], []
+    obj_offsets, obj_bbox, obj_class, obj_color, obj_label, obj_conf = [0], [], [], [], [], []
+    face_offsets, face_bbox, face_conf, face_label, face_rec_conf = [0], [], [], [], []
+    mon_label, mon_conf, mon_inferred, mon_shot, mon_bbox = [], [], [], [], []
+
+    for fr in frames:
+        frame_name.append(fr.get("frame") or "")
+        t = fr.get("time_sec")
+        frame_time.append(np.nan if t is None else float(t))
+        for d in fr.get("detections") or []:
+            cls = d.get("class", "unknown")
+            color = d.get("color", "")
+            obj_bbox.append(_bbox4(d.get("bbox")))
+            obj_class.append(classes.id(cls))
+            obj_color.append(colors.id(color))
+            obj_label.append(labels.id(d.get("label") or (color + " " + cls).strip() or "unknown"))
+            obj_conf.append(float(d.get("conf", 0)))
+        obj_offsets.append(len(obj_conf))
+        for rec in fr.get("faces") or []:
+            face_bbox.append(_bbox4(rec.get("bbox")))
+            face_conf.append(float(rec.get("confidence", 0)))
+            face_label.append(face_labels.id(rec["label"]) if "label" in rec else -1)
+            rc = rec.get("recognition_confidence")
+            face_rec_conf.append(np.nan if rc is None else float(rc))
+        face_offsets.append(len(face_conf))
+        mon = fr.get("monument") or {}
+        if mon.get("label") is not None:
+            mon_label.append(monuments.id(mon["label"]))
+            mon_conf.append(float(mon.get("confidence", 0)))
+            mon_inferred.append(int(bool(mon["inferred"])) if "inferred" in mon else -1)
+            mon_shot.append(int(mon["shot"]) if "shot" in mon else -1)
+            mon_bbox.append([int(v) for v in mon["bbox"][:4]] if len(mon.get("bbox") or []) >= 4 else [-1] * 4)
+        else:
+            mon_label.append(-1)
+            mon_conf.append(0.0)
+            mon_inferred.append(-1)
+            mon_shot.append(-1)
+            mon_bbox.append([-1] * 4)
+
+    columns = {
+        "frame_name": np.array(frame_name, dtype=str),
+        "frame_time": np.array(frame_time, dtype=np.float64),
+        "obj_offsets": np.array(obj_offsets, dtype=np.int64),
+        "obj_bbox": np.array(obj_bbox, dtype=np.float32).reshape(-1, 4),
+        "obj_class": np.array(obj_class, dtype=np.int16),
+        "obj_color": np.array(obj_color, dtype=np.int16),
+        "obj_label": np.array(obj_label, dtype=np.int16),
+        "obj_conf": np.array(obj_conf, dtype=np.float32),
+        "face_offsets": np.array(face_offsets, dtype=np.int64),
+        "face_bbox": np.array(face_bbox, dtype=np.float32).reshape(-1, 4),
+        "face_conf": np.array(face_conf, dtype=np.float32),
+        "face_label": np.array(face_label, dtype=np.int16),
+        "face_rec_conf": np.array(face_rec_conf, dtype=np.float32),
+        "mon_label": np.array(mon_label, dtype=np.int16),
+        "mon_conf": np.array(mon_conf, dtype=np.float32),
+        "mon_inferred": np.array(mon_inferred, dtype=np.int8),
+        "mon_shot": np.array(mon_shot, dtype=np.int32),
+        "mon_bbox": np.array(mon_bbox, dtype=np.int32).reshape(-1, 4),
+    }
+    meta = {k: payload[k] for k in _HEADER_FIELDS if k in payload}
+    meta.update({
+        "version": COLUMNAR_VERSION,
+        "frame_count": len(frame_name),
+        "object_count": len(obj_conf),
+        "face_count": len(face_conf),
+        "classes": classes.names,
+        "colors": colors.names,
+        "labels": labels.names,
+        "faces": face_labels.names,
+        "monuments": monuments.names,
+    })
+
+    tmp_dir = columns_dir.rstrip(os.sep) + ".tmp"
+    old_dir = columns_dir.rstrip(os.sep) + ".old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, arr in columns.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), arr, allow_pickle=False)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.isdir(columns_dir):
+        os.replace(columns_dir, old_dir)
+    os.replace(tmp_dir, columns_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return columns_dir
+
+
+def json_to_columnar(json_path: str, columns_dir: str) -> str:
+    """Convert an existing detection_results.json into columns. Returns columns_dir."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return save_columnar_results(payload, columns_dir)
+
+
+def has_columnar_results(columns_dir: str) -> bool:
+    return os.path.isfile(os.path.join(columns_dir, "meta.json"))
+
+
+class ColumnarResults:
+    """Lazy, memory-mapped reader for a detection_columns/ directory.
+
+    Columns are opened on first access with np.load(mmap_mode="r"), so only the pages
+    actually touched (e.g. the rows of one frame range) are read from disk.
+    """
+
+    def __init__(self, columns_dir: str) -> None:
+        self.columns_dir = columns_dir
+        with open(os.path.join(columns_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self._cols: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._cols:
+            self._cols[name] = np.load(
+                os.path.join(self.columns_dir, name + ".npy"), mmap_mode="r", allow_pickle=False,
+            )
+        return self._cols[name]
+
+    @property
+    def frame_count(self) -> int:
+        return int(self.meta.get("frame_count", 0))
+
+    def frame_index(self, frame_name: str) -> int:
+        """Row of frame_name (binary search over the sorted names), or -1."""
+        names = self["frame_name"]
+        i = int(np.searchsorted(names, frame_name))
+        return i if i < len(names) and names[i] == frame_name else -1
+
+    def frame_range_for_time(self, start_sec: float, end_sec: float) -> Tuple[int, int]:
+        """[start, stop) frame rows whose time_sec lies in [start_sec, end_sec]."""
+        times = np.asarray(self["frame_time"])
+        idx = np.flatnonzero((times >= start_sec) & (times <= end_sec))
+        if idx.size == 0:
+            return 0, 0
+        return int(idx[0]), int(idx[-1]) + 1
+
+    def summary(self) -> Tuple[int, Dict[str, int], int]:
+        """(total_detections, counts per label, total_face_detections) without building records.
+
+        Same counts as generate_summary on the JSON frames.
+        """
+        labels = self.meta.get("labels") or []
+        counts = np.bincount(np.asarray(self["obj_label"], dtype=np.int64), minlength=len(labels))
+        by_label = {labels[i]: int(c) for i, c in enumerate(counts) if c > 0}
+        return int(self.meta.get("object_count", 0)), by_label, int(self.meta.get("face_count", 0))
+
+    def frames(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Frame entries for rows [start, stop), in the detection_results.json shape."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        if start >= stop:
+            return []
+        m = self.meta
+        classes, colors, labels = m.get("classes") or [], m.get("colors") or [], m.get("labels") or []
+        face_labels, monuments = m.get("faces") or [], m.get("monuments") or []
+        oo = np.asarray(self["obj_offsets"][start:stop + 1])
+        fo = np.asarray(self["face_offsets"][start:stop + 1])
+        # Slice each column once for the whole range, then split per frame
+        ob = np.asarray(self["obj_bbox"][oo[0]:oo[-1]])
+        oc = np.asarray(self["obj_class"][oo[0]:oo[-1]])
+        ocol = np.asarray(self["obj_color"][oo[0]:oo[-1]])
+        ol = np.asarray(self["obj_label"][oo[0]:oo[-1]])
+        oconf = np.asarray(self["obj_conf"][oo[0]:oo[-1]])
+        fb = np.asarray(self["face_bbox"][fo[0]:fo[-1]])
+        fc = np.asarray(self["face_conf"][fo[0]:fo[-1]])
+        fl = np.asarray(self["face_label"][fo[0]:fo[-1]])
+        frc = np.asarray(self["face_rec_conf"][fo[0]:fo[-1]])
+        names = self["frame_name"]
+        times = self["frame_time"]
+        mon_label, mon_conf = self["mon_label"], self["mon_conf"]
+        mon_inferred, mon_shot, mon_bbox = self["mon_inferred"], self["mon_shot"], self["mon_bbox"]
+
+        out = []
+        for k, row in enumerate(range(start, stop)):
+            entry: Dict[str, Any] = {"frame": str(names[row])}
+            if not np.isnan(times[row]):
+                entry["time_sec"] = float(times[row])
+            dets = []
+            for j in range(oo[k] - oo[0], oo[k + 1] - oo[0]):
+                dets.append({
+                    "bbox": [float(v) for v in ob[j]],
+                    "class": classes[oc[j]],
+                    "color": colors[ocol[j]],
+                    "label": labels[ol[j]],
+                    "conf": float(oconf[j]),
+                })
+            entry["detections"] = dets
+            faces = []
+            for j in range(fo[k] - fo[0], fo[k + 1] - fo[0]):
+                rec: Dict[str, Any] = {"bbox": [float(v) for v in fb[j]], "confidence": float(fc[j])}
+                if fl[j] >= 0:
+                    rec["label"] = face_labels[fl[j]]
+                if not np.isnan(frc[j]):
+                    rec["recognition_confidence"] = float(frc[j])
+                faces.append(rec)
+            entry["faces"] = faces
+            mon: Dict[str, Any] = {}
+            if mon_label[row] >= 0:
+                mon = {"label": monuments[mon_label[row]], "confidence": float(mon_conf[row])}
+                if mon_inferred[row] >= 0:
+                    mon["inferred"] = bool(mon_inferred[row])
+                if mon_shot[row] >= 0:
+                    mon["shot"] = int(mon_shot[row])
+                if mon_bbox[row][0] >= 0:
+                    mon["bbox"] = [int(v) for v in mon_bbox[row]]
+            entry["monument"] = mon
+            out.append(entry)
+        return out
+
+    def to_payload(self) -> Dict[str, Any]:
+        """The full detection_results.json payload."""
+        payload = {k: self.meta[k] for k in _HEADER_FIELDS if k in self.meta}
+        payload["frames"] = self.frames()
+        return payload
+
+
+def columnar_to_json(columns_dir: str, json_path: str) -> str:
+    """Write detection_results.json from columns. Returns json_path."""
+    payload = ColumnarResults(columns_dir).to_payload()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    return json_path
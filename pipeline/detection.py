@@ -4,10 +4,13 @@ This module provides:
 - run_yolo: runs detection over frames and writes annotated images
 - generate_summary: returns counts (including color+class labels)
 - save_detection_results: writes a single JSON with all detections (with color attribute)
+- build_detection_payload: the same JSON payload as a dict
+  (save_detection_results can also write it in columnar form, see pipeline.columnar)
 - write_metadata: writes a text metadata file
+- save_summary / load_summary: small summary.json sidecar (totals, counts, models, video metadata)
 """
 
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Any, Optional
 import os
 import json
 
@@ -95,14 +98,30 @@ def run_yolo(
     model_path: str = "yolov8n.pt",
     conf_threshold: float = 0.7,
     device: Optional[str] = None,
+    save_annotated: bool = True,
+    frame_sink: Optional[Callable[[np.ndarray], None]] = None,
+    record_sink: Optional[Callable[[str, List[Dict]], None]] = None,
+    keep_results: bool = True,
+    frame_names: Optional[Iterable[str]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
 ) -> Dict[str, List[Dict]]:
     """Run YOLOv8 on frames, save annotated images, and return filtered detections.
 
     Only detections with confidence >= conf_threshold are included.
     model_path: e.g. yolov8n.pt (Ultralytics will download if missing).
     device: 'cuda', 'cpu', or None to auto-detect (prefer CUDA if available).
+    save_annotated: if False, only detections are returned and nothing is written to
+    detections_dir (draw later with pipeline.annotate in a single pass).
+    frame_sink: called with each annotated frame as soon as it is produced
+    (e.g. StreamingVideoWriter.write), so the video is encoded while detection runs.
+    record_sink: called with (frame_filename, detections) per frame (e.g.
+    pipeline.result_stream.JsonlRecordWriter.sink("detections")). With keep_results=False
+    nothing is accumulated and {} is returned, so memory does not grow with video length.
+    frame_names: only process these files of frames_dir (e.g. the newly extracted part of a window).
+    progress_callback: called with (frames done, frames total) after each frame.
     """
-    os.makedirs(detections_dir, exist_ok=True)
+    if save_annotated:
+        os.makedirs(detections_dir, exist_ok=True)
     if device is None:
         device = _inference_device()
     model = YOLO(model_path)
@@ -110,14 +129,22 @@ def run_yolo(
 
     import cv2
 
-    for fname in sorted(os.listdir(frames_dir)):
-        if not fname.lower().endswith((".jpg", ".jpeg", ".png")):
-            continue
+    only = set(frame_names) if frame_names is not None else None
+    frame_files = [
+        f for f in sorted(os.listdir(frames_dir))
+        if f.lower().endswith((".jpg", ".jpeg", ".png")) and (only is None or f in only)
+    ]
+    for done, fname in enumerate(frame_files):
+        # Reported before each frame and once at the end, so unreadable frames count as well
+        if progress_callback is not None and done:
+            progress_callback(done, len(frame_files))
         frame_path = os.path.join(frames_dir, fname)
         frame_bgr = cv2.imread(frame_path)
         if frame_bgr is None:
             continue
-        result = model(frame_path, device=device)
+        # Pass the decoded array so the frame is not read from disk a second time
+        # conf makes YOLO keep boxes down to the threshold (its default cut-off is 0.25)
+        result = model(frame_bgr, device=device, conf=conf_threshold)
         detections: List[Dict] = []
         boxes = result[0].boxes
         names = result[0].names or {}
@@ -145,13 +172,22 @@ def run_yolo(
                         "label": label,
                         "conf": conf,
                     })
-        results_by_frame[fname] = detections
+        if keep_results:
+            results_by_frame[fname] = detections
+        if record_sink is not None:
+            record_sink(fname, detections)
 
-        # Save annotated image (BGR numpy array)
-        annotated = result[0].plot()
-        out_path = os.path.join(detections_dir, fname)
-        cv2.imwrite(out_path, annotated)
+        if save_annotated or frame_sink is not None:
+            # Annotated image (BGR numpy array)
+            annotated = result[0].plot()
+            if frame_sink is not None:
+                frame_sink(annotated)
+            if save_annotated:
+                out_path = os.path.join(detections_dir, fname)
+                cv2.imwrite(out_path, annotated)
 
+    if progress_callback is not None and frame_files:
+        progress_callback(len(frame_files), len(frame_files))
     return results_by_frame
 
 
@@ -167,9 +203,8 @@ def generate_summary(results_by_frame: Dict[str, List[Dict]]) -> Tuple[int, Dict
     return total, by_class
 
 
-def save_detection_results(
+def build_detection_payload(
     results_by_frame: Dict[str, List[Dict]],
-    output_json_path: str,
     video_id: str,
     conf_threshold: float,
     object_model: str = "yolov8n",
@@ -177,13 +212,18 @@ def save_detection_results(
     run_stats: Optional[Dict[str, Any]] = None,
     faces_by_frame: Optional[Dict[str, List[Dict[str, Any]]]] = None,
     monuments_by_frame: Optional[Dict[str, Dict[str, Any]]] = None,
-) -> None:
-    """Write a single JSON file containing all detections (and optional faces, monuments) for the video."""
+    frame_times: Optional[Dict[str, float]] = None,
+    source_video: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build the detection_results.json payload (see save_detection_results)."""
     fbf = faces_by_frame or {}
     mbf = monuments_by_frame or {}
+    ft = frame_times or {}
     frames_payload = []
     for frame, dets in sorted(results_by_frame.items()):
         entry: Dict[str, Any] = {"frame": frame, "detections": dets}
+        if frame in ft:
+            entry["time_sec"] = ft[frame]
         if frame in fbf:
             entry["faces"] = fbf[frame]
         else:
@@ -202,8 +242,48 @@ def save_detection_results(
     }
     if run_stats is not None:
         payload["run_stats"] = run_stats
+    if source_video:
+        payload["source_video"] = source_video
+    return payload
+
+
+def save_detection_results(
+    results_by_frame: Dict[str, List[Dict]],
+    output_json_path: str,
+    video_id: str,
+    conf_threshold: float,
+    object_model: str = "yolov8n",
+    face_model: str = "buffalo_l",
+    run_stats: Optional[Dict[str, Any]] = None,
+    faces_by_frame: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    monuments_by_frame: Optional[Dict[str, Dict[str, Any]]] = None,
+    frame_times: Optional[Dict[str, float]] = None,
+    source_video: Optional[str] = None,
+    columns_dir: Optional[str] = None,
+) -> None:
+    """Write a single JSON file containing all detections (and optional faces, monuments) for the video.
+
+    frame_times ({ frame: seconds }) adds "time_sec" to each frame entry, and source_video records the
+    original file, so the overlay can be re-rendered on the source video (see pipeline.source_render).
+    columns_dir: also write the same payload as memory-mappable columns (pipeline.columnar).
+    """
+    payload = build_detection_payload(
+        results_by_frame,
+        video_id=video_id,
+        conf_threshold=conf_threshold,
+        object_model=object_model,
+        face_model=face_model,
+        run_stats=run_stats,
+        faces_by_frame=faces_by_frame,
+        monuments_by_frame=monuments_by_frame,
+        frame_times=frame_times,
+        source_video=source_video,
+    )
     with open(output_json_path, "w", encoding="utf-8") as f:
         json.dump(payload, f)
+    if columns_dir:
+        from .columnar import save_columnar_results
+        save_columnar_results(payload, columns_dir)
 
 
 def write_metadata(
@@ -230,4 +310,41 @@ def write_metadata(
     for k in sorted(by_class.keys()):
         lines.append(f"  {k}: {by_class[k]}")
     with open(metadata_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
\ No newline at end of file
+        f.write("\n".join(lines) + "\n")
+
+
+def save_summary(
+    summary_path: str,
+    video_id: str,
+    metadata: Optional[Dict[str, Any]],
+    summary: Dict[str, Any],
+    request: Optional[Dict[str, Any]] = None,
+    complete: bool = True,
+) -> None:
+    """Write the summary sidecar served on cache hits without reading the results.
+
+    summary: the "summary" object of the /api/process response (totals, by_class,
+    threshold, models, run_stats). metadata: video metadata (title, duration, thumbnail).
+    request: the processing parameters that produced it; a cached response is only
+    served for an identical request. complete=False (a stage failed) is recorded as
+    "complete": false, and such a sidecar is never served from the cache.
+    """
+    doc = {"video_id": video_id, "metadata": metadata or {}, "summary": summary}
+    if request is not None:
+        doc["request"] = request
+    if not complete:
+        doc["complete"] = False
+    tmp_path = summary_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    os.replace(tmp_path, summary_path)
+
+
+def load_summary(summary_path: str) -> Optional[Dict[str, Any]]:
+    """Return {video_id, metadata, summary[, request]} from the sidecar, or None if missing/unreadable."""
+    try:
+        with open(summary_path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return doc if isinstance(doc, dict) and isinstance(doc.get("summary"), dict) else None
@@ -4,13 +4,20 @@ Runs InsightFace face detection on each image in a directory (e.g. YOLO-annotate
 frames), draws face boxes, and returns per-frame face counts and bboxes for the API.
 If known_faces embeddings exist, runs recognition and draws celebrity names.
 If insightface is not installed, returns empty results and skips drawing.
+
+Per-face embeddings can be persisted next to detection_results.json so that
+faces can be re-identified against an updated known_faces gallery later
+(reidentify_faces / reidentify_all_videos) without re-running detection.
 """
 
 from __future__ import annotations
 
+import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .locks import VIDEO_LOCK_TIMEOUT, video_lock
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +31,29 @@ def run_face_detection(
     device: str = "cuda",
     face_conf_threshold: float = 0.5,
     source_frames_dir: Optional[str] = None,
-) -> Dict[str, List[Dict[str, Any]]]:
+    embeddings_path: Optional[str] = None,
+    annotate: bool = True,
+    record_sink: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+    keep_results: bool = True,
+    frame_names: Optional[Iterable[str]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
     """Run face detection and draw face boxes on annotated frames.
 
     - If source_frames_dir is set, runs InsightFace on those (clean) frames for better detection,
       then draws cyan face boxes on the corresponding images in annotated_frames_dir.
     - If known_faces/embeddings exist, runs recognition and draws celebrity names on boxes.
+    - If annotate is False, only records are returned (draw later with pipeline.annotate).
+    - If embeddings_path is set, saves every face embedding there (see save_face_embeddings),
+      keyed by (frame_filename, index in faces_by_frame[frame_filename]).
+    - record_sink: called with (frame_filename, records) as each frame is processed
+      (e.g. JsonlRecordWriter.sink("faces")); with keep_results=False nothing is accumulated
+      and {} is returned, so memory stays flat on long videos (embeddings are spooled to disk).
+    - frame_names: only process these frame files (default: every image in the directory).
+    - progress_callback: called with (frames done, frames total) after each frame.
     - Returns faces_by_frame: { frame_filename: [ {"bbox", "confidence", "label" (if recognition)}, ... ] }
-    - If insightface is not available, returns {} and does not modify images.
+    - If insightface or the detector is not available, returns None (nothing was scanned, so
+      callers must not record the frames as covered) and does not modify images.
     """
     print("[trace] run_face_detection() entered")
     try:
@@ -40,7 +62,7 @@ def run_face_detection(
     except Exception as e:
         print(f"[trace] Face detection skipped: insightface not available: {e}")
         logger.warning("Face detection skipped: insightface not available: %s", e)
-        return {}
+        return None
 
     faces_by_frame: Dict[str, List[Dict[str, Any]]] = {}
     try:
@@ -50,14 +72,18 @@ def run_face_detection(
     except Exception as e:
         print(f"[trace] Face detection skipped: failed to load detector: {e}")
         logger.warning("Face detection skipped: failed to load detector: %s", e)
-        return {}
+        return None
 
     # Optional: load known faces for recognition (Training Data Manager datasets)
     known_faces: List[tuple] = []
+    get_embedding = None
+    try:
+        from face_pipeline.embeddings import get_embedding
+    except Exception as e:
+        logger.debug("Face embeddings unavailable: %s", e)
     try:
         from face_pipeline.paths import KNOWN_FACES_DIR
         from face_pipeline.recognition import load_known_embeddings, match
-        from face_pipeline.embeddings import get_embedding
         known_dir = str(KNOWN_FACES_DIR)
         if os.path.isdir(os.path.join(known_dir, "embeddings")):
             known_faces = load_known_embeddings(known_dir)
@@ -77,11 +103,21 @@ def run_face_detection(
         logger.debug("Face recognition skipped (no known_faces or import error): %s", e)
 
     import cv2
+    from .annotate import draw_faces
+
+    emb_spool = _EmbeddingSpool(embeddings_path + ".spool") if embeddings_path else None
+    frames_done = 0
 
     list_dir = source_frames_dir if source_frames_dir and os.path.isdir(source_frames_dir) else annotated_frames_dir
     frame_files = [f for f in sorted(os.listdir(list_dir)) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+    if frame_names is not None:
+        only = set(frame_names)
+        frame_files = [f for f in frame_files if f in only]
     print(f"[trace] list_dir={list_dir!r} frame_count={len(frame_files)} first={frame_files[0] if frame_files else None!r}")
-    for fname in frame_files:
+    for done, fname in enumerate(frame_files):
+        # Reported before each frame and once at the end, so skipped frames count as well
+        if progress_callback is not None and done:
+            progress_callback(done, len(frame_files))
         path_for_detection = os.path.join(source_frames_dir, fname) if source_frames_dir else os.path.join(annotated_frames_dir, fname)
         path_annotated = os.path.join(annotated_frames_dir, fname)
         if not os.path.isfile(path_for_detection):
@@ -89,10 +125,14 @@ def run_face_detection(
         # Pass path (like vista-face-recognition) so detector reads image the same way
         dets = detect_faces(detector, path_for_detection, conf_thresh=face_conf_threshold)
         records: List[Dict[str, Any]] = []
-        for d in dets:
+        for face_idx, d in enumerate(dets):
             rec = {"bbox": d["bbox"], "confidence": round(float(d["confidence"]), 4)}
+            emb = None
+            if get_embedding is not None and (known_faces or embeddings_path) and "face_obj" in d:
+                emb = get_embedding(d["face_obj"])
+                if emb is not None and emb_spool is not None:
+                    emb_spool.append(fname, face_idx, emb)
             if known_faces and "face_obj" in d:
-                emb = get_embedding(d["face_obj"]) if known_faces else None
                 if emb is not None:
                     m = match(emb, known_faces, RECOGNITION_THRESHOLDS)
                     rec["label"] = m.get("label", "Unknown")
@@ -102,22 +142,355 @@ def run_face_detection(
             else:
                 rec["label"] = "Unknown"
             records.append(rec)
-        faces_by_frame[fname] = records
-        if not dets and len(faces_by_frame) == 1:
+        if keep_results:
+            faces_by_frame[fname] = records
+        if record_sink is not None:
+            record_sink(fname, records)
+        frames_done += 1
+        if not dets and frames_done == 1:
             logger.info("Face detection ran but found no faces in first frame (threshold=%.2f). Check video content or lower face_conf_threshold.", face_conf_threshold)
+        if not annotate:
+            continue
         # Draw face boxes on the annotated image (so output video has both YOLO and face boxes)
         img_annotated = cv2.imread(path_annotated)
         if img_annotated is not None:
-            for d, rec in zip(dets, records):
-                x1, y1, x2, y2 = d["bbox"]
-                cv2.rectangle(img_annotated, (x1, y1), (x2, y2), (255, 255, 0), 2)
-                label = rec.get("label", "Unknown")
-                conf = rec.get("confidence", 0)
-                text = f"{label} {conf:.2f}" if label != "Unknown" else f"face {conf:.2f}"
-                cv2.putText(
-                    img_annotated, text, (x1, y1 - 4),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1,
-                )
+            draw_faces(img_annotated, records)
             cv2.imwrite(path_annotated, img_annotated)
 
+    if progress_callback is not None and frame_files:
+        progress_callback(len(frame_files), len(frame_files))
+    if emb_spool is not None:
+        try:
+            emb_spool.save(embeddings_path)
+        except Exception as e:
+            logger.warning("Failed to save face embeddings to %s: %s", embeddings_path, e)
+
     return faces_by_frame
+
+
+class _EmbeddingSpool:
+    """Append float16 embeddings to a raw file while detecting, instead of keeping them in memory."""
+
+    def __init__(self, spool_path: str) -> None:
+        self.spool_path = spool_path
+        self.keys: List[Tuple[str, int]] = []
+        self.dim = 0
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        self._f = open(spool_path, "wb")
+
+    def append(self, frame: str, face_idx: int, emb: Any) -> None:
+        import numpy as np
+
+        vec = np.asarray(emb, dtype=np.float32).reshape(-1).astype(np.float16)
+        self.dim = self.dim or vec.size
+        self._f.write(vec.tobytes())
+        self.keys.append((frame, face_idx))
+
+    def save(self, path: str) -> None:
+        """Write the .npz (embeddings read back through a memmap) and delete the spool."""
+        import numpy as np
+
+        self._f.close()
+        try:
+            if self.keys:
+                emb = np.memmap(self.spool_path, dtype=np.float16, mode="r", shape=(len(self.keys), self.dim))
+                save_face_embeddings(path, self.keys, emb)
+                del emb
+            else:
+                save_face_embeddings(path, [], [])
+        finally:
+            try:
+                os.remove(self.spool_path)
+            except OSError:
+                pass
+
+
+def save_face_embeddings(
+    path: str,
+    keys: List[Tuple[str, int]],
+    embeddings: Any,
+) -> None:
+    """Write per-face embeddings as a compact .npz.
+
+    Arrays: frames (N,) frame filenames, face_idx (N,) index into that frame's faces list,
+    embeddings (N, D) float16. An empty file (N=0) is written when no embeddings exist,
+    so callers can tell "no faces" apart from "embeddings were never stored".
+    embeddings: list of vectors, or an (N, D) array (e.g. a float16 memmap, written in chunks).
+    """
+    import numpy as np
+
+    frames = np.array([k[0] for k in keys], dtype=np.str_)
+    face_idx = np.array([k[1] for k in keys], dtype=np.int32)
+    if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+        emb = embeddings if embeddings.dtype == np.float16 else embeddings.astype(np.float16)
+    elif len(embeddings):
+        emb = np.stack([np.asarray(e, dtype=np.float32).reshape(-1) for e in embeddings]).astype(np.float16)
+    else:
+        emb = np.zeros((0, 0), dtype=np.float16)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # np.savez appends .npz to names without it; write to a temp name and swap in
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, frames=frames, face_idx=face_idx, embeddings=emb)
+    os.replace(tmp_path, path)
+
+
+def merge_face_embeddings(path: str, new_path: str) -> None:
+    """Add the embeddings stored in new_path to path (replacing those of the same frames).
+
+    Used when a new scan window is merged into a video's timeline; new_path is removed.
+    """
+    import numpy as np
+
+    new = load_face_embeddings(new_path)
+    if new is None:
+        return
+    old = load_face_embeddings(path)
+    if old is None or not len(old[0]):
+        os.replace(new_path, path)
+        return
+    new_frames = set(new[0])
+    keep = np.array([f not in new_frames for f in old[0]], dtype=bool)
+    frames = [f for f, k in zip(old[0], keep) if k] + list(new[0])
+    face_idx = np.concatenate([old[1][keep], new[1]]) if len(frames) else []
+    parts = [old[2][keep]] + ([new[2]] if len(new[0]) else [])
+    embeddings = np.concatenate(parts) if len(frames) else []
+    save_face_embeddings(path, list(zip(frames, (int(i) for i in face_idx))), embeddings)
+    os.remove(new_path)
+
+
+def load_face_embeddings(path: str) -> Optional[Tuple[List[str], Any, Any]]:
+    """Load (frames, face_idx, embeddings) written by save_face_embeddings, or None if missing."""
+    import numpy as np
+
+    if not os.path.isfile(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        frames = [str(f) for f in data["frames"]]
+        face_idx = data["face_idx"].astype(np.int64)
+        embeddings = data["embeddings"].astype(np.float32)
+    return frames, face_idx, embeddings
+
+
+# Detectors for query images (similarity search) keyed by (model, device), loaded once
+_QUERY_DETECTORS: Dict[Tuple[str, str], Any] = {}
+
+
+def embed_faces(
+    image_bgr: Any,
+    face_model: str = "buffalo_l",
+    device: str = "cpu",
+    face_conf_threshold: float = 0.5,
+) -> List[Dict[str, Any]]:
+    """Detect faces in one image and return [{"bbox", "confidence", "embedding"}], largest face first.
+
+    Uses the same InsightFace model as run_face_detection (cached per model and device),
+    so embeddings are comparable with the stored face_embeddings.npz vectors.
+    """
+    from face_pipeline.detection import load_detector, detect_faces
+    from face_pipeline.embeddings import get_embedding
+
+    key = (face_model, device)
+    detector = _QUERY_DETECTORS.get(key)
+    if detector is None:
+        detector = load_detector(device=device, model_name=face_model, det_size=(640, 640), silent=True)
+        _QUERY_DETECTORS[key] = detector
+    faces = []
+    for d in detect_faces(detector, image_bgr, conf_thresh=face_conf_threshold):
+        emb = get_embedding(d["face_obj"]) if "face_obj" in d else None
+        if emb is not None:
+            faces.append({"bbox": d["bbox"], "confidence": round(float(d["confidence"]), 4), "embedding": emb})
+    faces.sort(key=lambda f: (f["bbox"][2] - f["bbox"][0]) * (f["bbox"][3] - f["bbox"][1]), reverse=True)
+    return faces
+
+
+def _load_gallery() -> List[tuple]:
+    """Load the current known_faces gallery (may be empty)."""
+    from face_pipeline.paths import KNOWN_FACES_DIR
+    from face_pipeline.recognition import load_known_embeddings
+
+    known_dir = str(KNOWN_FACES_DIR)
+    if not os.path.isdir(os.path.join(known_dir, "embeddings")):
+        return []
+    return load_known_embeddings(known_dir)
+
+
+def reidentify_faces(
+    detection_json_path: str,
+    embeddings_path: str,
+    known_faces: Optional[List[tuple]] = None,
+    update_mongodb: bool = True,
+    lock_timeout: Optional[float] = VIDEO_LOCK_TIMEOUT,
+) -> Dict[str, Any]:
+    """Re-match stored face embeddings of one video against the known_faces gallery.
+
+    Matches all embeddings in one batched pass, rewrites faces[].label and
+    faces[].recognition_confidence in detection_results.json, in the stage cache
+    faces entry the results came from (so later requests served from the cache keep
+    the new labels) and (optionally) in the MongoDB frames collection, and re-indexes
+    the video in the local search index. No detection is re-run.
+    Holds the video's lock (pipeline.locks, the results directory name is the video id)
+    so a pipeline run of the video cannot interleave its writes; waits up to lock_timeout
+    seconds for it. Returns {video_id, faces, changed, stage_cache, search_index, mongodb},
+    or {"error": ...} (with "busy": True when the lock was not free in time).
+    """
+    video_id = os.path.basename(os.path.dirname(os.path.abspath(detection_json_path)))
+    lock = video_lock(video_id)
+    if not lock.acquire(timeout=lock_timeout):
+        return {"error": "This video is being processed; try again later.", "busy": True}
+    try:
+        return _reidentify_faces_locked(detection_json_path, embeddings_path, known_faces, update_mongodb)
+    finally:
+        lock.release()
+
+
+def _reidentify_faces_locked(
+    detection_json_path: str,
+    embeddings_path: str,
+    known_faces: Optional[List[tuple]],
+    update_mongodb: bool,
+) -> Dict[str, Any]:
+    from face_pipeline.recognition import match_batch
+
+    stored = load_face_embeddings(embeddings_path)
+    if stored is None:
+        return {"error": "No stored face embeddings (process the video again to create them)"}
+    if not os.path.isfile(detection_json_path):
+        return {"error": "detection_results.json not found"}
+    frames, face_idx, embeddings = stored
+    if known_faces is None:
+        known_faces = _load_gallery()
+
+    with open(detection_json_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    video_id = payload.get("video_id", "")
+    frames_by_name = {fr.get("frame"): fr for fr in payload.get("frames") or []}
+
+    matches = match_batch(embeddings, known_faces, RECOGNITION_THRESHOLDS) if len(frames) else []
+    changed_frames: Dict[str, List[Dict[str, Any]]] = {}
+    changed = 0
+    for fname, idx, m in zip(frames, face_idx, matches):
+        entry = frames_by_name.get(fname)
+        faces = (entry or {}).get("faces") or []
+        if idx >= len(faces):
+            continue
+        rec = faces[idx]
+        new_label = m.get("label", "Unknown")
+        new_conf = round(float(m.get("confidence", 0)), 4)
+        if rec.get("label") != new_label or rec.get("recognition_confidence") != new_conf:
+            changed += 1
+            changed_frames[fname] = faces
+        rec["label"] = new_label
+        rec["recognition_confidence"] = new_conf
+
+    if changed:
+        tmp_path = detection_json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, detection_json_path)
+        # Keep the columnar copy (if any) in sync with the JSON
+        from .columnar import has_columnar_results, save_columnar_results
+        columns_dir = os.path.join(os.path.dirname(detection_json_path), "detection_columns")
+        if has_columnar_results(columns_dir):
+            save_columnar_results(payload, columns_dir)
+
+    cache_changed = _relabel_stage_cache(os.path.dirname(detection_json_path), frames, face_idx, matches)
+
+    search_ok = False
+    if changed and video_id:
+        try:
+            from .search_index import index_detection_json
+            index_detection_json(detection_json_path, meta=_load_summary_meta(detection_json_path))
+            search_ok = True
+        except Exception as e:
+            logger.warning("Search index update skipped: %s", e)
+
+    mongo_ok = False
+    if update_mongodb and changed_frames and video_id:
+        try:
+            from pipeline.mongodb_store import update_face_labels
+            mongo_ok = update_face_labels(video_id, changed_frames)
+        except Exception as e:
+            logger.warning("MongoDB face label update skipped: %s", e)
+
+    return {
+        "video_id": video_id,
+        "faces": len(matches),
+        "changed": changed,
+        "stage_cache": cache_changed,
+        "search_index": search_ok,
+        "mongodb": mongo_ok,
+    }
+
+
+def _relabel_stage_cache(
+    base: str,
+    frames: List[str],
+    face_idx: List[int],
+    matches: List[Dict[str, Any]],
+) -> int:
+    """Apply matches to the stage cache faces entry that face_embeddings.npz was copied from
+    (the one the manifest's last "results" stage used). Returns the number of faces changed.
+    """
+    from .manifest import StageManifest
+    from .stage_cache import load_stage, save_stage
+
+    results = StageManifest(os.path.join(base, "manifest.json")).entry("results")
+    key = ((results.get("params") or {}).get("stages") or {}).get("faces")
+    cache_dir = os.path.join(base, "stage_cache")
+    entry = load_stage(cache_dir, key) if key else None
+    if entry is None:
+        return 0
+    changed = 0
+    for fname, idx, m in zip(frames, face_idx, matches):
+        faces = entry["frames"].get(fname) or []
+        if idx >= len(faces):
+            continue
+        rec = faces[idx]
+        new_label = m.get("label", "Unknown")
+        new_conf = round(float(m.get("confidence", 0)), 4)
+        if rec.get("label") != new_label or rec.get("recognition_confidence") != new_conf:
+            changed += 1
+            rec["label"] = new_label
+            rec["recognition_confidence"] = new_conf
+    if changed:
+        save_stage(
+            cache_dir, key, entry.get("stage", "faces"), entry["frames"], entry.get("frame_times"),
+            entry.get("params"), covered=entry.get("covered"),
+        )
+    return changed
+
+
+def _load_summary_meta(detection_json_path: str) -> Dict[str, Any]:
+    """Video metadata from the summary.json next to detection_results.json ({} if missing)."""
+    try:
+        with open(os.path.join(os.path.dirname(detection_json_path), "summary.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("metadata") or {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def reidentify_all_videos(
+    results_dir: str,
+    update_mongodb: bool = True,
+) -> Dict[str, Any]:
+    """Run reidentify_faces for every video under results_dir, loading the gallery once."""
+    known_faces = _load_gallery()
+    per_video: Dict[str, Any] = {}
+    if not os.path.isdir(results_dir):
+        return {"videos": per_video, "known_embeddings": len(known_faces)}
+    for video_id in sorted(os.listdir(results_dir)):
+        base = os.path.join(results_dir, video_id)
+        emb_path = os.path.join(base, "face_embeddings.npz")
+        if not os.path.isfile(emb_path):
+            continue
+        try:
+            per_video[video_id] = reidentify_faces(
+                os.path.join(base, "detection_results.json"),
+                emb_path,
+                known_faces=known_faces,
+                update_mongodb=update_mongodb,
+            )
+        except Exception as e:
+            logger.warning("Re-identify failed for %s: %s", video_id, e)
+            per_video[video_id] = {"error": str(e)}
+    return {"videos": per_video, "known_embeddings": len(known_faces)}
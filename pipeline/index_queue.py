@@ -0,0 +1,226 @@
+"""Durable background queue for MongoDB indexing, off the HTTP request path.
+
+/api/process enqueues a small job per video instead of writing to MongoDB itself:
+
+    index_queue/<video_id>.json
+    {"job_id", "video_id", "source_url", "meta", "run_stats", "by_class",
+     "confidence_threshold", "object_model", "face_model",
+     "detection_json": ".../detection_results.json",
+     "manifest": ".../manifest.json", "manifest_params": {...}, "queued_at"}
+
+Frame documents are rebuilt from detection_results.json when the job runs, so the spool
+stays small. A newer job for the same video replaces the pending one. A worker thread
+takes up to batch_size jobs at a time and writes them together (bulk_index_videos:
+one bulk_write for the video documents, shared upsert chunks for the frames). Jobs stay
+on disk until written, so they survive restarts; while MongoDB is down the worker
+retries with exponential backoff. On success the "index" stage of the video's manifest
+is committed. A job is only taken while its video's lock (pipeline.locks) is free and
+the lock is held until the manifest is committed, so the commit cannot be overwritten
+by a run holding the manifest in memory; jobs of videos being processed wait for a later
+pass. Indexes are created once per process (mongodb_store.ensure_indexes).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from .locks import FileLock, video_lock
+from .manifest import StageManifest
+from .mongodb_store import build_index_documents, bulk_index_videos, is_configured
+from .paths import INDEX_QUEUE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def _job_documents(job: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Video and frame documents for a job, from its detection_results.json."""
+    with open(job["detection_json"], "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    frames = payload.get("frames") or []
+    results_by_frame = {fr.get("frame") or "": fr.get("detections") or [] for fr in frames}
+    faces_by_frame = {fr.get("frame") or "": fr.get("faces") or [] for fr in frames}
+    monuments_by_frame = {fr.get("frame") or "": fr.get("monument") or {} for fr in frames}
+    return build_index_documents(
+        video_id=job["video_id"],
+        source_url=job.get("source_url", ""),
+        meta=job.get("meta") or {},
+        run_stats=job.get("run_stats") or {},
+        results_by_frame=results_by_frame,
+        faces_by_frame=faces_by_frame,
+        monuments_by_frame=monuments_by_frame,
+        by_class=job.get("by_class") or {},
+        confidence_threshold=job.get("confidence_threshold", 0.5),
+        object_model=job.get("object_model", "yolov8n"),
+        face_model=job.get("face_model", "buffalo_l"),
+        frame_times={fr.get("frame") or "": fr["time_sec"] for fr in frames if fr.get("time_sec") is not None},
+    )
+
+
+class IndexQueue:
+    """Spool directory of pending indexing jobs plus the worker thread that drains it."""
+
+    def __init__(
+        self,
+        spool_dir: str = INDEX_QUEUE_DIR,
+        batch_size: int = 8,
+        poll_interval: float = 5.0,
+        max_backoff: float = 300.0,
+    ) -> None:
+        self.spool_dir = spool_dir
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.last_metrics: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def _job_path(self, video_id: str) -> str:
+        return os.path.join(self.spool_dir, video_id + ".json")
+
+    def enqueue(self, job: Dict[str, Any]) -> str:
+        """Spool a job atomically (replacing a pending one for the same video) and wake the worker."""
+        job = dict(job, job_id=uuid.uuid4().hex, queued_at=time.time())
+        path = self._job_path(job["video_id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, default=str)
+        os.replace(tmp_path, path)
+        self._wake.set()
+        return job["job_id"]
+
+    def pending(self) -> List[str]:
+        """Spooled job files, oldest first."""
+        try:
+            names = [n for n in os.listdir(self.spool_dir) if n.endswith(".json")]
+        except OSError:
+            return []
+        paths = [os.path.join(self.spool_dir, n) for n in names]
+        return sorted(paths, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+
+    def _remove_if_unchanged(self, path: str, job_id: str) -> None:
+        """Delete a finished job file unless a newer job for the video replaced it meanwhile."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if json.load(f).get("job_id") != job_id:
+                    return
+            os.remove(path)
+        except (OSError, ValueError):
+            pass
+
+    def process_once(self) -> int:
+        """Write up to batch_size pending jobs in one batch. Returns the number written.
+
+        Raises when MongoDB is unreachable or the write fails (jobs stay spooled). Jobs
+        whose video is locked by a running pipeline are left for a later call.
+        """
+        jobs: List[Tuple[str, Dict[str, Any]]] = []
+        items = []
+        locks: List[FileLock] = []
+        try:
+            for path in self.pending():
+                if len(jobs) >= self.batch_size:
+                    break
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        job = json.load(f)
+                    lock = video_lock(job["video_id"])
+                    if not lock.acquire(timeout=0):
+                        continue
+                    locks.append(lock)
+                    items.append(_job_documents(job))
+                    jobs.append((path, job))
+                except (OSError, ValueError, KeyError) as e:
+                    # Results gone or job unreadable: nothing left to index for it
+                    logger.warning("Dropping index job %s: %s", path, e)
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            if not jobs:
+                return 0
+            metrics = bulk_index_videos(items)
+            if metrics is None:
+                raise RuntimeError("MongoDB unavailable or write failed")
+            self.last_metrics = metrics
+            for path, job in jobs:
+                if job.get("manifest"):
+                    try:
+                        StageManifest(job["manifest"]).commit(
+                            "index", job.get("manifest_params") or {}, {"mongodb": True},
+                        )
+                    except Exception as e:
+                        logger.debug("Manifest commit failed for %s: %s", job["video_id"], e)
+                self._remove_if_unchanged(path, job["job_id"])
+        finally:
+            for lock in locks:
+                lock.release()
+        print(
+            f"[mongo] Indexed {', '.join(repr(job['video_id']) for _, job in jobs)} into MongoDB "
+            f"({metrics['frames']} frames, {metrics['frames_per_sec']} frames/s, {metrics['deleted']} stale deleted)."
+        )
+        return len(jobs)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                done = self.process_once()
+                self.last_error = None
+                backoff = 1.0
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("MongoDB indexing failed, retrying in %.0fs: %s", backoff, e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            if not done:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self) -> None:
+        """Start the worker thread (daemon) if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mongo-index-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending()),
+            "running": self._thread is not None and self._thread.is_alive(),
+            "last_error": self.last_error,
+            "last_metrics": self.last_metrics,
+        }
+
+
+_queue: Optional[IndexQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_index_queue(start: bool = True) -> Optional[IndexQueue]:
+    """Process-wide queue (worker started on first use), or None when MongoDB is not configured."""
+    global _queue
+    if not is_configured():
+        return None
+    with _queue_lock:
+        if _queue is None:
+            _queue = IndexQueue()
+        if start:
+            _queue.start()
+    return _queue
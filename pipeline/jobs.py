@@ -0,0 +1,271 @@
+"""Background jobs for long-running requests (video processing) in worker processes.
+
+POST /api/jobs stores a job and returns its id at once; a bounded pool of worker
+processes (VISTA_JOB_WORKERS, default 2) runs the jobs and GET /api/jobs/<id> polls them:
+
+    jobs/<job_id>.json
+    {"job_id", "kind": "process", "status": "queued" | "running" | "completed" | "failed",
+     "params": {...request payload...}, "video_id", "created_at", "started_at",
+     "finished_at", "worker_pid", "result": {...response body...}, "http_status", "error"}
+
+Job files are replaced atomically by the process that changes them (the server on
+submit, the worker when it starts and finishes), so any process can read the status.
+At most VISTA_JOB_QUEUE_MAX jobs (default 100) are queued or running at a time; submit
+raises JobQueueFull beyond that. Submitting the same kind and params as a job that is
+still queued or running returns that job (with "attached": true) instead of a new one.
+Jobs still queued or running when the server stopped are resubmitted on start (the
+stage manifest makes a video resume where it stopped).
+Finished jobs older than VISTA_JOB_RETENTION_SEC (default 7 days) are deleted on start.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .paths import JOBS_DIR
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = max(1, int(os.environ.get("VISTA_JOB_WORKERS", "2")))
+JOB_QUEUE_MAX = max(1, int(os.environ.get("VISTA_JOB_QUEUE_MAX", "100")))
+JOB_RETENTION_SEC = float(os.environ.get("VISTA_JOB_RETENTION_SEC", str(7 * 24 * 3600)))
+
+FINISHED = ("completed", "failed")
+
+
+class JobQueueFull(Exception):
+    """Too many jobs queued or running."""
+
+
+def job_key(kind: str, params: Dict[str, Any]) -> str:
+    """Identity of a request: jobs with the same key would compute the same result."""
+    blob = json.dumps({"kind": kind, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """Job records as one JSON file per job."""
+
+    def __init__(self, jobs_dir: str = JOBS_DIR) -> None:
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id + ".json")
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["job_id"])
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, default=str)
+        os.replace(tmp_path, path)
+
+    def create(self, kind: str, params: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "created_at": time.time(),
+            **fields,
+        }
+        self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        self._write(job)
+        return job
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first."""
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if name.endswith(".json"):
+                job = self.get(name[: -len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        jobs.sort(key=lambda j: j.get("created_at", 0), reverse=True)
+        return jobs[:limit]
+
+    def prune(self, max_age: float = JOB_RETENTION_SEC) -> int:
+        """Delete finished jobs older than max_age seconds. Returns the number deleted."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for job in self.list(limit=1 << 30):
+            if job.get("status") in FINISHED and (job.get("finished_at") or 0) < cutoff:
+                try:
+                    os.remove(self._path(job["job_id"]))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def _execute(
+    jobs_dir: str,
+    job_id: str,
+    target: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+    params: Dict[str, Any],
+) -> None:
+    """Worker process: run target(params) -> (result body, http status) and record it."""
+    store = JobStore(jobs_dir)
+    store.update(job_id, status="running", started_at=time.time(), worker_pid=os.getpid())
+    try:
+        result, http_status = target(params)
+    except Exception as e:
+        logger.warning("Job %s failed: %s", job_id, e, exc_info=True)
+        store.update(job_id, status="failed", error=str(e), finished_at=time.time())
+        return
+    ok = int(http_status) < 400
+    store.update(
+        job_id,
+        status="completed" if ok else "failed",
+        result=result,
+        http_status=int(http_status),
+        error=None if ok else (result or {}).get("error"),
+        finished_at=time.time(),
+    )
+
+
+class JobPool:
+    """Bounded pool of worker processes running jobs from a JobStore.
+
+    target: module-level (picklable) callable(params) -> (result dict, http status),
+    executed in the worker processes. Workers are started with "spawn" so they do not
+    inherit the server's threads or an initialized GPU context.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]],
+        workers: int = JOB_WORKERS,
+        max_pending: int = JOB_QUEUE_MAX,
+        store: Optional[JobStore] = None,
+    ) -> None:
+        self.target = target
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.store = store or JobStore()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Any] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _dispatch(self, job: Dict[str, Any]) -> Optional[Any]:
+        """Hand a job to the executor (called with self._lock held).
+
+        Returns the future, or None when the job could not be submitted and was marked
+        failed. The caller registers _watch(job_id, future) after releasing the lock:
+        a future that is already done runs its callback at once, and _on_done takes
+        the lock.
+        """
+        for attempt in range(2):
+            try:
+                future = self._get_executor().submit(
+                    _execute, self.store.jobs_dir, job["job_id"], self.target, job["params"],
+                )
+            except BrokenProcessPool as e:
+                # A worker died since the last submit; retry once on a fresh pool
+                self._executor = None
+                if attempt:
+                    logger.warning("Could not submit job %s: %s", job["job_id"], e)
+                    self.store.update(job["job_id"], status="failed", error=f"Worker pool failed: {e}", finished_at=time.time())
+                    return None
+                continue
+            self._inflight[job["job_id"]] = future
+            return future
+        return None
+
+    def _watch(self, job_id: str, future: Optional[Any]) -> None:
+        if future is not None:
+            future.add_done_callback(lambda fut: self._on_done(job_id, fut))
+
+    def _on_done(self, job_id: str, future: Any) -> None:
+        with self._lock:
+            self._inflight.pop(job_id, None)
+            error = future.exception() if not future.cancelled() else None
+            if isinstance(error, BrokenProcessPool):
+                # A worker died (e.g. out of memory); later submits get a fresh pool
+                self._executor = None
+        if error is not None:
+            job = self.store.get(job_id)
+            if job is not None and job.get("status") not in FINISHED:
+                self.store.update(job_id, status="failed", error=f"Worker process failed: {error}", finished_at=time.time())
+
+    def submit(self, kind: str, params: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+        """Store a job and queue it, or return the identical job already in flight.
+
+        Raises JobQueueFull when max_pending jobs are in flight.
+        """
+        key = job_key(kind, params)
+        with self._lock:
+            for job_id in self._inflight:
+                job = self.store.get(job_id)
+                if job is not None and job.get("key") == key and job.get("status") not in FINISHED:
+                    return {**job, "attached": True}
+            if len(self._inflight) >= self.max_pending:
+                raise JobQueueFull(f"{len(self._inflight)} jobs queued or running")
+            job = self.store.create(kind, params, key=key, **fields)
+            future = self._dispatch(job)
+        if future is None:
+            return self.store.get(job["job_id"]) or job
+        self._watch(job["job_id"], future)
+        return job
+
+    def recover(self) -> int:
+        """Resubmit jobs left queued or running by a previous server process; prune old ones."""
+        self.store.prune()
+        dispatched = []
+        # The newest max_pending unfinished jobs, oldest first (finished ones must not use up the limit)
+        unfinished = [j for j in self.store.list(limit=1 << 30) if j.get("status") not in FINISHED]
+        with self._lock:
+            for job in reversed(unfinished[: self.max_pending]):
+                if job["job_id"] in self._inflight:
+                    continue
+                self.store.update(job["job_id"], status="queued", resumed_at=time.time())
+                dispatched.append((job["job_id"], self._dispatch(job)))
+        for job_id, future in dispatched:
+            self._watch(job_id, future)
+        resumed = sum(1 for _, future in dispatched if future is not None)
+        if resumed:
+            logger.info("Resubmitted %d unfinished job(s)", resumed)
+        return resumed
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.workers, "in_flight": len(self._inflight), "max_pending": self.max_pending}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,89 @@
+"""Per-video advisory file locks: one pipeline run at a time per video, across processes.
+
+Two runs of the same video would both download it, clear and refill frames/<video_id>/
+and write the same results/<video_id>/ files. /api/process (and so /api/jobs workers)
+and implementation.py hold locks/<video_id>.lock while they run; a concurrent request
+for the video waits for it and then finds the first run's results in the cache.
+
+The lock is flock (fcntl) on POSIX and msvcrt.locking on Windows. Both belong to the
+open file, so the lock excludes threads of one server as well as other processes, and
+the OS releases it if the holder dies.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Optional
+
+from .paths import LOCKS_DIR
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt  # type: ignore
+
+VIDEO_LOCK_TIMEOUT = float(os.environ.get("VISTA_VIDEO_LOCK_TIMEOUT", "3600"))
+
+
+class FileLock:
+    """Exclusive lock on a file; acquire() polls so that a timeout can be applied."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None, poll_interval: float = 0.2) -> bool:
+        """Take the lock, waiting up to timeout seconds (None: forever). False on timeout."""
+        if self._fd is not None:
+            raise RuntimeError(f"{self.path} is already locked by this object")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                return False
+            time.sleep(poll_interval)
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+def video_lock(video_id: str) -> FileLock:
+    """The lock serializing pipeline runs of video_id (validate the id first)."""
+    return FileLock(os.path.join(LOCKS_DIR, video_id + ".lock"))
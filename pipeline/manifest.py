@@ -0,0 +1,116 @@
+"""Per-video stage manifest for checkpoint/resume of the processing pipeline.
+
+results/<video_id>/manifest.json records, for each pipeline stage, the parameters it
+ran with, its outputs and whether it completed:
+
+    {"video_id": "...",
+     "stages": {"extract": {"status": "done", "params": {...}, "outputs": {...},
+                            "started_at": ..., "finished_at": ..., "sec": 12.3}, ...}}
+
+A stage is committed only after its outputs are fully written, and every manifest
+update is an atomic replace, so after a crash a rerun skips each stage whose
+parameters match a committed entry and resumes from the first incomplete one.
+Parameters include the keys of upstream outputs, so a changed upstream stage makes
+the downstream entries mismatch instead of being reused.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+PIPELINE_STAGES = ("download", "extract", "objects", "faces", "monuments", "render", "results", "index")
+
+
+def _normalize(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Round-trip through JSON so stored and fresh params compare equal (tuples, floats...)."""
+    return json.loads(json.dumps(params, sort_keys=True, default=str))
+
+
+class StageManifest:
+    """Read and atomically update results/<video_id>/manifest.json."""
+
+    def __init__(self, path: str, video_id: Optional[str] = None) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = {"video_id": video_id, "stages": {}}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict) and isinstance(loaded.get("stages"), dict):
+                self.data = loaded
+        except (OSError, ValueError):
+            pass
+        if video_id:
+            self.data["video_id"] = video_id
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def entry(self, stage: str) -> Dict[str, Any]:
+        return self.data["stages"].get(stage) or {}
+
+    def completed(
+        self,
+        stage: str,
+        params: Dict[str, Any],
+        validate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Outputs of the stage if it was committed with the same params (and validate(outputs) holds)."""
+        entry = self.entry(stage)
+        if entry.get("status") != "done" or entry.get("params") != _normalize(params):
+            return None
+        outputs = entry.get("outputs") or {}
+        if validate is not None:
+            try:
+                if not validate(outputs):
+                    return None
+            except Exception:
+                return None
+        return outputs
+
+    def begin(self, stage: str, params: Dict[str, Any]) -> None:
+        """Mark the stage as running (a crash leaves it incomplete)."""
+        self.data["stages"][stage] = {
+            "status": "running",
+            "params": _normalize(params),
+            "started_at": time.time(),
+        }
+        self._save()
+
+    def commit(
+        self,
+        stage: str,
+        params: Dict[str, Any],
+        outputs: Optional[Dict[str, Any]] = None,
+        sec: Optional[float] = None,
+    ) -> None:
+        """Record the stage as done; call only after its outputs are on disk."""
+        entry = self.entry(stage)
+        self.data["stages"][stage] = {
+            "status": "done",
+            "params": _normalize(params),
+            "outputs": _normalize(outputs or {}),
+            "started_at": entry.get("started_at"),
+            "finished_at": time.time(),
+            "sec": None if sec is None else round(float(sec), 2),
+        }
+        self._save()
+
+    def fail(self, stage: str, error: str) -> None:
+        entry = dict(self.entry(stage))
+        entry.update({"status": "failed", "error": str(error), "finished_at": time.time()})
+        self.data["stages"][stage] = entry
+        self._save()
+
+    def first_incomplete(self, stages: Iterable[str] = PIPELINE_STAGES) -> Optional[str]:
+        """First stage (in order) that is not committed, or None when all are done."""
+        for stage in stages:
+            if self.entry(stage).get("status") != "done":
+                return stage
+        return None
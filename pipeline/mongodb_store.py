@@ -5,6 +5,26 @@ so a separate search engine project can query by face label, object label, etc.
 
 Set MONGODB_URI (or MONGO_URI) in .env or environment to enable; optional VISTA_DB_NAME (default: vista_search).
 If MONGODB_URI is not set, indexing is skipped.
+
+Frame documents are written in one of two schemas (VISTA_MONGO_FRAME_SCHEMA):
+
+    full     frames collection, the shape build_index_documents returns (default)
+    compact  frames_compact collection, short keys, integer bboxes, confidences in
+             per-mille, names replaced by ids from the frame_dict collection:
+
+             {"video_id", "n": frame_index, "t": time_sec, "v": 2,
+              "o": [{"c": class id, "k": color id, "p": conf, "b": [x1, y1, x2, y2],
+                     "l": label (only when not "<color> <class>")}],
+              "f": [{"l": face id, "p": confidence, "r": recognition_confidence, "b": [...]}],
+              "m": {"l": monument id, "p": confidence, "b": [...]},
+              "fn": frame_filename (only when not frame_<n:06d>.jpg)}
+
+             Empty lists and dicts are omitted. frame_dict holds {kind, name, id} with kind
+             in class / color / face / monument.
+
+Readers go through find_frames (decode_frame_document), which returns the full shape
+whichever schema a video was written in. Re-indexing a video moves it to the configured
+schema (its documents in the other collection are deleted).
 """
 
 from __future__ import annotations
@@ -12,9 +32,11 @@ from __future__ import annotations
 import logging
 import os
 import re
+import time
+import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 # Load .env from repo root so MONGODB_URI is set when running scripts or one-liners from repo root
 def _load_dotenv() -> None:
@@ -38,15 +60,42 @@ DEFAULT_DB_NAME = "vista_search"
 # Collection names
 VIDEOS_COLLECTION = "videos"
 FRAMES_COLLECTION = "frames"
+FRAMES_COMPACT_COLLECTION = "frames_compact"
+DICTIONARY_COLLECTION = "frame_dict"
+SEGMENTS_COLLECTION = "segments"
+LABEL_STATS_COLLECTION = "label_stats"
+LABEL_VIDEOS_COLLECTION = "label_videos"
+
+# Segment kinds (one per label source in a frame document)
+SEGMENT_KINDS = ("face", "object", "monument")
+
+# Frame documents per bulk_write round trip (env VISTA_MONGO_BULK_CHUNK)
+BULK_CHUNK_SIZE = int(os.environ.get("VISTA_MONGO_BULK_CHUNK", "1000"))
+
+# Frame document schema for writes (env VISTA_MONGO_FRAME_SCHEMA), see module docstring
+FRAME_SCHEMAS = ("full", "compact")
+FRAME_SCHEMA = os.environ.get("VISTA_MONGO_FRAME_SCHEMA", "full").strip().lower()
+if FRAME_SCHEMA not in FRAME_SCHEMAS:
+    FRAME_SCHEMA = "full"
+COMPACT_SCHEMA_VERSION = 2
+# Name kinds encoded as ids in compact frame documents
+DICTIONARY_KINDS = ("class", "color", "face", "monument")
 
 _client: Any = None
 _db: Any = None
+# Set once ensure_indexes succeeded in this process
+_indexes_ready = False
 
 
 def _get_uri() -> Optional[str]:
     return os.environ.get("MONGODB_URI") or os.environ.get("MONGO_URI")
 
 
+def is_configured() -> bool:
+    """True when a MongoDB URI is set (the server may still be unreachable)."""
+    return bool(_get_uri())
+
+
 def get_client():
     """Return pymongo MongoClient or None if MongoDB is not configured."""
     global _client
@@ -77,7 +126,10 @@ def get_db():
 
 
 def ensure_indexes() -> bool:
-    """Create indexes on videos and frames. Call once at startup or before first write."""
+    """Create indexes on videos and frames (once per process; later calls return at once)."""
+    global _indexes_ready
+    if _indexes_ready:
+        return True
     db = get_db()
     if db is None:
         return False
@@ -92,6 +144,23 @@ def ensure_indexes() -> bool:
         frames.create_index("objects.color")
         frames.create_index("objects.label")
         frames.create_index("monument.label")
+        compact = db[FRAMES_COMPACT_COLLECTION]
+        compact.create_index([("video_id", 1), ("n", 1)], unique=True)
+        compact.create_index("f.l")
+        compact.create_index("o.c")
+        compact.create_index("o.k")
+        compact.create_index("m.l")
+        dictionary = db[DICTIONARY_COLLECTION]
+        dictionary.create_index([("kind", 1), ("name", 1)], unique=True)
+        dictionary.create_index([("kind", 1), ("id", 1)], unique=True)
+        segments = db[SEGMENTS_COLLECTION]
+        segments.create_index(
+            [("video_id", 1), ("kind", 1), ("label", 1), ("start_sec", 1)], unique=True,
+        )
+        # "Where does X appear": label (and kind) first, then per video in time order
+        segments.create_index([("label", 1), ("kind", 1), ("video_id", 1), ("start_sec", 1)])
+        _label_stats_indexes(db[LABEL_STATS_COLLECTION], db[LABEL_VIDEOS_COLLECTION])
+        _indexes_ready = True
         return True
     except Exception as e:
         logger.warning("MongoDB ensure_indexes failed: %s", e)
@@ -119,20 +188,651 @@ def upsert_video(video_doc: Dict[str, Any]) -> bool:
         return False
 
 
-def replace_frames_for_video(video_id: str, frames_docs: List[Dict[str, Any]]) -> bool:
-    """Delete all frames for this video_id and insert the new list."""
+def bulk_upsert_frames(
+    video_id: str,
+    frames_docs: Iterable[Dict[str, Any]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    db: Any = None,
+    schema: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Write the frames of one video as chunked, unordered upserts; delete only vanished frames.
+
+    Each document replaces the one with the same (video_id, frame_filename), so reindexing is
+    idempotent and the video never has a moment with no frames (unlike delete + insert).
+    Documents are stamped with an index_run id; frames of this video not written by this
+    run are deleted afterwards in one delete_many. frames_docs may be a generator.
+    db: database to write to (default get_db(); e.g. a mongomock database for benchmarks).
+    schema: "full" or "compact" frame documents (default FRAME_SCHEMA).
+    Returns throughput metrics {frames, chunks, upserted, modified, matched, deleted, sec,
+    frames_per_sec}, or None when MongoDB is not configured or a write failed.
+    """
+    if db is None:
+        db = get_db()
+    if db is None:
+        return None
+    try:
+        return _upsert_frames(
+            db, [video_id], (dict(doc, video_id=video_id) for doc in frames_docs), chunk_size, schema,
+        )
+    except Exception as e:
+        logger.warning("MongoDB bulk_upsert_frames failed: %s", e)
+        return None
+
+
+def _upsert_frames(
+    db: Any,
+    video_ids: List[str],
+    frames_docs: Iterable[Dict[str, Any]],
+    chunk_size: int,
+    schema: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Chunked unordered upserts of frame documents (each carrying its video_id), then one
+    delete_many of the frames of video_ids that this run did not write. Raises on failure.
+
+    schema: "full" or "compact" (default FRAME_SCHEMA); the videos' frames stored in the
+    other schema's collection are deleted afterwards.
+    """
+    schema = schema or FRAME_SCHEMA
+    if schema == "compact":
+        stats = _upsert_docs(
+            db[FRAMES_COMPACT_COLLECTION], ("video_id", "n"), video_ids,
+            _encode_chunks(FrameDictionary(db), frames_docs, chunk_size), chunk_size,
+        )
+        other = FRAMES_COLLECTION
+    else:
+        stats = _upsert_docs(db[FRAMES_COLLECTION], ("video_id", "frame_filename"), video_ids, frames_docs, chunk_size)
+        other = FRAMES_COMPACT_COLLECTION
+    stats["deleted"] += db[other].delete_many({"video_id": {"$in": list(video_ids)}}).deleted_count
+    return stats
+
+
+class FrameDictionary:
+    """Small integer ids for class / color / face / monument names (frame_dict collection).
+
+    Ids are dense per kind and never reused; names are cached per process. New names are
+    inserted with the next free ids; a writer that races another one on the same ids gets
+    a duplicate key error, reloads and allocates again.
+    """
+
+    def __init__(self, db: Any) -> None:
+        self.coll = db[DICTIONARY_COLLECTION]
+        self._ids: Dict[str, Dict[str, int]] = {k: {} for k in DICTIONARY_KINDS}
+        self._names: Dict[str, Dict[int, str]] = {k: {} for k in DICTIONARY_KINDS}
+        self._loaded = False
+
+    def load(self) -> None:
+        for d in self.coll.find({"kind": {"$in": list(DICTIONARY_KINDS)}}, {"_id": 0, "kind": 1, "name": 1, "id": 1}):
+            self._ids[d["kind"]][d["name"]] = int(d["id"])
+            self._names[d["kind"]][int(d["id"])] = d["name"]
+        self._loaded = True
+
+    def ensure(self, names_by_kind: Dict[str, Iterable[str]]) -> None:
+        """Allocate ids for the names not in the dictionary yet."""
+        from pymongo.errors import BulkWriteError
+
+        wanted = {kind: set(names) for kind, names in names_by_kind.items()}
+        for _ in range(5):
+            missing = {kind: sorted(n for n in names if n not in self._ids[kind]) for kind, names in wanted.items()}
+            if not any(missing.values()):
+                return
+            if not self._loaded:
+                self.load()
+                continue
+            docs = []
+            for kind, names in missing.items():
+                start = max(self._names[kind], default=-1) + 1
+                docs.extend({"kind": kind, "name": name, "id": start + i} for i, name in enumerate(names))
+            try:
+                self.coll.insert_many(docs, ordered=False)
+            except BulkWriteError:
+                # Another writer took some of these ids or names: reload and try again
+                self.load()
+                continue
+            for d in docs:
+                self._ids[d["kind"]][d["name"]] = d["id"]
+                self._names[d["kind"]][d["id"]] = d["name"]
+            return
+        raise RuntimeError("frame_dict: could not allocate ids")
+
+    def id(self, kind: str, name: str) -> int:
+        return self._ids[kind][name]
+
+    def name(self, kind: str, id_: int) -> str:
+        if id_ not in self._names[kind]:
+            self.load()
+        return self._names[kind].get(id_, "unknown")
+
+    def find_id(self, kind: str, name: str) -> Optional[int]:
+        """Id of a name for queries (None if it was never stored)."""
+        if name not in self._ids[kind]:
+            self.load()
+        return self._ids[kind].get(name)
+
+
+def _permille(value: Any) -> int:
+    return int(round(float(value or 0) * 1000))
+
+
+def _int_bbox(bbox: Any) -> List[int]:
+    return [int(round(float(v))) for v in (bbox or [])[:4]]
+
+
+def _canonical_frame_name(frame_index: int) -> str:
+    return f"frame_{frame_index:06d}.jpg"
+
+
+def encode_frame_document(doc: Dict[str, Any], dictionary: FrameDictionary) -> Dict[str, Any]:
+    """Compact form of a full frame document (names must already be in dictionary, see ensure)."""
+    n = int(doc.get("frame_index", 0))
+    out: Dict[str, Any] = {"video_id": doc["video_id"], "n": n, "t": doc.get("time_sec", 0), "v": COMPACT_SCHEMA_VERSION}
+    if doc.get("frame_filename") and doc["frame_filename"] != _canonical_frame_name(n):
+        out["fn"] = doc["frame_filename"]
+    objects = []
+    for obj in doc.get("objects") or []:
+        cls, color = obj.get("class", "unknown"), obj.get("color", "")
+        o: Dict[str, Any] = {"c": dictionary.id("class", cls), "k": dictionary.id("color", color), "p": _permille(obj.get("conf"))}
+        if obj.get("bbox"):
+            o["b"] = _int_bbox(obj["bbox"])
+        if (obj.get("label") or "") != (color + " " + cls).strip():
+            o["l"] = obj.get("label") or ""
+        objects.append(o)
+    if objects:
+        out["o"] = objects
+    faces = []
+    for face in doc.get("faces") or []:
+        f: Dict[str, Any] = {"l": dictionary.id("face", face.get("label") or "Unknown"), "p": _permille(face.get("confidence"))}
+        if face.get("recognition_confidence"):
+            f["r"] = _permille(face["recognition_confidence"])
+        if face.get("bbox"):
+            f["b"] = _int_bbox(face["bbox"])
+        faces.append(f)
+    if faces:
+        out["f"] = faces
+    mon = doc.get("monument") or {}
+    if mon:
+        m: Dict[str, Any] = {"l": dictionary.id("monument", mon.get("label") or "Unknown"), "p": _permille(mon.get("confidence"))}
+        if mon.get("bbox"):
+            m["b"] = _int_bbox(mon["bbox"])
+        out["m"] = m
+    return out
+
+
+def _dictionary_names(docs: Iterable[Dict[str, Any]]) -> Dict[str, set]:
+    names: Dict[str, set] = {k: set() for k in DICTIONARY_KINDS}
+    for doc in docs:
+        for obj in doc.get("objects") or []:
+            names["class"].add(obj.get("class", "unknown"))
+            names["color"].add(obj.get("color", ""))
+        for face in doc.get("faces") or []:
+            names["face"].add(face.get("label") or "Unknown")
+        if doc.get("monument"):
+            names["monument"].add(doc["monument"].get("label") or "Unknown")
+    return names
+
+
+def _encode_chunks(
+    dictionary: FrameDictionary,
+    frames_docs: Iterable[Dict[str, Any]],
+    chunk_size: int,
+) -> Iterable[Dict[str, Any]]:
+    """Encode full frame documents chunk by chunk (one dictionary round trip per chunk at most)."""
+    chunk: List[Dict[str, Any]] = []
+
+    def flush():
+        dictionary.ensure(_dictionary_names(chunk))
+        return [encode_frame_document(doc, dictionary) for doc in chunk]
+
+    for doc in frames_docs:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
+
+
+def decode_frame_document(doc: Dict[str, Any], dictionary: Optional[FrameDictionary] = None) -> Dict[str, Any]:
+    """Full-shape frame document from either schema (full documents are returned as they are)."""
+    if doc.get("v") != COMPACT_SCHEMA_VERSION:
+        return doc
+    n = int(doc.get("n", 0))
+    out: Dict[str, Any] = {
+        "video_id": doc.get("video_id"),
+        "frame_filename": doc.get("fn") or _canonical_frame_name(n),
+        "frame_index": n,
+        "time_sec": doc.get("t", 0),
+    }
+    objects = []
+    for o in doc.get("o") or []:
+        cls, color = dictionary.name("class", o["c"]), dictionary.name("color", o["k"])
+        obj = {"class": cls, "color": color, "label": o.get("l", (color + " " + cls).strip()), "conf": o.get("p", 0) / 1000}
+        if "b" in o:
+            obj["bbox"] = o["b"]
+        objects.append(obj)
+    out["objects"] = objects
+    out["faces"] = [
+        {
+            "label": dictionary.name("face", f["l"]),
+            "confidence": f.get("p", 0) / 1000,
+            "recognition_confidence": f.get("r", 0) / 1000,
+            "bbox": f.get("b", []),
+        }
+        for f in doc.get("f") or []
+    ]
+    m = doc.get("m")
+    out["monument"] = (
+        {"label": dictionary.name("monument", m["l"]), "confidence": m.get("p", 0) / 1000, "bbox": m.get("b", [])}
+        if m else {}
+    )
+    return out
+
+
+def find_frames(video_id: str, db: Any = None) -> List[Dict[str, Any]]:
+    """All frame documents of a video in the full shape, whichever schema stores them."""
+    if db is None:
+        db = get_db()
+        if db is None:
+            return []
+    docs = list(db[FRAMES_COMPACT_COLLECTION].find({"video_id": video_id}, {"_id": 0, "index_run": 0}))
+    if docs:
+        dictionary = FrameDictionary(db)
+        dictionary.load()
+        return [decode_frame_document(d, dictionary) for d in docs]
+    return list(db[FRAMES_COLLECTION].find({"video_id": video_id}, {"_id": 0, "index_run": 0}))
+
+
+def _upsert_docs(
+    coll: Any,
+    key_fields: Tuple[str, ...],
+    video_ids: List[str],
+    docs: Iterable[Dict[str, Any]],
+    chunk_size: int,
+    count_key: str = "frames",
+    scope: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Upsert docs keyed on key_fields in unordered chunks, stamped with a run id; then delete
+    the documents of video_ids (within scope, an extra filter) that this run did not write."""
+    from pymongo import ReplaceOne
+
+    run_id = uuid.uuid4().hex
+    stats = {count_key: 0, "chunks": 0, "upserted": 0, "modified": 0, "matched": 0, "deleted": 0}
+    t0 = time.perf_counter()
+
+    def flush(ops: List[Any]) -> None:
+        result = coll.bulk_write(ops, ordered=False)
+        stats["chunks"] += 1
+        stats["upserted"] += result.upserted_count
+        stats["modified"] += result.modified_count
+        stats["matched"] += result.matched_count
+
+    ops: List[Any] = []
+    for doc in docs:
+        doc = dict(doc, index_run=run_id)
+        ops.append(ReplaceOne({k: doc[k] for k in key_fields}, doc, upsert=True))
+        stats[count_key] += 1
+        if len(ops) >= chunk_size:
+            flush(ops)
+            ops = []
+    if ops:
+        flush(ops)
+    stale = dict(scope or {}, video_id={"$in": list(video_ids)}, index_run={"$ne": run_id})
+    stats["deleted"] = coll.delete_many(stale).deleted_count
+    sec = time.perf_counter() - t0
+    stats["sec"] = round(sec, 3)
+    stats[count_key + "_per_sec"] = round(stats[count_key] / sec, 1) if sec > 0 else 0.0
+    return stats
+
+
+def _frames_in_order(frames_docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(frames_docs, key=lambda d: (d.get("frame_index", 0), d.get("frame_filename", "")))
+
+
+def _sample_interval(times: List[float]) -> float:
+    """Median spacing between consecutive sample times (1.0 when unknown)."""
+    diffs = sorted(b - a for a, b in zip(times, times[1:]) if b > a)
+    return diffs[len(diffs) // 2] if diffs else 1.0
+
+
+def _frame_labels(frame: Dict[str, Any], kinds: Iterable[str] = SEGMENT_KINDS) -> Dict[Tuple[str, str], float]:
+    """{(kind, label): best confidence} of one frame document (Unknown faces/monuments skipped)."""
+    present: Dict[Tuple[str, str], float] = {}
+    if "object" in kinds:
+        for obj in frame.get("objects") or []:
+            if obj.get("label"):
+                key = ("object", obj["label"])
+                present[key] = max(present.get(key, 0.0), float(obj.get("conf", 0)))
+    if "face" in kinds:
+        for face in frame.get("faces") or []:
+            if face.get("label") and face["label"] != "Unknown":
+                key = ("face", face["label"])
+                present[key] = max(present.get(key, 0.0), float(face.get("recognition_confidence", 0)))
+    mon = frame.get("monument") or {}
+    if "monument" in kinds and mon.get("label") and mon["label"] != "Unknown":
+        present[("monument", mon["label"])] = float(mon.get("confidence", 0))
+    return present
+
+
+def build_segment_documents(
+    video_id: str,
+    frames_docs: List[Dict[str, Any]],
+    kinds: Iterable[str] = SEGMENT_KINDS,
+) -> List[Dict[str, Any]]:
+    """Collapse consecutive frames sharing a label into time-range documents.
+
+    A segment is a run of consecutive sampled frames (in frame order) in which the label
+    appears: {video_id, kind, label, start_sec, end_sec, max_conf, frame_count,
+    start_frame, end_frame}. Unknown faces and monuments are not segmented. A gap of more
+    than 1.5 sample intervals between consecutive samples (separately scanned windows,
+    e.g. 0-180 s and 600-780 s) ends every segment, so none spans seconds never analysed.
+    """
+    kinds = set(kinds)
+    frames = _frames_in_order(frames_docs)
+    times = [float(frame.get("time_sec", 0)) for frame in frames]
+    max_gap = 1.5 * _sample_interval(times)
+    open_runs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    segments: List[Dict[str, Any]] = []
+    for frame, t in zip(frames, times):
+        present = _frame_labels(frame, kinds)
+        for key in [k for k, run in open_runs.items() if k not in present or t - run["end_sec"] > max_gap]:
+            segments.append(open_runs.pop(key))
+        for (kind, label), conf in present.items():
+            run = open_runs.get((kind, label))
+            if run is None:
+                open_runs[(kind, label)] = {
+                    "video_id": video_id, "kind": kind, "label": label,
+                    "start_sec": t, "end_sec": t, "max_conf": round(conf, 4), "frame_count": 1,
+                    "start_frame": frame.get("frame_filename"), "end_frame": frame.get("frame_filename"),
+                }
+            else:
+                run["end_sec"] = t
+                run["end_frame"] = frame.get("frame_filename")
+                run["max_conf"] = max(run["max_conf"], round(conf, 4))
+                run["frame_count"] += 1
+    segments.extend(open_runs.values())
+    segments.sort(key=lambda s: (s["kind"], s["label"], s["start_sec"]))
+    return segments
+
+
+def _upsert_segments(
+    db: Any,
+    video_ids: List[str],
+    segments: Iterable[Dict[str, Any]],
+    chunk_size: int,
+    kinds: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Upsert segment documents and delete the stale ones of video_ids (of these kinds only)."""
+    return _upsert_docs(
+        db[SEGMENTS_COLLECTION], ("video_id", "kind", "label", "start_sec"), video_ids, segments, chunk_size,
+        count_key="segments", scope={"kind": {"$in": kinds}} if kinds else None,
+    )
+
+
+def label_counts(
+    frames_docs: Iterable[Dict[str, Any]],
+    kinds: Iterable[str] = SEGMENT_KINDS,
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Per-video label statistics: {(kind, label): {frames, first_sec, last_sec}}."""
+    kinds = set(kinds)
+    counts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for frame in _frames_in_order(frames_docs):
+        t = float(frame.get("time_sec", 0))
+        for key in _frame_labels(frame, kinds):
+            entry = counts.get(key)
+            if entry is None:
+                counts[key] = {"frames": 1, "first_sec": t, "last_sec": t}
+            else:
+                entry["frames"] += 1
+                entry["last_sec"] = t
+    return counts
+
+
+def _label_stats_indexes(stats: Any, rows: Any) -> None:
+    stats.create_index([("kind", 1), ("label", 1)], unique=True)
+    # Facets: top labels of a kind in one indexed, sorted read
+    stats.create_index([("kind", 1), ("total_frames", -1)])
+    rows.create_index([("kind", 1), ("label", 1), ("video_id", 1)], unique=True)
+    rows.create_index("video_id")
+
+
+def _refresh_label_totals(stats: Any, rows: Any, keys: Iterable[Tuple[str, str]]) -> None:
+    """Recompute total_frames / video_count of the (kind, label) keys from their label_videos rows."""
+    from pymongo import DeleteOne, UpdateOne
+
+    by_kind: Dict[str, List[str]] = {}
+    for kind, label in keys:
+        by_kind.setdefault(kind, []).append(label)
+    for kind, labels in by_kind.items():
+        totals = {
+            d["_id"]: d for d in rows.aggregate([
+                {"$match": {"kind": kind, "label": {"$in": labels}}},
+                {"$group": {"_id": "$label", "total_frames": {"$sum": "$frames"}, "video_count": {"$sum": 1}}},
+            ])
+        }
+        ops: List[Any] = []
+        for label in labels:
+            t = totals.get(label)
+            if t is None:
+                ops.append(DeleteOne({"kind": kind, "label": label}))
+            else:
+                ops.append(UpdateOne(
+                    {"kind": kind, "label": label},
+                    # (per-video maps of label documents written before label_videos are dropped)
+                    {
+                        "$set": {"total_frames": t["total_frames"], "video_count": t["video_count"]},
+                        "$unset": {"videos": "", "video_ids": ""},
+                    },
+                    upsert=True,
+                ))
+        stats.bulk_write(ops, ordered=False)
+
+
+def _apply_label_stats(
+    db: Any,
+    video_id: str,
+    counts: Dict[Tuple[str, str], Dict[str, Any]],
+    kinds: Iterable[str] = SEGMENT_KINDS,
+) -> int:
+    """Replace one video's label_videos rows with counts and refresh the totals of those labels.
+
+    label_videos holds one small row per (kind, label, video_id) with {frames, first_sec,
+    last_sec}, so no document grows with the number of videos. The label_stats totals of
+    every label the video has or had are recomputed from the rows, so re-applying the same
+    counts is a no-op and a retried write does not double count.
+    Returns the number of labels touched. Raises on failure.
+    """
+    from pymongo import DeleteOne, UpdateOne
+
+    rows = db[LABEL_VIDEOS_COLLECTION]
+    kinds = list(kinds)
+    previous = {
+        (d["kind"], d["label"])
+        for d in rows.find({"video_id": video_id, "kind": {"$in": kinds}}, {"_id": 0, "kind": 1, "label": 1})
+    }
+    ops: List[Any] = [
+        UpdateOne({"kind": key[0], "label": key[1], "video_id": video_id}, {"$set": entry}, upsert=True)
+        for key, entry in counts.items()
+    ]
+    ops.extend(
+        DeleteOne({"kind": key[0], "label": key[1], "video_id": video_id})
+        for key in previous if key not in counts
+    )
+    if ops:
+        rows.bulk_write(ops, ordered=False)
+    touched = set(counts) | previous
+    if touched:
+        _refresh_label_totals(db[LABEL_STATS_COLLECTION], rows, touched)
+    return len(touched)
+
+
+def rebuild_label_stats(db: Any = None) -> Optional[Dict[str, Any]]:
+    """Backfill: recompute label_stats and label_videos from the frame documents (either schema).
+
+    Both are built into *_rebuild collections, one video at a time, and swapped in with
+    renameCollection(dropTarget=True), so facets keep answering from the old collections
+    meanwhile. Videos indexed while it runs are counted again when they are next indexed.
+    Returns {videos, labels, sec} or None when MongoDB is not configured or on error.
+    """
+    if db is None:
+        db = get_db()
+        if db is None or not ensure_indexes():
+            return None
+    try:
+        t0 = time.perf_counter()
+        stats = db[LABEL_STATS_COLLECTION + "_rebuild"]
+        rows = db[LABEL_VIDEOS_COLLECTION + "_rebuild"]
+        stats.drop()
+        rows.drop()
+        _label_stats_indexes(stats, rows)
+        video_ids = sorted(
+            set(v for v in db[FRAMES_COLLECTION].distinct("video_id") if v)
+            | set(v for v in db[FRAMES_COMPACT_COLLECTION].distinct("video_id") if v)
+        )
+        for video_id in video_ids:
+            counts = label_counts(find_frames(video_id, db))
+            if counts:
+                rows.insert_many([
+                    {"kind": kind, "label": label, "video_id": video_id, **entry}
+                    for (kind, label), entry in counts.items()
+                ])
+        totals = rows.aggregate([
+            {"$group": {
+                "_id": {"kind": "$kind", "label": "$label"},
+                "total_frames": {"$sum": "$frames"},
+                "video_count": {"$sum": 1},
+            }},
+        ])
+        batch: List[Dict[str, Any]] = []
+        for t in totals:
+            batch.append({**t["_id"], "total_frames": t["total_frames"], "video_count": t["video_count"]})
+            if len(batch) >= BULK_CHUNK_SIZE:
+                stats.insert_many(batch)
+                batch = []
+        if batch:
+            stats.insert_many(batch)
+        labels = stats.count_documents({})
+        rows.rename(LABEL_VIDEOS_COLLECTION, dropTarget=True)
+        stats.rename(LABEL_STATS_COLLECTION, dropTarget=True)
+        return {"videos": len(video_ids), "labels": labels, "sec": round(time.perf_counter() - t0, 2)}
+    except Exception as e:
+        logger.warning("MongoDB rebuild_label_stats failed: %s", e)
+        return None
+
+
+def label_facets(kind: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """Top labels of a kind by frames across all videos: [{label, total_frames, video_count}]."""
     db = get_db()
     if db is None:
-        return False
+        return []
     try:
-        coll = db[FRAMES_COLLECTION]
-        coll.delete_many({"video_id": video_id})
-        if frames_docs:
-            coll.insert_many(frames_docs)
-        return True
+        cursor = db[LABEL_STATS_COLLECTION].find(
+            {"kind": kind}, {"_id": 0, "label": 1, "total_frames": 1, "video_count": 1},
+        )
+        return list(cursor.sort("total_frames", -1).limit(limit))
     except Exception as e:
-        logger.warning("MongoDB replace_frames_for_video failed: %s", e)
-        return False
+        logger.warning("MongoDB label_facets failed: %s", e)
+        return []
+
+
+def get_label_stats(kind: str, label: str, limit: int = 1000) -> Optional[Dict[str, Any]]:
+    """Which videos contain a label and how often: {kind, label, total_frames, video_count,
+    videos: {video_id: {frames, first_sec, last_sec}}} (the limit videos with most frames), or None."""
+    db = get_db()
+    if db is None:
+        return None
+    try:
+        stats = db[LABEL_STATS_COLLECTION].find_one(
+            {"kind": kind, "label": label}, {"_id": 0, "kind": 1, "label": 1, "total_frames": 1, "video_count": 1},
+        )
+        if stats is None:
+            return None
+        rows = db[LABEL_VIDEOS_COLLECTION].find(
+            {"kind": kind, "label": label}, {"_id": 0, "kind": 0, "label": 0},
+        ).sort("frames", -1).limit(limit)
+        stats["videos"] = {row.pop("video_id"): row for row in rows}
+        return stats
+    except Exception as e:
+        logger.warning("MongoDB get_label_stats failed: %s", e)
+        return None
+
+
+def find_label_segments(
+    label: str,
+    kind: Optional[str] = None,
+    video_id: Optional[str] = None,
+    limit: int = 500,
+) -> List[Dict[str, Any]]:
+    """Where does label appear: segments sorted by video and start time (uses the label index)."""
+    db = get_db()
+    if db is None:
+        return []
+    query: Dict[str, Any] = {"label": label}
+    if kind:
+        query["kind"] = kind
+    if video_id:
+        query["video_id"] = video_id
+    try:
+        cursor = db[SEGMENTS_COLLECTION].find(query, {"_id": 0, "index_run": 0})
+        return list(cursor.sort([("video_id", 1), ("start_sec", 1)]).limit(limit))
+    except Exception as e:
+        logger.warning("MongoDB find_label_segments failed: %s", e)
+        return []
+
+
+def bulk_index_videos(
+    items: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    db: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """Write several videos at once: [(video_doc, frames_docs), ...] from build_index_documents.
+
+    Video documents go in one bulk_write; frame documents of all videos share the same
+    upsert chunks (see bulk_upsert_frames), and so do their label segments
+    (build_segment_documents). Returns the frame write metrics plus "videos" and "segments",
+    or None when MongoDB is not configured or a write failed.
+    """
+    if db is None:
+        db = get_db()
+        if db is None or not ensure_indexes():
+            return None
+    if not items:
+        return {"videos": 0, "frames": 0, "chunks": 0, "upserted": 0, "modified": 0, "matched": 0,
+                "deleted": 0, "segments": 0, "sec": 0.0, "frames_per_sec": 0.0}
+    try:
+        from pymongo import ReplaceOne
+
+        db[VIDEOS_COLLECTION].bulk_write(
+            [ReplaceOne({"video_id": v["video_id"]}, v, upsert=True) for v, _ in items],
+            ordered=False,
+        )
+        video_ids = [v["video_id"] for v, _ in items]
+        stats = _upsert_frames(
+            db, video_ids,
+            (dict(doc, video_id=v["video_id"]) for v, docs in items for doc in docs),
+            chunk_size,
+        )
+        seg_stats = _upsert_segments(
+            db, video_ids,
+            (seg for v, docs in items for seg in build_segment_documents(v["video_id"], docs)),
+            chunk_size,
+        )
+        stats["segments"] = seg_stats["segments"]
+        for v, docs in items:
+            _apply_label_stats(db, v["video_id"], label_counts(docs))
+        stats["videos"] = len(items)
+        logger.info(
+            "Indexed %d video(s) to MongoDB (%d frames in %d chunks, %.0f frames/s, %d stale deleted, %d segments)",
+            len(items), stats["frames"], stats["chunks"], stats["frames_per_sec"], stats["deleted"],
+            stats["segments"],
+        )
+        return stats
+    except Exception as e:
+        logger.warning("MongoDB bulk_index_videos failed: %s", e)
+        return None
+
+
+def replace_frames_for_video(video_id: str, frames_docs: List[Dict[str, Any]]) -> bool:
+    """Make frames_docs the frames of this video_id (bulk upserts, vanished frames deleted)."""
+    return bulk_upsert_frames(video_id, frames_docs) is not None
 
 
 def _frame_index_from_filename(frame_filename: str) -> int:
@@ -143,7 +843,80 @@ def _frame_index_from_filename(frame_filename: str) -> int:
     return 0
 
 
-def index_detection_results_to_mongodb(
+def _face_docs(faces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalize pipeline face records for storage ("Maybe:X" is stored as X)."""
+    face_list = []
+    for f in faces or []:
+        label = (f.get("label") or "Unknown").strip()
+        if label.startswith("Maybe:"):
+            label = label[6:].strip() or "Unknown"
+        face_list.append({
+            "label": label,
+            "confidence": round(float(f.get("confidence", 0)), 4),
+            "recognition_confidence": round(float(f.get("recognition_confidence", 0)), 4),
+            "bbox": f.get("bbox", []),
+        })
+    return face_list
+
+
+def update_face_labels(video_id: str, faces_by_frame: Dict[str, List[Dict[str, Any]]]) -> bool:
+    """Rewrite faces[] of existing frame documents (e.g. after re-identification) and refresh face_labels.
+
+    faces_by_frame: { frame_filename: [face records as in detection_results.json] }; only these frames are touched.
+    """
+    db = get_db()
+    if db is None:
+        return False
+    if not faces_by_frame:
+        return True
+    try:
+        from pymongo import UpdateOne
+
+        if db[FRAMES_COMPACT_COLLECTION].find_one({"video_id": video_id}, {"_id": 1}) is not None:
+            dictionary = FrameDictionary(db)
+            new_faces = {name: _face_docs(faces) for name, faces in faces_by_frame.items()}
+            dictionary.ensure({"face": (f["label"] for faces in new_faces.values() for f in faces)})
+            ops = [
+                UpdateOne(
+                    {"video_id": video_id, "n": _frame_index_from_filename(frame_filename)},
+                    {"$set": {"f": encode_frame_document(
+                        {"video_id": video_id, "faces": faces}, dictionary,
+                    ).get("f", [])}},
+                )
+                for frame_filename, faces in new_faces.items()
+            ]
+            db[FRAMES_COMPACT_COLLECTION].bulk_write(ops, ordered=False)
+        else:
+            ops = [
+                UpdateOne(
+                    {"video_id": video_id, "frame_filename": frame_filename},
+                    {"$set": {"faces": _face_docs(faces)}},
+                )
+                for frame_filename, faces in faces_by_frame.items()
+            ]
+            db[FRAMES_COLLECTION].bulk_write(ops, ordered=False)
+        # Face segments follow the new labels (objects and monuments are unchanged)
+        face_frames = find_frames(video_id, db)
+        _upsert_segments(
+            db, [video_id], build_segment_documents(video_id, face_frames, kinds=("face",)),
+            BULK_CHUNK_SIZE, kinds=["face"],
+        )
+        _apply_label_stats(db, video_id, label_counts(face_frames, kinds=("face",)), kinds=("face",))
+        labels = {
+            face["label"] for frame in face_frames for face in frame.get("faces") or []
+            if face.get("label") and face["label"] != "Unknown"
+        }
+        db[VIDEOS_COLLECTION].update_one(
+            {"video_id": video_id},
+            {"$set": {"face_labels": sorted(labels)}},
+        )
+        return True
+    except Exception as e:
+        logger.warning("MongoDB update_face_labels failed: %s", e)
+        return False
+
+
+def build_index_documents(
     video_id: str,
     source_url: str,
     meta: Dict[str, Any],
@@ -156,18 +929,18 @@ def index_detection_results_to_mongodb(
     object_model: str,
     face_model: str,
     fps: float = 1.0,
-) -> bool:
-    """
-    Build video and frame documents from pipeline results and write to MongoDB.
+    frame_times: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Build the video document and frame documents from pipeline results (no database access).
 
-    Returns True if write succeeded, False if MongoDB not configured or on error.
+    frame_times: {frame: time_sec} recorded at extraction (detection_results.json "time_sec").
+    Frames without one are timed from their number at fps samples per second (the
+    extraction rate, 1 per second; not the rendered video's fps).
     """
-    db = get_db()
-    if db is None:
-        return False
-
+    meta = meta or {}
     fbf = faces_by_frame or {}
     mbf = monuments_by_frame or {}
+    ft = frame_times or {}
 
     # Unique labels for search
     face_labels_set = set()
@@ -177,7 +950,10 @@ def index_detection_results_to_mongodb(
     frames_docs: List[Dict[str, Any]] = []
     for frame_filename, dets in sorted(results_by_frame.items()):
         frame_index = _frame_index_from_filename(frame_filename)
-        time_sec = (frame_index - 1) / fps if fps > 0 else 0.0
+        if ft.get(frame_filename) is not None:
+            time_sec = float(ft[frame_filename])
+        else:
+            time_sec = (frame_index - 1) / fps if fps > 0 else 0.0
 
         # Normalize objects for storage
         objects = []
@@ -194,20 +970,10 @@ def index_detection_results_to_mongodb(
             if obj["label"]:
                 object_labels_set.add(obj["label"])
 
-        faces = fbf.get(frame_filename, [])
-        face_list = []
-        for f in faces:
-            label = (f.get("label") or "Unknown").strip()
-            if label.startswith("Maybe:"):
-                label = label[6:].strip() or "Unknown"
-            face_list.append({
-                "label": label,
-                "confidence": round(float(f.get("confidence", 0)), 4),
-                "recognition_confidence": round(float(f.get("recognition_confidence", 0)), 4),
-                "bbox": f.get("bbox", []),
-            })
-            if label and label != "Unknown":
-                face_labels_set.add(label)
+        face_list = _face_docs(fbf.get(frame_filename, []))
+        for face in face_list:
+            if face["label"] and face["label"] != "Unknown":
+                face_labels_set.add(face["label"])
 
         mon = mbf.get(frame_filename, {})
         monument = {}
@@ -256,11 +1022,42 @@ def index_detection_results_to_mongodb(
         "monument_labels": sorted(monument_labels_set),
     }
 
-    if not ensure_indexes():
-        return False
-    if not upsert_video(video_doc):
+    return video_doc, frames_docs
+
+
+def index_detection_results_to_mongodb(
+    video_id: str,
+    source_url: str,
+    meta: Dict[str, Any],
+    run_stats: Dict[str, Any],
+    results_by_frame: Dict[str, List[Dict]],
+    faces_by_frame: Dict[str, List[Dict]],
+    monuments_by_frame: Dict[str, Dict],
+    by_class: Dict[str, int],
+    confidence_threshold: float,
+    object_model: str,
+    face_model: str,
+    fps: float = 1.0,
+    metrics: Optional[Dict[str, Any]] = None,
+    frame_times: Optional[Dict[str, float]] = None,
+) -> bool:
+    """
+    Build video and frame documents from pipeline results and write to MongoDB (synchronously;
+    the web app queues this through pipeline.index_queue instead).
+
+    If metrics is given, it is filled with the frame write throughput (see bulk_upsert_frames).
+    Returns True if write succeeded, False if MongoDB not configured or on error.
+    """
+    if get_db() is None:
         return False
-    if not replace_frames_for_video(video_id, frames_docs):
+    video_doc, frames_docs = build_index_documents(
+        video_id, source_url, meta, run_stats, results_by_frame, faces_by_frame,
+        monuments_by_frame, by_class, confidence_threshold, object_model, face_model, fps,
+        frame_times=frame_times,
+    )
+    stats = bulk_index_videos([(video_doc, frames_docs)])
+    if stats is None:
         return False
-    logger.info("Indexed video %s to MongoDB (%d frames)", video_id, len(frames_docs))
+    if metrics is not None:
+        metrics.update(stats)
     return True
@@ -12,7 +12,7 @@ import logging
 import os
 import warnings
 from glob import glob
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -38,21 +38,41 @@ def _load_image_cv(path: str):
     return img
 
 
+# ResNet18 feature extractors keyed by device, so batches do not reload weights
+_FEATURE_MODELS: Dict[str, Any] = {}
+
+
+def _get_feature_model(device: str):
+    """Return a cached ResNet18 (fc = Identity) in eval mode on device."""
+    model = _FEATURE_MODELS.get(device)
+    if model is None:
+        import torch  # type: ignore
+        from torchvision.models import resnet18, ResNet18_Weights  # type: ignore
+
+        model = resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
+        model.fc = torch.nn.Identity()
+        model = model.to(device)
+        model.eval()
+        _FEATURE_MODELS[device] = model
+    return model
+
+
 def _extract_features_batch(
-    image_paths: List[str],
+    images: List[Any],
     device: str,
     resize: Tuple[int, int] = (224, 224),
 ) -> List[Optional[Any]]:
-    """Extract ResNet18 features (no final FC) for a list of image paths. Returns list of 512-d vectors or None."""
+    """Extract ResNet18 features (no final FC) for a list of images. Returns list of 512-d vectors or None.
+
+    Each item is an image path or an already decoded BGR array (e.g. a frame held in memory).
+    The valid images are run through the network as one batch.
+    """
+    import cv2  # type: ignore
     import numpy as np
     import torch  # type: ignore
     import torchvision.transforms as T  # type: ignore
-    from torchvision.models import resnet18, ResNet18_Weights  # type: ignore
 
-    model = resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
-    model.fc = torch.nn.Identity()
-    model = model.to(device)
-    model.eval()
+    model = _get_feature_model(device)
 
     transform = T.Compose([
         T.ToPILImage(),
@@ -61,16 +81,42 @@ def _extract_features_batch(
         T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
     ])
 
-    features = []
-    for path in image_paths:
-        img = _load_image_cv(path)
+    features: List[Optional[Any]] = [None] * len(images)
+    tensors = []
+    valid_idx = []
+    for i, item in enumerate(images):
+        if isinstance(item, str):
+            img = _load_image_cv(item)
+        elif item is not None:
+            img = cv2.cvtColor(np.ascontiguousarray(item), cv2.COLOR_BGR2RGB)
+        else:
+            img = None
         if img is None:
-            features.append(None)
             continue
-        t = transform(img).unsqueeze(0).to(device)
-        with torch.no_grad():
-            f = model(t)
-        features.append(f.cpu().numpy().flatten())
+        tensors.append(transform(img))
+        valid_idx.append(i)
+    if not tensors:
+        return features
+    with torch.no_grad():
+        out = model(torch.stack(tensors).to(device)).cpu().numpy()
+    for i, f in zip(valid_idx, out):
+        features[i] = f.flatten()
+    return features
+
+
+def extract_scene_features(
+    images: List[Any],
+    device: Optional[str] = None,
+    batch_size: int = 16,
+) -> List[Optional[Any]]:
+    """ResNet18 features (512-d) of images (paths or BGR arrays), for scene similarity search.
+
+    Same features the monument classifier uses; None for images that cannot be read.
+    """
+    device = device or _get_device()
+    features: List[Optional[Any]] = []
+    for i in range(0, len(images), batch_size):
+        features.extend(_extract_features_batch(images[i : i + batch_size], device))
     return features
 
 
@@ -96,14 +142,62 @@ def collect_monument_images(
     return pairs
 
 
+def _multiclass_params(coef: "np.ndarray", intercept: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """Expand binary (1, D) sklearn weights to (2, D) so softmax in load_monument_model stays valid.
+
+    softmax([-z/2, z/2]) == [1 - sigmoid(z), sigmoid(z)], i.e. the same probabilities.
+    """
+    import numpy as np
+    if coef.shape[0] == 1:
+        coef = np.vstack([-coef / 2.0, coef / 2.0])
+        intercept = np.concatenate([-intercept / 2.0, intercept / 2.0])
+    return coef, intercept
+
+
+def _save_monument_model(
+    model_dir: str,
+    class_names: List[str],
+    feature_dim: int,
+    mean: "np.ndarray",
+    scale: "np.ndarray",
+    coef: "np.ndarray",
+    intercept: "np.ndarray",
+) -> None:
+    """Write the artifacts read by load_monument_model."""
+    import numpy as np
+
+    coef, intercept = _multiclass_params(coef, intercept)
+    meta = {
+        "class_names": class_names,
+        "n_classes": len(class_names),
+        "feature_dim": feature_dim,
+    }
+    meta_path = os.path.join(model_dir, "meta.json")
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    np.save(os.path.join(model_dir, "scaler_mean.npy"), mean)
+    np.save(os.path.join(model_dir, "scaler_scale.npy"), scale)
+    np.save(os.path.join(model_dir, "coef.npy"), coef)
+    np.save(os.path.join(model_dir, "intercept.npy"), intercept)
+
+
 def build_and_train_monument_model(
     dataset_dir: str,
     monuments_dir: str,
     model_dir: str,
     device: Optional[str] = None,
     progress_callback: Optional[Callable[[str], None]] = None,
+    streaming: bool = False,
+    chunk_size: int = 1024,
+    epochs: int = 5,
 ) -> Dict[str, Any]:
-    """Build feature index from images, train a classifier, save to model_dir. Returns summary dict."""
+    """Build feature index from images, train a classifier, save to model_dir. Returns summary dict.
+
+    streaming: compute features in chunks of chunk_size images into an on-disk memmap, keep running
+    scaler statistics, and train an SGD logistic-regression classifier with partial_fit over `epochs`
+    chunked passes. Peak memory is bounded by chunk_size instead of the dataset size.
+    """
     import numpy as np
 
     def _progress(msg: str) -> None:
@@ -127,6 +221,12 @@ def build_and_train_monument_model(
     n_classes = len(class_names)
     label2idx = {c: i for i, c in enumerate(class_names)}
 
+    if streaming:
+        return _train_monument_model_streaming(
+            paths, [label2idx[label] for label in labels], class_names, model_dir, device,
+            _progress, chunk_size=chunk_size, epochs=epochs,
+        )
+
     _progress(f"Loaded {len(paths)} images, {n_classes} classes. Extracting features...")
     batch_size = 32
     all_features: List[Optional[Any]] = []
@@ -164,26 +264,112 @@ def build_and_train_monument_model(
         clf.fit(X_scaled, y)
 
     # Save: class names, scaler params, classifier coeffs
-    meta = {
-        "class_names": class_names,
+    _save_monument_model(
+        model_dir, class_names, X.shape[1],
+        scaler.mean_, scaler.scale_, clf.coef_, clf.intercept_,
+    )
+
+    return {
+        "trained": True,
+        "n_samples": len(X_list),
         "n_classes": n_classes,
-        "feature_dim": X.shape[1],
+        "class_names": class_names,
+        "model_dir": model_dir,
     }
-    meta_path = os.path.join(model_dir, "meta.json")
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
 
-    np.save(os.path.join(model_dir, "scaler_mean.npy"), scaler.mean_)
-    np.save(os.path.join(model_dir, "scaler_scale.npy"), scaler.scale_)
-    np.save(os.path.join(model_dir, "coef.npy"), clf.coef_)
-    np.save(os.path.join(model_dir, "intercept.npy"), clf.intercept_)
+
+def _train_monument_model_streaming(
+    paths: List[str],
+    label_ids: List[int],
+    class_names: List[str],
+    model_dir: str,
+    device: str,
+    progress: Callable[[str], None],
+    chunk_size: int = 1024,
+    epochs: int = 5,
+) -> Dict[str, Any]:
+    """Streaming variant of build_and_train_monument_model (see its `streaming` argument).
+
+    The images are first put in a seeded random order: paths arrive grouped by class, and
+    SGD on class-sorted chunks would fit each chunk's few classes in turn. Pass 1 extracts
+    features chunk by chunk into a float32 memmap on disk and updates the scaler with
+    partial_fit. Each epoch then reads the memmap in shuffled chunks (each a random sample of
+    all classes), scales them and calls SGDClassifier.partial_fit, so only one chunk of
+    features is ever held in RAM.
+    """
+    import tempfile
+    import numpy as np
+
+    try:
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+    except ImportError:
+        return {"error": "scikit-learn required: pip install scikit-learn", "trained": False}
+
+    chunk_size = max(1, int(chunk_size))
+    epochs = max(1, int(epochs))
+    n_classes = len(class_names)
+    n_total = len(paths)
+    rng = np.random.default_rng(42)
+    order = rng.permutation(n_total)
+    paths = [paths[k] for k in order]
+    label_ids = [label_ids[k] for k in order]
+    fd, feat_path = tempfile.mkstemp(prefix="features_", suffix=".tmp", dir=model_dir)
+    os.close(fd)
+    try:
+        features = np.lib.format.open_memmap(feat_path, mode="w+", dtype=np.float32, shape=(n_total, _FEATURE_DIM))
+        y_all = np.empty(n_total, dtype=np.int32)
+        scaler = StandardScaler()
+        n_valid = 0
+        n_chunks = (n_total + chunk_size - 1) // chunk_size
+        progress(f"Loaded {n_total} images, {n_classes} classes. Streaming features in {n_chunks} chunks...")
+        for c, i in enumerate(range(0, n_total, chunk_size), start=1):
+            chunk_paths = paths[i : i + chunk_size]
+            chunk_feats: List[Any] = []
+            for j in range(0, len(chunk_paths), 32):
+                chunk_feats.extend(_extract_features_batch(chunk_paths[j : j + 32], device))
+            rows = [k for k, f in enumerate(chunk_feats) if f is not None]
+            if rows:
+                X_chunk = np.array([chunk_feats[k] for k in rows], dtype=np.float32)
+                features[n_valid : n_valid + len(rows)] = X_chunk
+                y_all[n_valid : n_valid + len(rows)] = [label_ids[i + k] for k in rows]
+                scaler.partial_fit(X_chunk)
+                n_valid += len(rows)
+            progress(f"  Features chunk {c}/{n_chunks} ({min(i + chunk_size, n_total)}/{n_total} images)")
+        features.flush()
+        if n_valid == 0:
+            return {"error": "No valid features extracted from images", "trained": False}
+
+        progress(f"Training classifier (SGD, {epochs} epochs)...")
+        clf = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+        classes = np.arange(n_classes)
+        starts = np.arange(0, n_valid, chunk_size)
+        for epoch in range(1, epochs + 1):
+            for start in rng.permutation(starts):
+                end = min(start + chunk_size, n_valid)
+                order = rng.permutation(end - start)
+                X_chunk = scaler.transform(np.asarray(features[start:end])[order])
+                clf.partial_fit(X_chunk, y_all[start:end][order], classes=classes)
+            progress(f"  Epoch {epoch}/{epochs}")
+        del features
+
+        _save_monument_model(
+            model_dir, class_names, _FEATURE_DIM,
+            scaler.mean_, scaler.scale_, clf.coef_, clf.intercept_,
+        )
+    finally:
+        try:
+            os.remove(feat_path)
+        except OSError:
+            pass
 
     return {
         "trained": True,
-        "n_samples": len(X_list),
+        "n_samples": n_valid,
         "n_classes": n_classes,
         "class_names": class_names,
         "model_dir": model_dir,
+        "streaming": True,
     }
 
 
@@ -201,17 +387,22 @@ def load_monument_model(model_dir: str) -> Optional[Dict[str, Any]]:
     mean = np.load(os.path.join(model_dir, "scaler_mean.npy"))
     scale = np.load(os.path.join(model_dir, "scaler_scale.npy"))
 
-    def predict(features: np.ndarray) -> Tuple[List[str], List[float]]:
-        # features: (N, D)
+    def predict_proba(features: np.ndarray) -> np.ndarray:
+        # features: (N, D) -> (N, n_classes)
         x = (features - mean) / (scale + 1e-8)
         logits = x @ coef.T + intercept
-        probs = _softmax(logits)
+        return _softmax(logits)
+
+    def predict(features: np.ndarray) -> Tuple[List[str], List[float]]:
+        # features: (N, D)
+        probs = predict_proba(features)
         pred_idx = np.argmax(probs, axis=1)
         labels = [meta["class_names"][i] for i in pred_idx]
         confs = [float(probs[i, pred_idx[i]]) for i in range(len(pred_idx))]
         return labels, confs
 
     meta["predict_fn"] = predict
+    meta["predict_proba_fn"] = predict_proba
     meta["_coef"] = coef
     meta["_intercept"] = intercept
     meta["_mean"] = mean
@@ -245,34 +436,220 @@ def predict_monument(
     return labels[0], confs[0]
 
 
+# Monument gating modes: classify every frame, only at shot changes, or every `stride` frames
+MONUMENT_GATING_CHOICES = ("none", "shots", "decimate")
+
+
+def detect_shot_ids(frames: List[Any], threshold: float = 0.4) -> List[int]:
+    """Assign a shot id to each frame using HSV-histogram differences between consecutive frames.
+
+    frames: image paths or decoded BGR arrays.
+    A new shot starts when the Bhattacharyya distance to the previous frame exceeds threshold.
+    Frames that cannot be read stay in the current shot. Cheap compared to ResNet inference:
+    histograms are computed on a 64x36 thumbnail.
+    """
+    import cv2  # type: ignore
+
+    shot_ids: List[int] = []
+    shot = 0
+    prev_hist = None
+    for frame in frames:
+        img = cv2.imread(frame) if isinstance(frame, str) else frame
+        if img is None:
+            shot_ids.append(shot)
+            continue
+        small = cv2.resize(img, (64, 36), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        if prev_hist is not None and cv2.compareHist(prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA) > threshold:
+            shot += 1
+        prev_hist = hist
+        shot_ids.append(shot)
+    return shot_ids
+
+
+def _gated_monument_results(
+    frame_files: List[str],
+    shot_ids: List[int],
+    probs_by_index: Dict[int, Any],
+    class_names: List[str],
+    confidence_threshold: float,
+    smooth_window: int = 3,
+) -> Dict[str, Dict[str, Any]]:
+    """Smooth inferred probabilities within each shot and propagate them to every frame.
+
+    Inferred frames get a centered moving average (smooth_window samples, same shot only);
+    other frames copy the nearest preceding inferred frame of their shot (or the first one).
+    """
+    import numpy as np
+
+    half = max(0, int(smooth_window) // 2)
+    by_shot: Dict[int, List[int]] = {}
+    for idx, shot in enumerate(shot_ids):
+        if idx in probs_by_index:
+            by_shot.setdefault(shot, []).append(idx)
+
+    smoothed: Dict[int, Any] = {}
+    for samples in by_shot.values():
+        for k, idx in enumerate(samples):
+            window = samples[max(0, k - half) : k + half + 1]
+            smoothed[idx] = np.mean([probs_by_index[j] for j in window], axis=0)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    last_idx: Dict[int, int] = {}
+    for idx, (name, shot) in enumerate(zip(frame_files, shot_ids)):
+        if idx in smoothed:
+            last_idx[shot] = idx
+            src = idx
+        else:
+            src = last_idx.get(shot, (by_shot.get(shot) or [None])[0])
+        if src is None:
+            continue
+        p = smoothed[src]
+        best = int(np.argmax(p))
+        conf = float(p[best])
+        results[name] = {
+            "label": class_names[best] if conf >= confidence_threshold else "Unknown",
+            "confidence": conf,
+            "inferred": idx in smoothed,
+            "shot": int(shot),
+        }
+    return results
+
+
 def run_monument_recognition(
     frames_dir: str,
     model_dir: str,
     device: Optional[str] = None,
     confidence_threshold: float = 0.5,
-) -> Dict[str, Dict[str, Any]]:
-    """Run monument recognition on each image in frames_dir. Returns { frame_filename: { label, confidence } }."""
+    gating: str = "none",
+    stride: int = 10,
+    shot_threshold: float = 0.4,
+    smooth_window: int = 3,
+    frame_names: Optional[Iterable[str]] = None,
+    feature_sink: Optional[Callable[[str, Any], None]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Run monument recognition on each image in frames_dir. Returns { frame_filename: { label, confidence } }.
+
+    Returns None when there is no monument model (nothing was classified, so callers must
+    not record the frames as covered).
+    Pass clean (not annotated) frames. See recognize_monuments_in_frames for gating options.
+    frame_names: only process these files of frames_dir.
+    feature_sink: called with (frame_name, features) for every frame run through ResNet18.
+    progress_callback: called with (frames done, frames total) after each batch.
+    """
+    only = set(frame_names) if frame_names is not None else None
+    frame_files = [
+        f for f in sorted(os.listdir(frames_dir))
+        if f.lower().endswith(_ALLOWED_EXT) and (only is None or f in only)
+    ]
+    if not frame_files:
+        return {} if load_monument_model(model_dir) is not None else None
+    paths = [os.path.join(frames_dir, f) for f in frame_files]
+    return recognize_monuments_in_frames(
+        frame_files, paths, model_dir,
+        device=device,
+        confidence_threshold=confidence_threshold,
+        gating=gating,
+        stride=stride,
+        shot_threshold=shot_threshold,
+        smooth_window=smooth_window,
+        feature_sink=feature_sink,
+        progress_callback=progress_callback,
+    )
+
+
+def recognize_monuments_in_frames(
+    frame_names: List[str],
+    frames: List[Any],
+    model_dir: str,
+    device: Optional[str] = None,
+    confidence_threshold: float = 0.5,
+    gating: str = "none",
+    stride: int = 10,
+    shot_threshold: float = 0.4,
+    smooth_window: int = 3,
+    model: Optional[Dict[str, Any]] = None,
+    feature_sink: Optional[Callable[[str, Any], None]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Run monument recognition on frames given as paths or decoded BGR arrays (in display order).
+
+    frame_names: keys for the result (e.g. frame filenames), parallel to frames.
+    model: an already loaded load_monument_model(model_dir) result, to avoid reloading per call.
+    Returns { frame_name: { label, confidence } }, or None when there is no monument model.
+
+    gating (see MONUMENT_GATING_CHOICES):
+    - "none": classify every frame independently (default).
+    - "shots": classify the first frame of each shot (detect_shot_ids) and every `stride` frames
+      inside long shots; smooth and propagate within the shot.
+    - "decimate": classify every `stride` frames; smooth and propagate across the whole video.
+    Gated results also carry "inferred" (classifier ran on this frame) and "shot".
+    feature_sink: called with (frame_name, features) for every frame run through ResNet18
+    (e.g. to keep scene features for similarity search without computing them twice).
+    progress_callback: called with (frames done, frames total) after each batch; with gating,
+    "done" is the position in the video of the last classified frame.
+    """
     import numpy as np
 
-    model = load_monument_model(model_dir)
     if model is None:
-        return {}
+        model = load_monument_model(model_dir)
+    if model is None:
+        return None
 
     device = device or _get_device()
-    results = {}
-    frame_files = [
-        f for f in sorted(os.listdir(frames_dir))
-        if f.lower().endswith(_ALLOWED_EXT)
-    ]
-    if not frame_files:
+    results: Dict[str, Dict[str, Any]] = {}
+    if not frames:
         return results
 
-    paths = [os.path.join(frames_dir, f) for f in frame_files]
+    if gating in ("shots", "decimate"):
+        stride = max(1, int(stride))
+        if gating == "shots":
+            shot_ids = detect_shot_ids(frames, threshold=shot_threshold)
+        else:
+            shot_ids = [0] * len(frames)
+        to_infer: List[int] = []
+        shot_start = 0
+        for idx, shot in enumerate(shot_ids):
+            if idx == 0 or shot != shot_ids[idx - 1]:
+                shot_start = idx
+            if (idx - shot_start) % stride == 0:
+                to_infer.append(idx)
+        probs_by_index: Dict[int, Any] = {}
+        batch_size = 16
+        for i in range(0, len(to_infer), batch_size):
+            batch_idx = to_infer[i : i + batch_size]
+            feats = _extract_features_batch([frames[j] for j in batch_idx], device)
+            if progress_callback is not None:
+                progress_callback(batch_idx[-1] + 1, len(frames))
+            valid = [(j, f) for j, f in zip(batch_idx, feats) if f is not None]
+            if not valid:
+                continue
+            if feature_sink is not None:
+                for j, f in valid:
+                    feature_sink(frame_names[j], f)
+            probs = model["predict_proba_fn"](np.array([f for _, f in valid], dtype=np.float32))
+            for (j, _), p in zip(valid, probs):
+                probs_by_index[j] = p
+        if progress_callback is not None:
+            progress_callback(len(frames), len(frames))
+        logger.info(
+            "Monument recognition (%s): classified %d of %d frames", gating, len(probs_by_index), len(frames),
+        )
+        return _gated_monument_results(
+            list(frame_names), shot_ids, probs_by_index, model["class_names"],
+            confidence_threshold, smooth_window=smooth_window,
+        )
+
     batch_size = 16
-    for i in range(0, len(paths), batch_size):
-        batch_paths = paths[i : i + batch_size]
-        batch_names = frame_files[i : i + batch_size]
-        feats = _extract_features_batch(batch_paths, device)
+    for i in range(0, len(frames), batch_size):
+        batch = frames[i : i + batch_size]
+        batch_names = frame_names[i : i + batch_size]
+        feats = _extract_features_batch(batch, device)
+        if progress_callback is not None:
+            progress_callback(i + len(batch), len(frames))
         valid = []
         valid_names = []
         for j, f in enumerate(feats):
@@ -281,6 +658,9 @@ def run_monument_recognition(
                 valid_names.append(batch_names[j])
         if not valid:
             continue
+        if feature_sink is not None:
+            for name, f in zip(valid_names, valid):
+                feature_sink(name, f)
         X = np.array(valid, dtype=np.float32)
         labels, confs = model["predict_fn"](X)
         for name, label, conf in zip(valid_names, labels, confs):
@@ -0,0 +1,155 @@
+"""Compact time-indexed overlay track for drawing detections over the original video in the browser.
+
+Instead of annotating frames and re-encoding a video on the server, the detections in
+detection_results.json are turned into a small sidecar that the web UI draws on a canvas
+over the source video (see web/static/js/app.js):
+
+    {
+      "version": 1,
+      "video_id": "...",
+      "interval": 1.0,                        # median spacing between samples (seconds)
+      "classes": [{"name": "red car", "color": "#ff3838"}, ...],
+      "faces": ["Unknown", "Alice", ...],     # face label dictionary
+      "monuments": ["Taj_Mahal", ...],        # monument label dictionary
+      "samples": [
+        {"t": 12.0,
+         "o": [[x1, y1, x2, y2, class_idx, conf], ...],
+         "f": [[x1, y1, x2, y2, label_idx, conf], ...],
+         "m": [label_idx, conf]}              # omitted when no monument
+      ]
+    }
+
+Boxes are integers in source video pixels and confidences are rounded to 2 decimals.
+The same samples can also be written as a WebVTT metadata track (one cue per sample,
+JSON payload) for players that consume text tracks.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from .annotate import _object_color
+from .source_render import load_overlay_timeline, _sample_interval
+
+OVERLAY_TRACK_VERSION = 1
+
+
+class _Dictionary:
+    """Assign small integer ids to labels in first-seen order."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def id(self, name: str) -> int:
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+
+def _hex_color(bgr: tuple) -> str:
+    b, g, r = bgr
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _box(bbox: List[float]) -> List[int]:
+    return [int(round(float(v))) for v in bbox[:4]]
+
+
+def build_overlay_track(detection_json: Any, video_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build the overlay track from detection_results.json (path or parsed payload)."""
+    if isinstance(detection_json, str):
+        with open(detection_json, "r", encoding="utf-8") as f:
+            detection_json = json.load(f)
+    timeline = load_overlay_timeline(detection_json)
+    classes, faces, monuments = _Dictionary(), _Dictionary(), _Dictionary()
+    colors: Dict[str, str] = {}
+    samples = []
+    for entry in timeline:
+        objs = []
+        for d in entry["detections"]:
+            if len(d.get("bbox") or []) < 4:
+                continue
+            name = d.get("label") or d.get("class") or "object"
+            colors.setdefault(name, _hex_color(_object_color(d.get("class", ""))))
+            objs.append(_box(d["bbox"]) + [classes.id(name), round(float(d.get("conf", 0)), 2)])
+        face_rows = []
+        for rec in entry["faces"]:
+            if len(rec.get("bbox") or []) < 4:
+                continue
+            face_rows.append(
+                _box(rec["bbox"]) + [faces.id(rec.get("label") or "Unknown"), round(float(rec.get("confidence", 0)), 2)]
+            )
+        sample: Dict[str, Any] = {"t": round(entry["time_sec"], 3), "o": objs, "f": face_rows}
+        label = (entry["monument"] or {}).get("label")
+        if label and label != "Unknown":
+            sample["m"] = [monuments.id(label), round(float(entry["monument"].get("confidence", 0)), 2)]
+        samples.append(sample)
+
+    # Object entries are display labels (e.g. "red car"); colors match the server-side
+    # annotator, which picks a stable color per class name
+    return {
+        "version": OVERLAY_TRACK_VERSION,
+        "video_id": video_id or detection_json.get("video_id"),
+        "interval": round(_sample_interval([s["t"] for s in samples]), 3),
+        "classes": [{"name": n, "color": colors[n]} for n in classes.names],
+        "faces": faces.names,
+        "monuments": monuments.names,
+        "samples": samples,
+    }
+
+
+def _write_atomic(output_path: str, text: str) -> None:
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, output_path)
+
+
+def save_overlay_track(track: Dict[str, Any], output_path: str) -> str:
+    """Write the overlay track as compact JSON. Returns output_path."""
+    _write_atomic(output_path, json.dumps(track, separators=(",", ":")))
+    return output_path
+
+
+def _vtt_time(sec: float) -> str:
+    ms = int(round(max(0.0, sec) * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def save_overlay_vtt(track: Dict[str, Any], output_path: str) -> str:
+    """Write the overlay track as a WebVTT metadata track (one cue per sample). Returns output_path.
+
+    Each cue lasts until the next sample (at most one sample interval); its payload is the
+    sample JSON with labels resolved, so cues can be used without the dictionaries.
+    """
+    samples = track.get("samples") or []
+    interval = float(track.get("interval") or 1.0)
+    classes = [c["name"] for c in track.get("classes") or []]
+    faces = track.get("faces") or []
+    monuments = track.get("monuments") or []
+    lines = ["WEBVTT", "Kind: metadata", ""]
+    for k, s in enumerate(samples):
+        start = float(s["t"])
+        end = start + interval
+        if k + 1 < len(samples):
+            end = min(end, float(samples[k + 1]["t"]))
+        if end <= start:
+            continue
+        cue = {
+            "objects": [{"bbox": o[:4], "label": classes[o[4]], "conf": o[5]} for o in s.get("o", [])],
+            "faces": [{"bbox": f[:4], "label": faces[f[4]], "conf": f[5]} for f in s.get("f", [])],
+        }
+        if "m" in s:
+            cue["monument"] = {"label": monuments[s["m"][0]], "conf": s["m"][1]}
+        lines.append(f"{_vtt_time(start)} --> {_vtt_time(end)}")
+        lines.append(json.dumps(cue, separators=(",", ":")))
+        lines.append("")
+    _write_atomic(output_path, "\n".join(lines))
+    return output_path
@@ -28,6 +28,16 @@ INBOX_FACES_DIR = os.path.join(TRAINING_DATA_DIR, "inbox_faces")
 INBOX_MONUMENTS_DIR = os.path.join(TRAINING_DATA_DIR, "inbox_monuments")
 # Trained monument classifier and index
 MONUMENT_MODEL_DIR = os.path.join(VISTA_DIR, "monument_model")
+# Durable spool of pending MongoDB indexing jobs, see pipeline.index_queue
+INDEX_QUEUE_DIR = os.path.join(VISTA_DIR, "index_queue")
+# Embedded local search index (SQLite postings), see pipeline.search_index
+SEARCH_INDEX_PATH = os.path.join(VISTA_DIR, "search_index.sqlite")
+# Global face / scene embedding shards for query-by-example, see pipeline.vector_store
+VECTOR_STORE_DIR = os.path.join(VISTA_DIR, "vector_store")
+# Background /api/jobs records (one JSON file per job), see pipeline.jobs
+JOBS_DIR = os.path.join(VISTA_DIR, "jobs")
+# Per-video lock files serializing pipeline runs across processes, see pipeline.locks
+LOCKS_DIR = os.path.join(VISTA_DIR, "locks")
 
 
 def ensure_directories() -> None:
@@ -56,11 +66,37 @@ def get_video_results_paths(video_id: str):
     detection_json = os.path.join(base, "detection_results.json")
     processed_frames = os.path.join(base, "processed_frames")
     metadata_txt = os.path.join(base, "metadata.txt")
+    # Totals, per-label counts, models and video metadata for O(1) cached responses
+    summary_json = os.path.join(base, "summary.json")
+    # Per-face embeddings (float16) keyed by (frame, face index) into detection_results.json
+    face_embeddings = os.path.join(base, "face_embeddings.npz")
+    # Per-frame ResNet18 scene features (float16), see pipeline.vector_store
+    scene_features = os.path.join(base, "scene_features.npz")
+    # Columnar (memory-mappable .npy) copy of detection_results.json, see pipeline.columnar
+    detection_columns = os.path.join(base, "detection_columns")
+    # Stage manifest for checkpoint/resume, see pipeline.manifest
+    manifest = os.path.join(base, "manifest.json")
+    # Live progress of the current run (SSE stream), see pipeline.progress
+    progress = os.path.join(base, "progress.json")
+    # Raw per-stage results keyed by (stage, model, range, params), see pipeline.stage_cache
+    stage_cache = os.path.join(base, "stage_cache")
+    # Time-indexed overlay sidecar drawn over the source video by the web UI
+    overlay_track = os.path.join(base, "overlay.json")
+    overlay_vtt = os.path.join(base, "overlay.vtt")
     return {
         "base": base,
         "detection_json": detection_json,
+        "detection_columns": detection_columns,
         "processed_frames": processed_frames,
         "metadata_txt": metadata_txt,
+        "summary_json": summary_json,
+        "face_embeddings": face_embeddings,
+        "scene_features": scene_features,
+        "manifest": manifest,
+        "progress": progress,
+        "stage_cache": stage_cache,
+        "overlay_track": overlay_track,
+        "overlay_vtt": overlay_vtt,
     }
 
 
@@ -0,0 +1,134 @@
+"""Live progress of a processing run, for the /api/progress Server-Sent Events stream.
+
+Long stages take a progress_callback(done, total) hook (called after each frame, like
+build_and_train_monument_model's message callback). ProgressReporter hands out one
+callback per stage, derives throughput and ETA, and writes the state of the current
+run to results/<video_id>/progress.json:
+
+    {"video_id", "run_id", "status": "running" | "completed" | "failed", "error",
+     "started_at", "updated_at", "finished_at", "stage": current stage or null,
+     "stages": {"objects": {"status": "running" | "done" | "failed", "done": 120,
+                            "total": 180, "fps": 14.2, "eta_sec": 4.2,
+                            "started_at": ..., "sec": 8.5}, ...}}
+
+Writes are atomic replaces, throttled to one per VISTA_PROGRESS_INTERVAL seconds
+(default 0.5) except for stage transitions and the final frame, so the file can be read
+from any process (the server streaming it, or /api/jobs worker processes writing it).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+PROGRESS_INTERVAL = float(os.environ.get("VISTA_PROGRESS_INTERVAL", "0.5"))
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def load_progress(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+class ProgressReporter:
+    """Stage and per-frame progress of one run. Does nothing until bind() gives it a file."""
+
+    def __init__(self, min_interval: float = PROGRESS_INTERVAL) -> None:
+        self.min_interval = min_interval
+        self.path: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self._last_write = 0.0
+
+    def bind(self, path: str, video_id: str) -> None:
+        """Start a run that reports to path (results/<video_id>/progress.json)."""
+        now = time.time()
+        self.path = path
+        self.data = {
+            "video_id": video_id,
+            "run_id": uuid.uuid4().hex,
+            "status": "running",
+            "error": None,
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "stage": None,
+            "stages": {},
+        }
+        self._write()
+
+    def _write(self) -> None:
+        if self.path is None:
+            return
+        self.data["updated_at"] = time.time()
+        self._last_write = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Progress is informational; never fail the pipeline over it
+            pass
+
+    def _end_current(self, status: str) -> None:
+        name = self.data.get("stage")
+        entry = self.data.get("stages", {}).get(name) if name else None
+        if entry is not None and entry["status"] == "running":
+            entry["status"] = status
+            entry["sec"] = round(time.time() - entry["started_at"], 2)
+            entry["eta_sec"] = 0.0 if status == "done" else None
+        self.data["stage"] = None
+
+    def stage(self, name: str, total: int = 0) -> ProgressCallback:
+        """Begin a stage (ending the previous one); returns its progress_callback(done, total)."""
+        if self.path is None:
+            return lambda done, total: None
+        self._end_current("done")
+        self.data["stage"] = name
+        self.data["stages"][name] = {
+            "status": "running",
+            "done": 0,
+            "total": int(total),
+            "fps": None,
+            "eta_sec": None,
+            "started_at": time.time(),
+            "sec": None,
+        }
+        self._write()
+        return lambda done, total=0: self.update(name, done, total)
+
+    def update(self, name: str, done: int, total: int = 0) -> None:
+        entry = self.data.get("stages", {}).get(name)
+        if entry is None or entry["status"] != "running":
+            return
+        elapsed = time.time() - entry["started_at"]
+        entry["done"] = int(done)
+        if total:
+            entry["total"] = int(total)
+        entry["fps"] = round(done / elapsed, 2) if elapsed > 0 and done else None
+        remaining = entry["total"] - done
+        entry["eta_sec"] = round(remaining / entry["fps"], 1) if entry["fps"] and remaining >= 0 else None
+        if time.monotonic() - self._last_write >= self.min_interval or (entry["total"] and done >= entry["total"]):
+            self._write()
+
+    def end_stage(self, status: str = "done") -> None:
+        if self.path is None:
+            return
+        self._end_current(status)
+        self._write()
+
+    def finish(self, status: str = "completed", error: Optional[str] = None) -> None:
+        if self.path is None:
+            return
+        self._end_current("done" if status == "completed" else "failed")
+        self.data.update({"status": status, "error": error, "finished_at": time.time()})
+        self._write()
@@ -1,9 +1,29 @@
-"""Render utilities to assemble annotated frames into a final video."""
+"""Render utilities to assemble annotated frames into a final video.
+
+- make_video_from_images: render after the fact from a directory of annotated JPEGs.
+- StreamingVideoWriter: accept annotated frames as they are produced and encode them on
+  a background thread, so the annotated JPEGs do not need to be written or re-read.
+  Encoding overlaps whatever feeds write(): YOLO inference when it is run_yolo's
+  frame_sink (implementation.py on a fresh run), annotation when it is annotate_frames'
+  (the web app, which draws faces and monuments after every stage has finished).
+
+Encoder backends (open_encoder):
+- "ffmpeg": pipes raw BGR frames into a local ffmpeg (libx264, yuv420p, faststart), which is
+  multithreaded and produces small MP4s that browsers can play.
+- "cv2": cv2.VideoWriter with 'mp4v' (fallback 'XVID' AVI).
+- "auto" (default): ffmpeg when found on PATH (or VISTA_FFMPEG), else cv2.
+Defaults come from VISTA_VIDEO_ENCODER, VISTA_X264_PRESET, VISTA_X264_CRF and VISTA_X264_THREADS.
+"""
 
 from __future__ import annotations
 
 import os
-from typing import List, Tuple
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Any, Callable, List, Optional, Tuple
 
 import cv2
 
@@ -26,12 +46,252 @@ def _list_images_sorted(images_dir: str) -> List[str]:
     return sorted(files, key=sort_key)
 
 
-def make_video_from_images(images_dir: str, output_path: str, fps: int = 1) -> bool:
+def _open_writer(output_path: str, fps: float, size: Tuple[int, int]) -> Tuple[Any, Optional[str]]:
+    """Open an MP4 ('mp4v') writer, falling back to AVI ('XVID'). Returns (writer, path) or (None, None)."""
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+    if writer.isOpened():
+        return writer, output_path
+    safe_print("MP4 writer not available; falling back to AVI.")
+    avi_path = os.path.splitext(output_path)[0] + ".avi"
+    fourcc_avi = cv2.VideoWriter_fourcc(*"XVID")
+    writer = cv2.VideoWriter(avi_path, fourcc_avi, fps, size)
+    if writer.isOpened():
+        return writer, avi_path
+    safe_print("Failed to open any video writer.")
+    return None, None
+
+
+ENCODER_BACKENDS = ("auto", "ffmpeg", "cv2")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+DEFAULT_ENCODER = os.environ.get("VISTA_VIDEO_ENCODER", "auto").lower()
+DEFAULT_X264_PRESET = os.environ.get("VISTA_X264_PRESET", "veryfast")
+DEFAULT_X264_CRF = _env_int("VISTA_X264_CRF", 23)
+DEFAULT_X264_THREADS = _env_int("VISTA_X264_THREADS", 0)  # 0 = ffmpeg decides (all cores)
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Return the ffmpeg executable (VISTA_FFMPEG or PATH), or None."""
+    exe = os.environ.get("VISTA_FFMPEG") or shutil.which("ffmpeg")
+    if exe and (os.path.isfile(exe) or shutil.which(exe)):
+        return exe
+    return None
+
+
+class FfmpegEncoder:
+    """Encode raw BGR frames with libx264 through an ffmpeg subprocess (same write/release API as cv2.VideoWriter)."""
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        size: Tuple[int, int],
+        preset: str = DEFAULT_X264_PRESET,
+        crf: int = DEFAULT_X264_CRF,
+        threads: int = DEFAULT_X264_THREADS,
+        ffmpeg: Optional[str] = None,
+    ) -> None:
+        exe = ffmpeg or find_ffmpeg()
+        if not exe:
+            raise RuntimeError("ffmpeg not found")
+        self.size = size
+        w, h = size
+        cmd = [
+            exe, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+            # yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", str(preset), "-crf", str(int(crf)),
+            "-threads", str(int(threads)),
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+            output_path,
+        ]
+        # stderr goes to a file: an undrained pipe fills up on a chatty ffmpeg and blocks it
+        # (and so write()) forever
+        self._stderr_file = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr_file)
+        except Exception:
+            self._stderr_file.close()
+            raise
+
+    def isOpened(self) -> bool:
+        return self._proc.poll() is None
+
+    def write(self, frame: Any) -> None:
+        if self._proc.stdin is None:
+            raise RuntimeError("ffmpeg stdin closed")
+        try:
+            self._proc.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg exited: {self._stderr()}")
+
+    def _stderr(self) -> str:
+        try:
+            self._stderr_file.seek(0)
+            return self._stderr_file.read().decode("utf-8", "replace").strip()
+        except Exception:
+            return ""
+
+    def release(self) -> None:
+        if self._proc.stdin is not None and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        rc = self._proc.wait()
+        try:
+            if rc != 0:
+                raise RuntimeError(f"ffmpeg failed ({rc}): {self._stderr()}")
+        finally:
+            self._stderr_file.close()
+
+
+def open_encoder(
+    output_path: str,
+    fps: float,
+    size: Tuple[int, int],
+    backend: Optional[str] = None,
+    preset: Optional[str] = None,
+    crf: Optional[int] = None,
+    threads: Optional[int] = None,
+) -> Tuple[Any, Optional[str]]:
+    """Open a video encoder for BGR frames of `size` (w, h). Returns (encoder, path) or (None, None).
+
+    backend: one of ENCODER_BACKENDS (default DEFAULT_ENCODER). "auto" and "ffmpeg" fall back
+    to cv2 when ffmpeg is missing or fails to start.
+    """
+    backend = (backend or DEFAULT_ENCODER).lower()
+    if backend in ("auto", "ffmpeg") and find_ffmpeg():
+        try:
+            enc = FfmpegEncoder(
+                output_path, fps, size,
+                preset=preset or DEFAULT_X264_PRESET,
+                crf=DEFAULT_X264_CRF if crf is None else crf,
+                threads=DEFAULT_X264_THREADS if threads is None else threads,
+            )
+            if enc.isOpened():
+                return enc, output_path
+        except Exception as exc:
+            safe_print(f"ffmpeg encoder unavailable ({exc}); using OpenCV writer.")
+    elif backend == "ffmpeg":
+        safe_print("ffmpeg not found; using OpenCV writer.")
+    return _open_writer(output_path, fps, size)
+
+
+class StreamingVideoWriter:
+    """Encode frames as they are produced.
+
+    write(frame) enqueues a BGR frame (bounded queue, so a slow encoder applies back-pressure)
+    and a background thread writes it. The writer is opened lazily with the size of the first
+    frame; later frames of a different size are resized. Use as a context manager or call close(),
+    which returns True if at least one frame was written. output_path is updated if the writer
+    falls back to AVI.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float = 1,
+        queue_size: int = 64,
+        backend: Optional[str] = None,
+        **encoder_options: Any,
+    ) -> None:
+        self.output_path = output_path
+        self.fps = fps
+        self.backend = backend
+        self.encoder_options = encoder_options
+        self.frames_written = 0
+        self.error: Optional[str] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._writer: Any = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is self._STOP:
+                break
+            if self.error is not None:
+                continue
+            try:
+                if self._writer is None:
+                    h, w = frame.shape[:2]
+                    self._size = (w, h)
+                    self._writer, path = open_encoder(
+                        self.output_path, self.fps, self._size, backend=self.backend, **self.encoder_options,
+                    )
+                    if self._writer is None:
+                        self.error = "Failed to open any video writer."
+                        continue
+                    self.output_path = path
+                if (frame.shape[1], frame.shape[0]) != self._size:
+                    frame = cv2.resize(frame, self._size)
+                self._writer.write(frame)
+                self.frames_written += 1
+            except Exception as exc:
+                self.error = str(exc)
+
+    def write(self, frame: Any) -> None:
+        """Queue one BGR frame for encoding. The array must not be modified by the caller afterwards."""
+        if self._closed:
+            raise RuntimeError("StreamingVideoWriter is closed")
+        if frame is not None:
+            self._queue.put(frame)
+
+    def close(self) -> bool:
+        """Flush queued frames, release the writer and return success."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+            if self._writer is not None:
+                try:
+                    self._writer.release()
+                except Exception as exc:
+                    self.error = self.error or str(exc)
+            if self.error:
+                safe_print(f"Video rendering failed: {self.error}")
+            elif self.frames_written:
+                safe_print(f"Final video saved to: {self.output_path}")
+            else:
+                safe_print("No frames were streamed for video rendering.")
+        return self.error is None and self.frames_written > 0
+
+    def __enter__(self) -> "StreamingVideoWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def make_video_from_images(
+    images_dir: str,
+    output_path: str,
+    fps: int = 1,
+    backend: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    **encoder_options: Any,
+) -> bool:
     """Create a video from images in `images_dir`.
 
     - Expects annotated frames (e.g., from detection step).
-    - Writes MP4 by default using 'mp4v' codec.
+    - Encodes with open_encoder: ffmpeg/libx264 when available, else MP4 using 'mp4v' codec.
     - Falls back to AVI ('XVID') if MP4 writer cannot be opened.
+    - progress_callback: called with (images done, images total) after each image.
     """
     try:
         images = _list_images_sorted(images_dir)
@@ -46,21 +306,13 @@ def make_video_from_images(images_dir: str, output_path: str, fps: int = 1) -> b
             return False
 
         height, width = first_img.shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-        if not writer.isOpened():
-            # Fallback to AVI
-            safe_print("MP4 writer not available; falling back to AVI.")
-            avi_path = os.path.splitext(output_path)[0] + ".avi"
-            fourcc_avi = cv2.VideoWriter_fourcc(*"XVID")
-            writer = cv2.VideoWriter(avi_path, fourcc_avi, fps, (width, height))
-            if not writer.isOpened():
-                safe_print("Failed to open any video writer.")
-                return False
-            output_path = avi_path
-
-        for img_name in images:
+        writer, output_path = open_encoder(output_path, fps, (width, height), backend=backend, **encoder_options)
+        if writer is None:
+            return False
+
+        for done, img_name in enumerate(images):
+            if progress_callback is not None and done:
+                progress_callback(done, len(images))
             img_path = os.path.join(images_dir, img_name)
             frame = cv2.imread(img_path)
             if frame is None:
@@ -72,6 +324,8 @@ def make_video_from_images(images_dir: str, output_path: str, fps: int = 1) -> b
             writer.write(frame)
 
         writer.release()
+        if progress_callback is not None:
+            progress_callback(len(images), len(images))
         safe_print(f"Final video saved to: {output_path}")
         return True
     except Exception as exc:
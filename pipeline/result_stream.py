@@ -0,0 +1,199 @@
+"""Streaming per-frame results (JSONL) with bounded memory.
+
+Detection stages can append one record per frame to a JSON Lines file as soon as the
+frame is processed (see the record_sink argument of run_yolo / run_face_detection),
+instead of accumulating every frame in memory until the end:
+
+    {"frame": "frame_0001.jpg", "detections": [...]}     # objects stream
+    {"frame": "frame_0001.jpg", "faces": [...]}          # faces stream
+    {"frame": "frame_0001.jpg", "monument": {...}}       # monuments stream
+
+Each record is flushed when written, so a crash loses at most the frame in flight.
+finalize_results() merges the stage streams frame by frame (each stream is in frame
+order) and writes the usual detection_results.json plus the summary counts, holding
+only one frame in memory at a time.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _drop_partial_line(path: str) -> None:
+    """Truncate a stream after its last newline (a record cut short by a crash)."""
+    try:
+        with open(path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                nl = chunk.rfind(b"\n")
+                if nl >= 0:
+                    pos = pos - step + nl + 1
+                    break
+                pos -= step
+            if pos != size:
+                f.truncate(pos)
+    except OSError:
+        pass
+
+
+class JsonlRecordWriter:
+    """Append JSON records, one per line, flushing after each one.
+
+    Usable as a record_sink: writer.sink("detections") returns a callable(frame, value).
+    append: continue an existing stream (e.g. resuming after a crash, with the frames from
+    completed_frames skipped); a truncated last line is dropped first.
+    """
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.records_written = 0
+        if append:
+            _drop_partial_line(path)
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._f.flush()
+        self.records_written += 1
+
+    def sink(self, field: str):
+        """Callable(frame, value) writing {"frame": frame, field: value}."""
+        return lambda frame, value: self.write({"frame": frame, field: value})
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self) -> "JsonlRecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSONL stream; a truncated last line (crash mid-write) is skipped."""
+    if not path or not os.path.isfile(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def completed_frames(path: str) -> set:
+    """Frames already present in a stream (to resume a stage after a crash)."""
+    return {rec.get("frame") for rec in iter_records(path)}
+
+
+def merge_streams(streams: Dict[str, Optional[str]]) -> Iterator[Dict[str, Any]]:
+    """Merge stage streams into frame entries, in frame order.
+
+    streams: { field: jsonl path } with field in "detections", "faces", "monument".
+    Each stream must be sorted by frame name (stages iterate frames in sorted order).
+    Yields {"frame", "detections", "faces", "monument"} per frame.
+    """
+    def keyed(field: str, path: str) -> Iterator[tuple]:
+        for seq, rec in enumerate(iter_records(path)):
+            yield rec.get("frame") or "", seq, field, rec.get(field)
+
+    iters = [keyed(field, path) for field, path in streams.items() if path]
+    entry: Optional[Dict[str, Any]] = None
+    for frame, _, field, value in heapq.merge(*iters):
+        if entry is None or entry["frame"] != frame:
+            if entry is not None:
+                yield entry
+            entry = {"frame": frame, "detections": [], "faces": [], "monument": {}}
+        entry[field] = value if value is not None else entry[field]
+    if entry is not None:
+        yield entry
+
+
+def write_json_array(
+    output_path: str,
+    header: Dict[str, Any],
+    field: str,
+    records: Iterator[Any],
+    indent: Optional[int] = None,
+) -> int:
+    """Atomically write {**header, field: [records...]} one record at a time. Returns the record count."""
+    count = 0
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # Header fields first, then the array written entry by entry
+        head = json.dumps(header)[:-1]
+        f.write(head + (", " if len(head) > 1 else "") + json.dumps(field) + ": [")
+        for rec in records:
+            f.write((", " if count else "") + json.dumps(rec, indent=indent))
+            count += 1
+        f.write("]}")
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def finalize_results(
+    output_json_path: str,
+    streams: Dict[str, Optional[str]],
+    video_id: str,
+    conf_threshold: float,
+    object_model: str = "yolov8n",
+    face_model: str = "buffalo_l",
+    run_stats: Optional[Dict[str, Any]] = None,
+    frame_times: Optional[Dict[str, float]] = None,
+    source_video: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Write detection_results.json from stage streams, one frame at a time.
+
+    The file has the same shape as save_detection_results writes. Returns the summary:
+    {total_frames, total_detections, total_face_detections, by_class} (by_class counts
+    per label like generate_summary).
+    """
+    ft = frame_times or {}
+    header: Dict[str, Any] = {
+        "video_id": video_id,
+        "confidence_threshold": conf_threshold,
+        "object_model": object_model,
+        "face_model": face_model,
+    }
+    if run_stats is not None:
+        header["run_stats"] = run_stats
+    if source_video:
+        header["source_video"] = source_video
+
+    counts = {"detections": 0, "faces": 0}
+    by_class: Dict[str, int] = {}
+
+    def entries() -> Iterator[Dict[str, Any]]:
+        for entry in merge_streams(streams):
+            if entry["frame"] in ft:
+                entry["time_sec"] = ft[entry["frame"]]
+            dets: List[Dict[str, Any]] = entry["detections"] or []
+            counts["detections"] += len(dets)
+            for d in dets:
+                label = d.get("label") or (d.get("color", "") + " " + d.get("class", "unknown")).strip() or "unknown"
+                by_class[label] = by_class.get(label, 0) + 1
+            counts["faces"] += len(entry["faces"] or [])
+            yield entry
+
+    total_frames = write_json_array(output_json_path, header, "frames", entries())
+    total_dets = counts["detections"]
+    total_faces = counts["faces"]
+    return {
+        "total_frames": total_frames,
+        "total_detections": total_dets,
+        "total_face_detections": total_faces,
+        "by_class": by_class,
+    }
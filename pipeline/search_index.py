@@ -0,0 +1,383 @@
+"""Embedded local search index over processed results (works without MongoDB).
+
+An SQLite file (vista-prototype/search_index.sqlite) holds an inverted index from terms
+to (video_id, frame, time_sec) postings. Terms are field-qualified, lowercased values,
+with underscores read as spaces:
+
+    class:car   color:red   label:red car   face:alice   monument:taj mahal
+
+and every value (and each word of a multi-word value) is also indexed as any:<value>.
+Postings are clustered by term (WITHOUT ROWID primary key), so a term lookup is one
+index range scan whatever the number of videos.
+
+Queries match frames; results are grouped per video:
+
+    alice "red car"              both in the same frame (implicit AND)
+    face:alice AND class:car
+    bus OR truck
+    monument:"taj mahal" -person   (NOT person; also "NOT person")
+    (alice OR bob) AND color:red
+
+search() also takes a time range (start_sec <= time_sec < end_sec) and a video filter.
+index_detection_payload() replaces one video's postings in a single transaction.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .paths import SEARCH_INDEX_PATH
+
+FIELDS = ("class", "color", "label", "face", "monument", "any")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    source_url TEXT,
+    frame_count INTEGER,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    video_id TEXT NOT NULL,
+    frame TEXT NOT NULL,
+    time_sec REAL NOT NULL,
+    PRIMARY KEY (video_id, frame)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    frame TEXT NOT NULL,
+    time_sec REAL NOT NULL,
+    conf REAL,
+    PRIMARY KEY (term, video_id, frame)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_video ON postings (video_id);
+"""
+
+
+def _normalize(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "").replace("_", " ")).strip().lower()
+
+
+def connect(db_path: str = SEARCH_INDEX_PATH) -> sqlite3.Connection:
+    """Open the index (created on first use). WAL lets searches run while a video is indexed."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _frame_terms(entry: Dict[str, Any]) -> Dict[str, float]:
+    """{term: best confidence} for one frame entry of detection_results.json."""
+    terms: Dict[str, float] = {}
+
+    def add(field: str, value: Any, conf: Any) -> None:
+        value = _normalize(value)
+        if not value or value == "unknown":
+            return
+        c = float(conf or 0)
+        keys = [f"{field}:{value}", f"any:{value}"]
+        words = value.split(" ")
+        if len(words) > 1:
+            keys += [f"any:{w}" for w in words]
+        for term in keys:
+            if c > terms.get(term, -1.0):
+                terms[term] = c
+
+    for d in entry.get("detections") or []:
+        conf = d.get("conf", 0)
+        add("class", d.get("class"), conf)
+        add("color", d.get("color"), conf)
+        add("label", d.get("label") or f"{d.get('color', '')} {d.get('class', '')}", conf)
+    for f in entry.get("faces") or []:
+        label = str(f.get("label") or "")
+        if label.startswith("Maybe:"):
+            label = label[6:]
+        add("face", label, f.get("recognition_confidence", f.get("confidence", 0)))
+    mon = entry.get("monument") or {}
+    if mon:
+        add("monument", mon.get("label"), mon.get("confidence", 0))
+    return terms
+
+
+def _frame_time(entry: Dict[str, Any]) -> float:
+    if entry.get("time_sec") is not None:
+        return float(entry["time_sec"])
+    m = re.search(r"(\d+)", entry.get("frame") or "")
+    return float(int(m.group(1)) - 1) if m else 0.0
+
+
+def index_detection_payload(
+    payload: Dict[str, Any],
+    meta: Optional[Dict[str, Any]] = None,
+    source_url: Optional[str] = None,
+    db_path: str = SEARCH_INDEX_PATH,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """Replace one video's postings with those of a detection_results.json payload.
+
+    Returns the number of postings written. conn: reuse an open connection (bulk loads).
+    """
+    video_id = payload.get("video_id") or ""
+    if not video_id:
+        return 0
+    frames = payload.get("frames") or []
+    own = conn is None
+    if own:
+        conn = connect(db_path)
+    try:
+        rows: List[Tuple[str, str, str, float, float]] = []
+        frame_rows: List[Tuple[str, str, float]] = []
+        for entry in frames:
+            name = entry.get("frame") or ""
+            t = _frame_time(entry)
+            frame_rows.append((video_id, name, t))
+            for term, conf in _frame_terms(entry).items():
+                rows.append((term, video_id, name, t, round(conf, 4)))
+        meta = meta or {}
+        with conn:
+            conn.execute("DELETE FROM postings WHERE video_id = ?", (video_id,))
+            conn.execute("DELETE FROM frames WHERE video_id = ?", (video_id,))
+            conn.executemany("INSERT OR REPLACE INTO frames VALUES (?, ?, ?)", frame_rows)
+            conn.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?)",
+                (video_id, meta.get("title"), source_url or meta.get("webpage_url"), len(frame_rows), time.time()),
+            )
+        return len(rows)
+    finally:
+        if own:
+            conn.close()
+
+
+def index_detection_json(detection_json_path: str, **kwargs: Any) -> int:
+    """index_detection_payload for a detection_results.json file."""
+    with open(detection_json_path, "r", encoding="utf-8") as f:
+        return index_detection_payload(json.load(f), **kwargs)
+
+
+def remove_video(video_id: str, db_path: str = SEARCH_INDEX_PATH) -> None:
+    conn = connect(db_path)
+    try:
+        with conn:
+            for table in ("postings", "frames", "videos"):
+                conn.execute(f"DELETE FROM {table} WHERE video_id = ?", (video_id,))
+    finally:
+        conn.close()
+
+
+# --- Query parsing -------------------------------------------------------------------
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(-)|([A-Za-z]+):"([^"]*)"|"([^"]*)"|([^\s()"]+))')
+
+
+def _tokenize(query: str) -> List[Tuple[str, Any]]:
+    tokens: List[Tuple[str, Any]] = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        m = _TOKEN.match(query, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Cannot parse query near: {query[pos:]!r}")
+        pos = m.end()
+        lparen, rparen, minus, field_q, value_q, phrase, word = m.groups()
+        if lparen:
+            tokens.append(("(", None))
+        elif rparen:
+            tokens.append((")", None))
+        elif minus:
+            tokens.append(("NOT", None))
+        elif field_q:
+            tokens.append(("TERM", (field_q.lower(), value_q)))
+        elif phrase is not None:
+            tokens.append(("TERM", ("any", phrase)))
+        elif word.upper() in ("AND", "OR", "NOT"):
+            tokens.append((word.upper(), None))
+        elif ":" in word:
+            field, value = word.split(":", 1)
+            tokens.append(("TERM", (field.lower(), value)))
+        else:
+            tokens.append(("TERM", ("any", word)))
+    return tokens
+
+
+class _Parser:
+    """or := and (OR and)* ; and := unary ((AND)? unary)* ; unary := NOT unary | atom."""
+
+    def __init__(self, tokens: List[Tuple[str, Any]]) -> None:
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.i][0] if self.i < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, Any]:
+        tok = self.tokens[self.i]
+        self.i += 1
+        return tok
+
+    def parse(self) -> Any:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError("Unexpected token in query")
+        return node
+
+    def parse_or(self) -> Any:
+        node = self.parse_and()
+        while self.peek() == "OR":
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Any:
+        node = self.parse_unary()
+        while self.peek() in ("AND", "NOT", "TERM", "("):
+            if self.peek() == "AND":
+                self.take()
+            node = ("and", node, self.parse_unary())
+        return node
+
+    def parse_unary(self) -> Any:
+        if self.peek() == "NOT":
+            self.take()
+            return ("not", self.parse_unary())
+        if self.peek() == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("Missing closing parenthesis")
+            self.take()
+            return node
+        if self.peek() == "TERM":
+            field, value = self.take()[1]
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field {field!r} (use one of {', '.join(FIELDS)})")
+            value = _normalize(value)
+            if not value:
+                raise ValueError("Empty search term")
+            return ("term", f"{field}:{value}")
+        raise ValueError("Expected a search term")
+
+
+def parse_query(query: str) -> Any:
+    """Parse a boolean query into a small AST; raises ValueError on syntax errors."""
+    tokens = _tokenize(query or "")
+    if not tokens:
+        raise ValueError("Empty query")
+    return _Parser(tokens).parse()
+
+
+def _compile(node: Any, where: str, where_args: List[Any]) -> Tuple[str, List[Any]]:
+    """SQL selecting (video_id, frame, time_sec) of the frames matching node."""
+    kind = node[0]
+    if kind == "term":
+        return (
+            f"SELECT video_id, frame, time_sec FROM postings WHERE term = ?{where}",
+            [node[1]] + where_args,
+        )
+    if kind == "not":
+        inner, args = _compile(node[1], where, where_args)
+        universe = f"SELECT video_id, frame, time_sec FROM frames WHERE 1 = 1{where}"
+        return f"SELECT * FROM ({universe} EXCEPT SELECT * FROM ({inner}))", where_args + args
+    left, largs = _compile(node[1], where, where_args)
+    right, rargs = _compile(node[2], where, where_args)
+    op = "INTERSECT" if kind == "and" else "UNION"
+    if kind == "and" and node[2][0] == "not":
+        # a AND NOT b: a EXCEPT b (no need to scan every frame)
+        right, rargs = _compile(node[2][1], where, where_args)
+        op = "EXCEPT"
+    return f"SELECT * FROM ({left}) {op} SELECT * FROM ({right})", largs + rargs
+
+
+def _filters(
+    start_sec: Optional[float],
+    end_sec: Optional[float],
+    video_ids: Optional[List[str]],
+) -> Tuple[str, List[Any]]:
+    where = ""
+    args: List[Any] = []
+    if start_sec is not None:
+        where += " AND time_sec >= ?"
+        args.append(float(start_sec))
+    if end_sec is not None:
+        where += " AND time_sec < ?"
+        args.append(float(end_sec))
+    if video_ids:
+        where += f" AND video_id IN ({','.join('?' * len(video_ids))})"
+        args.extend(video_ids)
+    return where, args
+
+
+def search(
+    query: str,
+    start_sec: Optional[float] = None,
+    end_sec: Optional[float] = None,
+    video_id: Optional[str] = None,
+    limit_videos: int = 20,
+    limit_frames: int = 50,
+    db_path: str = SEARCH_INDEX_PATH,
+) -> Dict[str, Any]:
+    """Run a boolean query. Returns {query, total_videos, results: [{video_id, title,
+    source_url, hits, first_sec, frames: [{frame, time_sec}]}], took_ms}; videos are ordered
+    by number of matching frames. Raises ValueError for invalid queries.
+    """
+    t0 = time.perf_counter()
+    ast = parse_query(query)
+    conn = connect(db_path)
+    try:
+        # Per-video hit counts are aggregated in SQL; frames are then fetched for the top
+        # videos only (the same query restricted to them)
+        where, where_args = _filters(start_sec, end_sec, [video_id] if video_id else None)
+        matched, args = _compile(ast, where, where_args)
+        ranked = conn.execute(
+            f"SELECT video_id, COUNT(*) AS hits, MIN(time_sec) FROM ({matched}) "
+            "GROUP BY video_id ORDER BY hits DESC, video_id",
+            args,
+        ).fetchall()
+        top = ranked[:limit_videos]
+        frames_by_video: Dict[str, List[Dict[str, Any]]] = {}
+        if top:
+            where, where_args = _filters(start_sec, end_sec, [vid for vid, _, _ in top])
+            matched, args = _compile(ast, where, where_args)
+            for vid, frame, t in conn.execute(f"SELECT * FROM ({matched}) ORDER BY video_id, time_sec", args):
+                hits = frames_by_video.setdefault(vid, [])
+                if len(hits) < limit_frames:
+                    hits.append({"frame": frame, "time_sec": t})
+        info = _video_info(conn, [vid for vid, _, _ in top])
+    finally:
+        conn.close()
+
+    results = []
+    for vid, hits, first_sec in top:
+        title, source_url = info.get(vid, (None, None))
+        results.append({
+            "video_id": vid,
+            "title": title,
+            "source_url": source_url,
+            "hits": hits,
+            "first_sec": first_sec,
+            "frames": frames_by_video.get(vid, []),
+        })
+    return {
+        "query": query,
+        "total_videos": len(ranked),
+        "results": results,
+        "took_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def _video_info(conn: sqlite3.Connection, video_ids: Iterable[str]) -> Dict[str, Tuple[Any, Any]]:
+    ids = list(video_ids)
+    if not ids:
+        return {}
+    marks = ",".join("?" * len(ids))
+    rows = conn.execute(f"SELECT video_id, title, source_url FROM videos WHERE video_id IN ({marks})", ids)
+    return {vid: (title, url) for vid, title, url in rows}
@@ -0,0 +1,319 @@
+"""Render the annotated video at the source frame rate from the original file plus detection JSON.
+
+Detections are sampled (1 frame per second by default), so instead of rendering a slideshow
+of annotated stills this module decodes the original video and draws the overlays of the
+nearest sample on every source frame:
+
+- "hold": each sample's boxes stay on screen until the next sample (at most hold_sec).
+- "interpolate": boxes of consecutive samples are associated by track (same class/label,
+  best IoU) and linearly interpolated in between; unmatched boxes switch at the midpoint.
+
+The frame range can be split into segments rendered by parallel worker processes and
+concatenated at the end (ffmpeg concat when available, else re-encoded with OpenCV).
+processed_frames/ is not needed at all.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+
+from .annotate import compose_annotations
+from .render import open_encoder, find_ffmpeg
+from .utils import safe_print
+
+RENDER_MODES = ("hold", "interpolate")
+
+
+def _frame_number(frame_filename: str) -> int:
+    m = re.search(r"(\d+)", frame_filename or "")
+    return int(m.group(1), 10) if m else 0
+
+
+def load_overlay_timeline(detection_json: Any) -> List[Dict[str, Any]]:
+    """Return [{time_sec, frame, detections, faces, monument}] sorted by time.
+
+    detection_json: path to detection_results.json or its parsed payload. Frames without
+    "time_sec" (older results) fall back to one sample per second from 0.
+    """
+    if isinstance(detection_json, str):
+        with open(detection_json, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    else:
+        payload = detection_json
+    timeline = []
+    for fr in payload.get("frames") or []:
+        name = fr.get("frame") or ""
+        t = fr.get("time_sec")
+        if t is None:
+            t = max(0, _frame_number(name) - 1) * 1.0
+        timeline.append({
+            "time_sec": float(t),
+            "frame": name,
+            "detections": fr.get("detections") or [],
+            "faces": fr.get("faces") or [],
+            "monument": fr.get("monument") or {},
+        })
+    timeline.sort(key=lambda e: e["time_sec"])
+    return timeline
+
+
+def _sample_interval(times: List[float]) -> float:
+    """Median spacing between samples (1.0 when unknown)."""
+    if len(times) < 2:
+        return 1.0
+    diffs = sorted(b - a for a, b in zip(times, times[1:]) if b > a)
+    return diffs[len(diffs) // 2] if diffs else 1.0
+
+
+def _iou(a: List[float], b: List[float]) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _match_tracks(
+    prev: List[Dict[str, Any]],
+    nxt: List[Dict[str, Any]],
+    key: str,
+    min_iou: float = 0.1,
+) -> List[Tuple[int, int]]:
+    """Greedy association of boxes between two samples: same `key` value, highest IoU first."""
+    candidates = []
+    for i, a in enumerate(prev):
+        for j, b in enumerate(nxt):
+            if a.get(key) != b.get(key) or len(a.get("bbox") or []) < 4 or len(b.get("bbox") or []) < 4:
+                continue
+            iou = _iou(a["bbox"], b["bbox"])
+            if iou >= min_iou:
+                candidates.append((iou, i, j))
+    candidates.sort(reverse=True)
+    used_i, used_j, pairs = set(), set(), []
+    for _, i, j in candidates:
+        if i not in used_i and j not in used_j:
+            used_i.add(i)
+            used_j.add(j)
+            pairs.append((i, j))
+    return pairs
+
+
+def _interpolate_records(
+    prev: List[Dict[str, Any]],
+    nxt: List[Dict[str, Any]],
+    alpha: float,
+    key: str,
+) -> List[Dict[str, Any]]:
+    pairs = _match_tracks(prev, nxt, key)
+    out = []
+    for i, j in pairs:
+        rec = dict(prev[i] if alpha < 0.5 else nxt[j])
+        rec["bbox"] = [
+            (1.0 - alpha) * float(pa) + alpha * float(pb)
+            for pa, pb in zip(prev[i]["bbox"][:4], nxt[j]["bbox"][:4])
+        ]
+        out.append(rec)
+    matched_i = {i for i, _ in pairs}
+    matched_j = {j for _, j in pairs}
+    if alpha < 0.5:
+        out.extend(r for k, r in enumerate(prev) if k not in matched_i)
+    else:
+        out.extend(r for k, r in enumerate(nxt) if k not in matched_j)
+    return out
+
+
+def overlays_at(
+    timeline: List[Dict[str, Any]],
+    times: List[float],
+    t: float,
+    mode: str = "hold",
+    hold_sec: float = 1.0,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+    """Return (detections, faces, monument) to draw at source time t."""
+    k = bisect.bisect_right(times, t) - 1
+    if k < 0 or t - times[k] > hold_sec:
+        return [], [], {}
+    cur = timeline[k]
+    if mode != "interpolate" or k + 1 >= len(timeline):
+        return cur["detections"], cur["faces"], cur["monument"]
+    nxt = timeline[k + 1]
+    span = nxt["time_sec"] - cur["time_sec"]
+    if span <= 0 or span > 2 * hold_sec:
+        return cur["detections"], cur["faces"], cur["monument"]
+    alpha = (t - cur["time_sec"]) / span
+    dets = _interpolate_records(cur["detections"], nxt["detections"], alpha, "class")
+    faces = _interpolate_records(cur["faces"], nxt["faces"], alpha, "label")
+    monument = cur["monument"] if alpha < 0.5 else nxt["monument"]
+    return dets, faces, monument
+
+
+def _render_segment(job: Dict[str, Any]) -> Tuple[Optional[str], int]:
+    """Worker: decode [start_frame, end_frame) of the source video, draw overlays, encode to job["output"]."""
+    cap = cv2.VideoCapture(job["video_path"])
+    if not cap.isOpened():
+        return None, 0
+    timeline = job["timeline"]
+    times = [e["time_sec"] for e in timeline]
+    src_fps = job["src_fps"]
+    encoder, out_path = None, None
+    written = 0
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, job["start_frame"])
+        for frame_idx in range(job["start_frame"], job["end_frame"]):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if encoder is None:
+                h, w = frame.shape[:2]
+                encoder, out_path = open_encoder(job["output"], src_fps, (w, h), backend=job.get("backend"))
+                if encoder is None:
+                    return None, 0
+            dets, faces, monument = overlays_at(
+                timeline, times, frame_idx / src_fps, mode=job["mode"], hold_sec=job["hold_sec"],
+            )
+            # Copy the monument dict: compose_annotations stores the pseudo bbox into it
+            encoder.write(compose_annotations(frame, dets, faces, dict(monument) if monument else None))
+            written += 1
+    finally:
+        cap.release()
+        if encoder is not None:
+            encoder.release()
+    return out_path, written
+
+
+def concat_videos(segment_paths: List[str], output_path: str, fps: float, backend: Optional[str] = None) -> Optional[str]:
+    """Concatenate rendered segments (same size/codec). Returns the output path or None."""
+    ffmpeg = find_ffmpeg()
+    if ffmpeg:
+        list_path = output_path + ".segments.txt"
+        try:
+            with open(list_path, "w", encoding="utf-8") as f:
+                for p in segment_paths:
+                    f.write("file '{}'\n".format(os.path.abspath(p).replace("'", "'\\''")))
+            with tempfile.TemporaryFile() as err:
+                rc = subprocess.run(
+                    [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                     "-c", "copy", "-movflags", "+faststart", output_path],
+                    stdout=subprocess.DEVNULL, stderr=err,
+                ).returncode
+                if rc == 0:
+                    return output_path
+                err.seek(0)
+                detail = (err.read().decode("utf-8", "replace").strip().splitlines() or [f"exit code {rc}"])[-1]
+            safe_print(f"ffmpeg concat failed ({detail}); re-encoding segments with OpenCV.")
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    encoder, out_path = None, None
+    for p in segment_paths:
+        cap = cv2.VideoCapture(p)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if encoder is None:
+                    h, w = frame.shape[:2]
+                    encoder, out_path = open_encoder(output_path, fps, (w, h), backend=backend)
+                    if encoder is None:
+                        return None
+                encoder.write(frame)
+        finally:
+            cap.release()
+    if encoder is not None:
+        encoder.release()
+    return out_path
+
+
+def render_overlay_video(
+    video_path: str,
+    detection_json: Any,
+    output_path: str,
+    mode: str = "hold",
+    workers: int = 1,
+    start_seconds: Optional[float] = None,
+    end_seconds: Optional[float] = None,
+    backend: Optional[str] = None,
+) -> Optional[str]:
+    """Render detection overlays on the original video at its native frame rate.
+
+    detection_json: path to detection_results.json or its payload.
+    mode: "hold" or "interpolate" (see RENDER_MODES).
+    workers: > 1 splits the range into that many segments rendered in parallel processes.
+    start_seconds/end_seconds: default to the first sample and one sample interval past the last.
+    Returns the written video path (may differ in extension after fallback), or None on failure.
+    """
+    timeline = load_overlay_timeline(detection_json)
+    if not timeline:
+        safe_print("No detection frames to render.")
+        return None
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        safe_print(f"Error: Could not open source video {video_path}.")
+        return None
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+
+    times = [e["time_sec"] for e in timeline]
+    hold_sec = _sample_interval(times)
+    t0 = times[0] if start_seconds is None else start_seconds
+    t1 = times[-1] + hold_sec if end_seconds is None else end_seconds
+    start_frame = max(0, int(round(t0 * src_fps)))
+    end_frame = int(round(t1 * src_fps))
+    if total_frames > 0:
+        end_frame = min(end_frame, total_frames)
+    if end_frame <= start_frame:
+        safe_print("Empty render range.")
+        return None
+
+    mode = mode if mode in RENDER_MODES else "hold"
+    workers = max(1, int(workers))
+    n_frames = end_frame - start_frame
+    workers = min(workers, max(1, n_frames // max(1, int(src_fps))))
+
+    def _job(s: int, e: int, out: str) -> Dict[str, Any]:
+        # Only ship the samples that can affect this segment to the worker
+        lo = max(0, bisect.bisect_right(times, s / src_fps) - 1)
+        hi = bisect.bisect_right(times, e / src_fps) + 1
+        return {
+            "video_path": video_path, "output": out, "start_frame": s, "end_frame": e,
+            "src_fps": src_fps, "timeline": timeline[lo:hi], "mode": mode,
+            "hold_sec": hold_sec, "backend": backend,
+        }
+
+    if workers == 1:
+        out_path, written = _render_segment(_job(start_frame, end_frame, output_path))
+        if out_path:
+            safe_print(f"Final video saved to: {out_path} ({written} frames at {src_fps:.2f} fps)")
+        return out_path
+
+    bounds = [start_frame + (n_frames * i) // workers for i in range(workers + 1)]
+    with tempfile.TemporaryDirectory(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_path))) as tmp:
+        jobs = [
+            _job(bounds[i], bounds[i + 1], os.path.join(tmp, f"segment_{i:03d}.mp4"))
+            for i in range(workers)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_segment, jobs))
+        segments = [p for p, n in results if p and n > 0]
+        if len(segments) != len(jobs):
+            # A video with a gap is not a rendered video
+            safe_print(f"{len(jobs) - len(segments)} of {len(jobs)} segments failed to render.")
+            return None
+        out_path = concat_videos(segments, output_path, src_fps, backend=backend)
+    if out_path:
+        safe_print(f"Final video saved to: {out_path} ({workers} segments at {src_fps:.2f} fps)")
+    return out_path
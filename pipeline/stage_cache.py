@@ -0,0 +1,164 @@
+"""Parameter-aware cache of per-stage results (objects, faces, monuments).
+
+Each stage's output is stored under results/<video_id>/stage_cache/ keyed by
+(stage, model, scan range, stage parameters), so a request that differs from a
+previous one only reruns what actually changed:
+
+- Objects are detected at a low floor confidence (RAW_CONF_FLOOR) and stored raw;
+  any conf_threshold >= the floor is served by filtering the stored detections.
+- Monuments are stored with their raw best label and confidence; the threshold is
+  applied when reading (below it the label becomes "Unknown", as the recognizer does).
+- Faces are keyed by face model and face confidence threshold (face indices must
+  stay aligned with face_embeddings.npz, so they are not re-filtered).
+- A different model or scan range misses only the affected stage entries.
+- Timeline entries (stage_key(..., None, None, ...)) hold every scanned window of a video:
+  frames are keyed by absolute-time names and "covered" lists the scanned intervals, so a
+  new window only processes what is not covered yet (see pipeline.timeline, update_stage).
+
+Entries are JSON: {"stage", "params", "frame_times", "covered", "frames": {frame: records}}.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .timeline import frames_in_window, merge_intervals
+
+# Floor used when detecting objects for the cache (env VISTA_RAW_CONF_FLOOR)
+RAW_CONF_FLOOR = float(os.environ.get("VISTA_RAW_CONF_FLOOR", "0.1"))
+
+STAGES = ("objects", "faces", "monuments")
+
+
+def stage_key(
+    stage: str,
+    model: str,
+    start_seconds: Optional[float],
+    end_seconds: Optional[float],
+    **params: Any,
+) -> str:
+    """Filename-safe key for a stage entry, e.g. "objects__yolov8n__0-180__3f2a9c1b".
+
+    With start_seconds and end_seconds None the key names the video's timeline entry
+    ("objects__yolov8n__timeline__3f2a9c1b").
+    """
+    model_part = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(model or "none"))
+    if start_seconds is None and end_seconds is None:
+        range_part = "timeline"
+    else:
+        range_part = f"{float(start_seconds):g}-{float(end_seconds):g}"
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:8]
+    return f"{stage}__{model_part}__{range_part}__{digest}"
+
+
+def stage_cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key + ".json")
+
+
+def load_stage(cache_dir: str, key: str) -> Optional[Dict[str, Any]]:
+    """Return the stored entry for key, or None when missing/unreadable."""
+    try:
+        with open(stage_cache_path(cache_dir, key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and isinstance(entry.get("frames"), dict) else None
+
+
+def save_stage(
+    cache_dir: str,
+    key: str,
+    stage: str,
+    frames: Dict[str, Any],
+    frame_times: Optional[Dict[str, float]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    covered: Optional[List[List[float]]] = None,
+) -> str:
+    """Store a stage result atomically. Returns the entry path."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = stage_cache_path(cache_dir, key)
+    entry = {"stage": stage, "params": params or {}, "frame_times": frame_times or {}, "frames": frames}
+    if covered is not None:
+        entry["covered"] = covered
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def entry_covered(entry: Optional[Dict[str, Any]]) -> List[List[float]]:
+    """Intervals a timeline entry has scanned ([] when there is no entry)."""
+    return merge_intervals((entry or {}).get("covered") or [])
+
+
+def update_stage(
+    cache_dir: str,
+    key: str,
+    stage: str,
+    entry: Optional[Dict[str, Any]],
+    frames: Dict[str, Any],
+    frame_times: Dict[str, float],
+    intervals: Iterable[Sequence[float]],
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Merge results for newly scanned intervals into a timeline entry and store it.
+
+    The intervals are recorded as covered, so only call this when the stage really ran:
+    frames=None (a stage that could not run, e.g. a missing model) raises ValueError.
+    Returns the updated entry (same shape as load_stage returns).
+    """
+    if frames is None:
+        raise ValueError(f"{stage} stage did not run; not recording {key} as covered")
+    merged_frames = dict((entry or {}).get("frames") or {})
+    merged_frames.update(frames)
+    merged_times = dict((entry or {}).get("frame_times") or {})
+    merged_times.update(frame_times)
+    covered = merge_intervals(entry_covered(entry) + [list(iv) for iv in intervals])
+    save_stage(cache_dir, key, stage, merged_frames, merged_times, params, covered=covered)
+    return {
+        "stage": stage,
+        "params": params or {},
+        "frame_times": merged_times,
+        "covered": covered,
+        "frames": merged_frames,
+    }
+
+
+def window_frames(entry: Dict[str, Any], start: float, end: float) -> Dict[str, Any]:
+    """Results of a timeline entry for the frames with start <= time_sec < end."""
+    frames = entry.get("frames") or {}
+    return {
+        name: frames[name]
+        for name in frames_in_window(entry.get("frame_times") or {}, start, end)
+        if name in frames
+    }
+
+
+def filter_detections(
+    results_by_frame: Dict[str, List[Dict[str, Any]]],
+    conf_threshold: float,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Keep detections with conf >= conf_threshold (every frame key is kept)."""
+    return {
+        fname: [d for d in dets if float(d.get("conf", 0)) >= conf_threshold]
+        for fname, dets in results_by_frame.items()
+    }
+
+
+def filter_monuments(
+    monuments_by_frame: Dict[str, Dict[str, Any]],
+    confidence_threshold: float,
+) -> Dict[str, Dict[str, Any]]:
+    """Apply the threshold to raw monument results (label "Unknown" below it)."""
+    out = {}
+    for fname, info in monuments_by_frame.items():
+        rec = dict(info)
+        if float(rec.get("confidence", 0)) < confidence_threshold:
+            rec["label"] = "Unknown"
+        out[fname] = rec
+    return out
@@ -0,0 +1,117 @@
+"""Absolute-time frame storage and interval coverage for incremental window scans.
+
+Frames extracted for the web pipeline are named by their absolute sample index in the
+video (extract_frames(..., absolute_names=True), e.g. frame_000181.jpg is the sample at
+~180 s), so frames from different scan windows never collide and are never wiped.
+frames/<video_id>/frames.json records which time intervals are on disk:
+
+    {"intervals": [[0.0, 180.0], [180.0, 360.0]],     # merged on save
+     "frame_times": {"frame_000001.jpg": 0.0, ...}}
+
+Stage cache entries carry the same kind of coverage ("covered"), so a new window only
+extracts and processes the seconds not covered yet and is merged with what exists.
+A sample belongs to the window [start, end) when start <= time_sec < end.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+Interval = Tuple[float, float]
+
+
+def merge_intervals(intervals: Iterable[Sequence[float]]) -> List[List[float]]:
+    """Sort and merge overlapping or touching intervals."""
+    merged: List[List[float]] = []
+    for start, end in sorted((float(a), float(b)) for a, b in intervals if float(b) > float(a)):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def uncovered(intervals: Iterable[Sequence[float]], start: float, end: float) -> List[Interval]:
+    """Parts of [start, end) not covered by intervals."""
+    gaps: List[Interval] = []
+    cursor = float(start)
+    for a, b in merge_intervals(intervals):
+        if b <= cursor:
+            continue
+        if a >= end:
+            break
+        if a > cursor:
+            gaps.append((cursor, min(a, end)))
+        cursor = max(cursor, b)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, float(end)))
+    return gaps
+
+
+def covered_parts(intervals: Iterable[Sequence[float]], start: float, end: float) -> List[Interval]:
+    """Parts of [start, end) covered by intervals (the complement of uncovered)."""
+    return [
+        (max(a, float(start)), min(b, float(end)))
+        for a, b in merge_intervals(intervals)
+        if a < end and b > start
+    ]
+
+
+def frames_in_intervals(
+    frame_times: Dict[str, float],
+    intervals: Iterable[Sequence[float]],
+) -> Dict[str, float]:
+    """{frame: time_sec} for the frames whose time falls in any [start, end) interval."""
+    spans = merge_intervals(intervals)
+    return {
+        name: t for name, t in frame_times.items()
+        if any(a <= t < b for a, b in spans)
+    }
+
+
+def frames_in_window(frame_times: Dict[str, float], start: float, end: float) -> Dict[str, float]:
+    return {name: t for name, t in frame_times.items() if start <= t < end}
+
+
+class FrameStore:
+    """Frames of one video on disk, indexed by absolute time (frames/<video_id>/frames.json)."""
+
+    INDEX_NAME = "frames.json"
+
+    def __init__(self, frames_dir: str) -> None:
+        self.frames_dir = frames_dir
+        self.path = os.path.join(frames_dir, self.INDEX_NAME)
+        self.intervals: List[List[float]] = []
+        self.frame_times: Dict[str, float] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.intervals = merge_intervals(data.get("intervals") or [])
+            self.frame_times = {str(k): float(v) for k, v in (data.get("frame_times") or {}).items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            return
+        # Frames deleted behind our back (cleanup, partial copy): start over rather than
+        # trusting a coverage record whose files are gone
+        if any(not os.path.isfile(os.path.join(frames_dir, name)) for name in self.frame_times):
+            self.intervals = []
+            self.frame_times = {}
+
+    def missing(self, start: float, end: float) -> List[Interval]:
+        return uncovered(self.intervals, start, end)
+
+    def window(self, start: float, end: float) -> Dict[str, float]:
+        return frames_in_window(self.frame_times, start, end)
+
+    def add(self, start: float, end: float, frame_times: Optional[Dict[str, float]] = None) -> None:
+        """Record [start, end) as extracted (with its frames) and save the index atomically."""
+        self.frame_times.update(frame_times or {})
+        self.intervals = merge_intervals(self.intervals + [[start, end]])
+        os.makedirs(self.frames_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"intervals": self.intervals, "frame_times": self.frame_times}, f)
+        os.replace(tmp_path, self.path)
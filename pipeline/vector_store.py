@@ -0,0 +1,436 @@
+"""Global vector store of face and scene embeddings for query-by-example search.
+
+One store per kind under vista-prototype/vector_store/<kind>/:
+
+    face    ArcFace embeddings of every detected face (from face_embeddings.npz)
+    scene   ResNet18 features of every frame (from scene_features.npz)
+
+    meta.json              {"dim", "shard_rows", "shards": [{"name", "rows"}], "next_vidx",
+                            "videos": {video_id: {"vidx", "rows", "pad", "hash"}}, "stale_rows"}
+    shard_00000.vec        (rows, dim) float16, L2-normalized, raw row-major
+    shard_00000.q8         (rows, dim) int8, the same vectors scaled to [-127, 127] per row
+    shard_00000.ids        (rows,) records: vidx int32, frame int32, face int16, time_sec
+                           float32, scale float32 (row max |value|, q8 * scale / 127 ~ vec)
+
+Shards are append-only and hold up to shard_rows vectors; meta.json records how many
+rows of each shard are committed (bytes past that, from an interrupted append, are
+truncated by the next writer and ignored by readers). Re-indexing a video gives it a
+new vidx, so its old rows become stale without rewriting shards; compact() drops them.
+Re-indexing with the same vectors (a cached re-run) is a no-op: meta keeps a hash of each
+video's rows. When stale rows pass VISTA_VECTOR_COMPACT_STALE (default 0.5) of all rows,
+the writer that made them stale compacts the store.
+Writers (add_video, remove_video, compact) hold vector_store/<kind>.lock, a file lock
+next to the store directory (compact() swaps the directory), so /api/jobs worker
+processes and the backfill script can index at the same time.
+
+search() memory-maps the shards and scores blocks of rows with one matrix-vector
+product each (cosine similarity, vectors are normalized), spread over a thread pool.
+Blocks are scanned on the int8 copy (converting int8 to float32 is several times
+cheaper than float16, which dominated the scan) and the best candidates of each
+block are re-scored exactly from float16. Memory stays at a few blocks whatever the
+store size.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .locks import FileLock
+from .paths import VECTOR_STORE_DIR
+
+KINDS = ("face", "scene")
+# 1M rows = 1 GB of 512-d float16 per shard
+SHARD_ROWS = int(os.environ.get("VISTA_VECTOR_SHARD_ROWS", str(1 << 20)))
+SEARCH_BLOCK_ROWS = 1 << 16
+# Fraction of stale rows at which add_video / remove_video compact the store
+COMPACT_STALE_FRACTION = float(os.environ.get("VISTA_VECTOR_COMPACT_STALE", "0.5"))
+# Compute ResNet18 scene features for every processed frame (VISTA_SCENE_VECTORS=0 to skip)
+SCENE_VECTORS = os.environ.get("VISTA_SCENE_VECTORS", "1").strip().lower() not in ("0", "false", "no")
+# int8 candidates re-scored from float16, per block: max(RERANK_FACTOR * k, RERANK_MIN)
+RERANK_FACTOR = 4
+RERANK_MIN = 64
+
+_ID_DTYPE = np.dtype([("vidx", "<i4"), ("frame", "<i4"), ("face", "<i2"), ("time_sec", "<f4"), ("scale", "<f4")])
+
+
+def _frame_number(name: str) -> int:
+    m = re.search(r"(\d+)", name or "")
+    return int(m.group(1)) if m else 0
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def save_frame_vectors(path: str, frames: List[str], vectors: Any) -> None:
+    """Write per-frame vectors as .npz (frames (N,), embeddings (N, D) float16)."""
+    emb = np.asarray(vectors, dtype=np.float16) if len(frames) else np.zeros((0, 0), dtype=np.float16)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, frames=np.array(frames, dtype=np.str_), embeddings=emb)
+    os.replace(tmp_path, path)
+
+
+def load_frame_vectors(path: str) -> Optional[Tuple[List[str], np.ndarray]]:
+    """(frames, embeddings float32) written by save_frame_vectors, or None if missing."""
+    if not os.path.isfile(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return [str(f) for f in data["frames"]], data["embeddings"].astype(np.float32)
+
+
+def merge_frame_vectors(path: str, vectors_by_frame: Dict[str, Any]) -> None:
+    """Add {frame: vector} to the file at path (replacing vectors of the same frames)."""
+    if not vectors_by_frame:
+        return
+    old = load_frame_vectors(path)
+    frames: List[str] = []
+    rows: List[Any] = []
+    if old is not None:
+        for name, vec in zip(*old):
+            if name not in vectors_by_frame:
+                frames.append(name)
+                rows.append(vec)
+    for name in sorted(vectors_by_frame):
+        frames.append(name)
+        rows.append(np.asarray(vectors_by_frame[name], dtype=np.float32).reshape(-1))
+    save_frame_vectors(path, frames, np.stack(rows))
+
+
+class VectorStore:
+    """Sharded float16 matrix plus ids for one kind of vector (face or scene)."""
+
+    def __init__(self, kind: str, root: str = VECTOR_STORE_DIR, shard_rows: int = SHARD_ROWS) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        self.kind = kind
+        self.dir = os.path.join(root, kind)
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(root, kind + ".lock")
+        self.shard_rows = max(1, int(shard_rows))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and processes; meta is re-read inside."""
+        with self._lock, FileLock(self.lock_path):
+            yield
+
+    # --- metadata -------------------------------------------------------------------
+
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if isinstance(meta, dict):
+                return meta
+        except (OSError, ValueError):
+            pass
+        return {"dim": 0, "shard_rows": self.shard_rows, "shards": [], "next_vidx": 0, "videos": {}, "stale_rows": 0}
+
+    def _save_meta(self, meta: Dict[str, Any], directory: Optional[str] = None) -> None:
+        directory = directory or self.dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "meta.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _shard_paths(self, name: str, directory: Optional[str] = None) -> Tuple[str, str, str]:
+        """(.vec, .q8, .ids) paths of a shard."""
+        base = os.path.join(directory or self.dir, name)
+        return base + ".vec", base + ".q8", base + ".ids"
+
+    # --- writes ---------------------------------------------------------------------
+
+    def _append(
+        self, meta: Dict[str, Any], vectors: np.ndarray, ids: np.ndarray, directory: Optional[str] = None,
+    ) -> None:
+        """Append normalized float16 rows (and their int8 copy) to the open shard(s), starting
+        new ones when full. Sets ids["scale"]. Updates meta (not saved).
+        """
+        dim = meta["dim"]
+        as_float = vectors.astype(np.float32)
+        scale = np.maximum(np.abs(as_float).max(axis=1), 1e-12)
+        q8 = np.rint(as_float / scale[:, None] * 127).astype(np.int8)
+        ids = ids.copy()
+        ids["scale"] = scale
+        shard_rows = int(meta.get("shard_rows") or self.shard_rows)
+        os.makedirs(directory or self.dir, exist_ok=True)
+        pos = 0
+        while pos < len(vectors):
+            if not meta["shards"] or meta["shards"][-1]["rows"] >= shard_rows:
+                meta["shards"].append({"name": "shard_%05d" % len(meta["shards"]), "rows": 0})
+            shard = meta["shards"][-1]
+            take = min(shard_rows - shard["rows"], len(vectors) - pos)
+            vec_path, q8_path, ids_path = self._shard_paths(shard["name"], directory)
+            for path, arr, row_bytes in (
+                (vec_path, vectors[pos : pos + take], dim * 2),
+                (q8_path, q8[pos : pos + take], dim),
+                (ids_path, ids[pos : pos + take], _ID_DTYPE.itemsize),
+            ):
+                with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                    # Drop bytes of an interrupted append past the committed rows
+                    f.truncate(shard["rows"] * row_bytes)
+                    f.seek(shard["rows"] * row_bytes)
+                    f.write(np.ascontiguousarray(arr).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            shard["rows"] += take
+            pos += take
+
+    def add_video(
+        self,
+        video_id: str,
+        frames: List[str],
+        vectors: Any,
+        face_idx: Optional[Iterable[int]] = None,
+        frame_times: Optional[Dict[str, float]] = None,
+    ) -> int:
+        """Replace a video's vectors. frames (N,) and vectors (N, D) are parallel; face_idx
+        (N,) gives each face's index in its frame's faces list (-1 for scene vectors).
+        Returns the number of vectors stored. Leaves the store untouched when the video
+        already has exactly these vectors.
+        """
+        vectors = np.asarray(vectors)
+        if not len(frames) or vectors.ndim != 2 or not vectors.shape[1]:
+            self.remove_video(video_id)
+            return 0
+        ft = frame_times or {}
+        ids = np.zeros(len(frames), dtype=_ID_DTYPE)
+        ids["frame"] = [_frame_number(f) for f in frames]
+        ids["face"] = list(face_idx) if face_idx is not None else -1
+        ids["time_sec"] = [ft.get(f, n - 1.0) for f, n in zip(frames, ids["frame"])]
+        normed = _normalize(vectors).astype(np.float16)
+        pad = max((len(m.group(1)) for m in (re.search(r"(\d+)", f) for f in frames[:1]) if m), default=6)
+        digest = hashlib.sha1(normed.tobytes() + ids.tobytes()).hexdigest()
+        with self._write_lock():
+            meta = self._load_meta()
+            old = meta["videos"].get(video_id)
+            if old is not None and old.get("hash") == digest and meta["dim"] == normed.shape[1]:
+                return len(frames)
+            if not meta["dim"]:
+                meta["dim"] = int(normed.shape[1])
+            elif meta["dim"] != normed.shape[1]:
+                raise ValueError(f"{self.kind} vectors have dim {normed.shape[1]}, store has {meta['dim']}")
+            vidx = int(meta["next_vidx"])
+            ids["vidx"] = vidx
+            self._append(meta, normed, ids)
+            if old is not None:
+                meta["stale_rows"] = int(meta.get("stale_rows", 0)) + int(old["rows"])
+            meta["videos"][video_id] = {"vidx": vidx, "rows": len(frames), "pad": pad, "hash": digest}
+            meta["next_vidx"] = vidx + 1
+            self._save_meta(meta)
+        self._maybe_compact(meta)
+        return len(frames)
+
+    def remove_video(self, video_id: str) -> None:
+        with self._write_lock():
+            meta = self._load_meta()
+            old = meta["videos"].pop(video_id, None)
+            if old is None:
+                return
+            meta["stale_rows"] = int(meta.get("stale_rows", 0)) + int(old["rows"])
+            self._save_meta(meta)
+        self._maybe_compact(meta)
+
+    def _maybe_compact(self, meta: Dict[str, Any]) -> None:
+        """compact() once stale rows reach COMPACT_STALE_FRACTION of the store."""
+        rows = sum(s["rows"] for s in meta["shards"])
+        if rows and int(meta.get("stale_rows", 0)) >= COMPACT_STALE_FRACTION * rows:
+            self.compact()
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite the shards without stale rows (re-indexed or removed videos)."""
+        with self._write_lock():
+            meta = self._load_meta()
+            if not meta.get("stale_rows"):
+                return {"rows": sum(s["rows"] for s in meta["shards"]), "dropped": 0}
+            live = self._live_mask(meta)
+            new_meta = dict(meta, shards=[], stale_rows=0)
+            new_dir = self.dir + ".compact"
+            shutil.rmtree(new_dir, ignore_errors=True)
+            dropped = 0
+            for vectors, _, ids in self._iter_shards(meta):
+                for a in range(0, len(ids), SEARCH_BLOCK_ROWS):
+                    block_ids = np.asarray(ids[a : a + SEARCH_BLOCK_ROWS])
+                    keep = live[block_ids["vidx"]]
+                    dropped += int((~keep).sum())
+                    if keep.any():
+                        block = np.asarray(vectors[a : a + SEARCH_BLOCK_ROWS])[keep]
+                        self._append(new_meta, block, block_ids[keep], new_dir)
+            self._save_meta(new_meta, new_dir)
+            # Swap directories, then drop the old shards
+            trash = self.dir + ".old"
+            shutil.rmtree(trash, ignore_errors=True)
+            os.replace(self.dir, trash)
+            os.replace(new_dir, self.dir)
+            shutil.rmtree(trash, ignore_errors=True)
+            return {"rows": sum(s["rows"] for s in new_meta["shards"]), "dropped": dropped}
+
+    # --- reads ----------------------------------------------------------------------
+
+    def _live_mask(self, meta: Dict[str, Any], video_id: Optional[str] = None) -> np.ndarray:
+        live = np.zeros(int(meta.get("next_vidx", 0)) + 1, dtype=bool)
+        if video_id is not None:
+            info = meta["videos"].get(video_id)
+            if info is not None:
+                live[info["vidx"]] = True
+        else:
+            for info in meta["videos"].values():
+                live[info["vidx"]] = True
+        return live
+
+    def _iter_shards(self, meta: Dict[str, Any]):
+        """(vectors, q8, ids) memmaps of the committed rows of each shard."""
+        for shard in meta["shards"]:
+            if not shard["rows"]:
+                continue
+            vec_path, q8_path, ids_path = self._shard_paths(shard["name"])
+            shape = (shard["rows"], meta["dim"])
+            yield (
+                np.memmap(vec_path, dtype=np.float16, mode="r", shape=shape),
+                np.memmap(q8_path, dtype=np.int8, mode="r", shape=shape),
+                np.memmap(ids_path, dtype=_ID_DTYPE, mode="r", shape=(shard["rows"],)),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        meta = self._load_meta()
+        rows = sum(s["rows"] for s in meta["shards"])
+        return {
+            "kind": self.kind,
+            "dim": meta["dim"],
+            "vectors": rows - int(meta.get("stale_rows", 0)),
+            "stale": int(meta.get("stale_rows", 0)),
+            "videos": len(meta["videos"]),
+            "shards": len(meta["shards"]),
+        }
+
+    def search(
+        self,
+        query: Any,
+        k: int = 20,
+        video_id: Optional[str] = None,
+        min_score: Optional[float] = None,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Top-k most similar stored vectors (cosine). Returns {results: [{video_id, frame,
+        time_sec, face_idx, score}], searched, took_ms}; face_idx is None for scene vectors.
+        """
+        t0 = time.perf_counter()
+        meta = self._load_meta()
+        k = max(1, int(k))
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        if meta["dim"] and q.shape[0] != meta["dim"]:
+            raise ValueError(f"query has dim {q.shape[0]}, {self.kind} store has {meta['dim']}")
+        live = self._live_mask(meta, video_id)
+        floor = -np.inf if min_score is None else float(min_score)
+        candidates = max(RERANK_FACTOR * k, RERANK_MIN)
+
+        tasks = [
+            (vec, q8, ids, a, min(a + SEARCH_BLOCK_ROWS, len(ids)))
+            for vec, q8, ids in self._iter_shards(meta)
+            for a in range(0, len(ids), SEARCH_BLOCK_ROWS)
+        ]
+
+        def score_block(task):
+            vec, q8, ids, a, b = task
+            block_ids = np.asarray(ids[a:b])
+            keep = live[block_ids["vidx"]]
+            if not keep.any():
+                return np.empty(0, dtype=np.float32), block_ids[:0]
+            # Approximate scores (up to a constant 127) from the int8 copy, converted per block so
+            # the product runs in BLAS
+            approx = (np.asarray(q8[a:b], dtype=np.float32) @ q) * block_ids["scale"]
+            approx[~keep] = -np.inf
+            if len(approx) > candidates:
+                cand = np.argpartition(-approx, candidates - 1)[:candidates]
+            else:
+                cand = np.arange(len(approx))
+            cand = cand[np.isfinite(approx[cand])]
+            # Exact scores of the candidates from float16
+            cand.sort()
+            scores = np.asarray(vec[a + cand], dtype=np.float32) @ q
+            top = np.argsort(-scores)[:k]
+            top = top[scores[top] >= floor]
+            return scores[top], block_ids[cand[top]]
+
+        n_workers = workers or min(len(tasks), os.cpu_count() or 1) or 1
+        if n_workers > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                parts = list(pool.map(score_block, tasks))
+        else:
+            parts = [score_block(t) for t in tasks]
+
+        results: List[Dict[str, Any]] = []
+        if parts:
+            scores = np.concatenate([p[0] for p in parts])
+            ids = np.concatenate([p[1] for p in parts])
+            order = np.argsort(-scores, kind="stable")[:k]
+            by_vidx = {info["vidx"]: (vid, info.get("pad", 6)) for vid, info in meta["videos"].items()}
+            for i in order:
+                if not np.isfinite(scores[i]):
+                    continue
+                vid, pad = by_vidx[int(ids[i]["vidx"])]
+                face = int(ids[i]["face"])
+                results.append({
+                    "video_id": vid,
+                    "frame": "frame_%0*d.jpg" % (pad, int(ids[i]["frame"])),
+                    "time_sec": round(float(ids[i]["time_sec"]), 3),
+                    "face_idx": face if face >= 0 else None,
+                    "score": round(float(scores[i]), 4),
+                })
+        return {
+            "results": results,
+            "searched": sum(s["rows"] for s in meta["shards"]) - int(meta.get("stale_rows", 0)),
+            "took_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(kind: str) -> VectorStore:
+    """Process-wide store for kind (face | scene)."""
+    with _stores_lock:
+        if kind not in _stores:
+            _stores[kind] = VectorStore(kind)
+        return _stores[kind]
+
+
+def index_video_vectors(
+    video_id: str,
+    face_embeddings_path: Optional[str] = None,
+    scene_features_path: Optional[str] = None,
+    frame_times: Optional[Dict[str, float]] = None,
+) -> Dict[str, int]:
+    """Replace a video's face and scene vectors from its per-video .npz files. Returns counts per kind."""
+    from .faces import load_face_embeddings
+
+    counts: Dict[str, int] = {}
+    faces = load_face_embeddings(face_embeddings_path) if face_embeddings_path else None
+    if faces is not None:
+        frames, face_idx, embeddings = faces
+        counts["face"] = get_vector_store("face").add_video(
+            video_id, frames, embeddings, face_idx=face_idx, frame_times=frame_times,
+        )
+    scene = load_frame_vectors(scene_features_path) if scene_features_path else None
+    if scene is not None:
+        frames, embeddings = scene
+        counts["scene"] = get_vector_store("scene").add_video(video_id, frames, embeddings, frame_times=frame_times)
+    return counts
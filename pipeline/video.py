@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import os
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
 import cv2
 from pytube import YouTube
@@ -67,21 +67,43 @@ def download_video(url: str, output_dir: str) -> Optional[str]:
             return None
 
 
+def video_duration(video_path: str) -> Optional[float]:
+    """Duration in seconds from the container's frame count and fps, or None if unknown."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+        return frames / fps if fps > 0 and frames > 0 else None
+    finally:
+        cap.release()
+
+
 def extract_frames(
     video_path: str,
     frames_dir: str,
     start_seconds: Optional[float] = None,
     end_seconds: Optional[float] = None,
+    frame_times: Optional[Dict[str, float]] = None,
+    absolute_names: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
 ) -> List[str]:
     """Extract one frame per second from the video and save as JPEG files.
 
     Optionally limit to a time range with start_seconds and end_seconds (inclusive start, exclusive end).
+    If frame_times is given, it is filled with { filename: source timestamp in seconds }.
+    absolute_names: name frames by their absolute sample index in the video (frame_000001.jpg
+    is the first sample of the video, whatever the range) and keep the frames already in
+    frames_dir, so several ranges can share one directory (see pipeline.timeline). A frame
+    is then saved when start_seconds <= timestamp < end_seconds.
+    progress_callback: called with (frames saved, expected frame count) after each frame.
     Returns a list of saved frame filenames (basename only).
     """
     safe_print("Extracting frames (1 per second)...")
 
     # Clear existing frames to prevent merging with previous runs
-    if os.path.exists(frames_dir):
+    if os.path.exists(frames_dir) and not absolute_names:
         for f in os.listdir(frames_dir):
             fp = os.path.join(frames_dir, f)
             if os.path.isfile(fp):
@@ -103,11 +125,15 @@ def extract_frames(
         end_frame = None  # None = read to end
         if start_seconds is not None and start_seconds >= 0:
             start_frame = int(start_seconds * fps)
-        if end_seconds is not None and end_seconds > (start_seconds or 0):
+        if end_seconds is not None and end_seconds > (start_seconds or 0) and not absolute_names:
             end_frame = int(end_seconds * fps)
 
         if start_frame > 0:
             cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        last_frame = total_frames
+        if end_seconds is not None and end_seconds > (start_seconds or 0):
+            last_frame = min(last_frame, int(end_seconds * fps)) if last_frame else int(end_seconds * fps)
+        expected = max(0, -(-(last_frame - start_frame) // fps_int))
 
         frame_index = start_frame
         save_index = 1
@@ -121,10 +147,24 @@ def extract_frames(
 
             if frame_index % fps_int == 0:
                 filename = f"frame_{save_index:04d}.jpg"
+                if absolute_names:
+                    # Range bounds apply to the sample timestamp, so adjacent ranges
+                    # split the samples exactly (none missed, none duplicated)
+                    t = round(frame_index / fps, 3)
+                    if end_seconds is not None and t >= end_seconds:
+                        break
+                    if start_seconds is not None and t < start_seconds:
+                        frame_index += 1
+                        continue
+                    filename = f"frame_{frame_index // fps_int + 1:06d}.jpg"
                 out_path = os.path.join(frames_dir, filename)
                 ok = cv2.imwrite(out_path, frame)
                 if ok:
                     saved_frames.append(filename)
+                    if frame_times is not None:
+                        frame_times[filename] = round(frame_index / fps, 3)
+                    if progress_callback is not None:
+                        progress_callback(len(saved_frames), max(expected, len(saved_frames)))
                 else:
                     safe_print(f"Warning: Failed to write frame {filename}")
                 save_index += 1
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Index existing results (RESULTS_DIR) into MongoDB, the local search index and/or the vector store.
+
+For videos processed while MONGODB_URI was unset, or after a schema change: no
+reprocessing, only detection_results.json (+ summary.json / metadata.txt) are read.
+Files are parsed in a process pool; the parent writes in batches (bulk_index_videos for
+MongoDB, one SQLite transaction per video for the local index). The "vectors" target
+loads face_embeddings.npz / scene_features.npz into the similarity search store.
+
+Progress is checkpointed to vista-prototype/backfill_<target>.json after every batch:
+{video_id: [mtime_ns, size] of the detection_results.json indexed}. A rerun resumes,
+skipping videos whose results did not change since; --restart ignores the checkpoint.
+
+Run from repo root:
+  python scripts/backfill_index.py                        # local index (+ MongoDB if configured)
+  python scripts/backfill_index.py --target mongodb --workers 8 --batch 64
+  python scripts/backfill_index.py --target local --restart
+  python scripts/backfill_index.py --target vectors
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.mongodb_store import build_index_documents, bulk_index_videos, is_configured
+from pipeline.paths import RESULTS_DIR, VISTA_DIR
+from pipeline import search_index
+from pipeline.vector_store import get_vector_store, index_video_vectors
+
+TARGETS = ("mongodb", "local", "vectors")
+
+
+def _stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _source_url(metadata_txt: str) -> str:
+    """The "source:" line of metadata.txt (write_metadata), or ""."""
+    try:
+        with open(metadata_txt, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("source:"):
+                    return line[len("source:"):].strip()
+    except OSError:
+        pass
+    return ""
+
+
+def _load_video(task: Tuple[str, str, Tuple[str, ...]]) -> Dict[str, Any]:
+    """Worker: parse one video's results into what the targets need.
+
+    Returns {video_id, stamp, mongodb: (video_doc, frames_docs), local: (payload, meta,
+    source_url), frames} or {video_id, error}.
+    """
+    results_dir, video_id, targets = task
+    base = os.path.join(results_dir, video_id)
+    detection_json = os.path.join(base, "detection_results.json")
+    stamp = _stamp(detection_json)
+    try:
+        with open(detection_json, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        return {"video_id": video_id, "error": str(e)}
+    frames = payload.get("frames") or []
+    # summary.json (save_summary) read directly: pipeline.detection would import YOLO in every worker
+    try:
+        with open(os.path.join(base, "summary.json"), "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        doc = {}
+    if not isinstance(doc, dict):
+        doc = {}
+    meta = doc.get("metadata") or {}
+    summary = doc.get("summary") or {}
+    source_url = _source_url(os.path.join(base, "metadata.txt")) or meta.get("webpage_url") or ""
+
+    out: Dict[str, Any] = {"video_id": video_id, "stamp": stamp, "frames": len(frames)}
+    if "mongodb" in targets:
+        by_class = summary.get("by_class")
+        if by_class is None:
+            by_class = {}
+            for fr in frames:
+                for d in fr.get("detections") or []:
+                    label = d.get("label") or (d.get("color", "") + " " + d.get("class", "unknown")).strip()
+                    by_class[label] = by_class.get(label, 0) + 1
+        out["mongodb"] = build_index_documents(
+            video_id=video_id,
+            source_url=source_url,
+            meta=meta,
+            run_stats=payload.get("run_stats") or summary.get("run_stats") or {},
+            results_by_frame={fr.get("frame") or "": fr.get("detections") or [] for fr in frames},
+            faces_by_frame={fr.get("frame") or "": fr.get("faces") or [] for fr in frames},
+            monuments_by_frame={fr.get("frame") or "": fr.get("monument") or {} for fr in frames},
+            by_class=by_class,
+            confidence_threshold=payload.get("confidence_threshold", summary.get("confidence_threshold", 0.5)),
+            object_model=payload.get("object_model", "yolov8n"),
+            face_model=payload.get("face_model", "buffalo_l"),
+            frame_times={fr.get("frame") or "": fr["time_sec"] for fr in frames if fr.get("time_sec") is not None},
+        )
+    if "local" in targets:
+        out["local"] = ({"video_id": video_id, "frames": frames}, meta, source_url)
+    if "vectors" in targets:
+        out["frame_times"] = {fr.get("frame") or "": fr["time_sec"] for fr in frames if fr.get("time_sec") is not None}
+    return out
+
+
+def _video_ids(results_dir: str) -> List[str]:
+    try:
+        names = sorted(os.listdir(results_dir))
+    except OSError:
+        return []
+    return [n for n in names if os.path.isfile(os.path.join(results_dir, n, "detection_results.json"))]
+
+
+def _load_checkpoint(path: str) -> Dict[str, List[int]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checkpoint(path: str, done: Dict[str, List[int]]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(done, f)
+    os.replace(tmp_path, path)
+
+
+def _parallel(tasks: List[Any], workers: int) -> Iterator[Dict[str, Any]]:
+    """_load_video over tasks in a process pool, at most a few tasks in flight per worker
+    (parsed results are not buffered without bound when the writer is slower)."""
+    if workers <= 1:
+        for task in tasks:
+            yield _load_video(task)
+        return
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        it = iter(tasks)
+        for task in it:
+            pending.add(pool.submit(_load_video, task))
+            if len(pending) >= window:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+            for task in it:
+                pending.add(pool.submit(_load_video, task))
+                if len(pending) >= window:
+                    break
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill MongoDB / local search index from RESULTS_DIR")
+    parser.add_argument(
+        "--target", choices=TARGETS + ("all",), default=None,
+        help="Where to index (default: local, plus mongodb when MONGODB_URI is set; all = every target)",
+    )
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Results directory to scan")
+    parser.add_argument("--index-path", default=search_index.SEARCH_INDEX_PATH, help="Local search index file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    parser.add_argument("--batch", type=int, default=32, help="Videos per write batch / checkpoint")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: vista-prototype/backfill_<target>.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and index everything")
+    parser.add_argument("--limit", type=int, default=0, help="Index at most this many videos")
+    args = parser.parse_args()
+
+    if args.target is None:
+        targets = ("local", "mongodb") if is_configured() else ("local",)
+    elif args.target == "all":
+        targets = TARGETS
+    else:
+        targets = (args.target,)
+    if "mongodb" in targets and not is_configured():
+        print("MongoDB is not configured (set MONGODB_URI in .env or the environment).")
+        return 1
+    checkpoint = args.checkpoint or os.path.join(VISTA_DIR, "backfill_%s.json" % "_".join(sorted(targets)))
+    done = {} if args.restart else _load_checkpoint(checkpoint)
+
+    video_ids = _video_ids(args.results_dir)
+    todo = [
+        vid for vid in video_ids
+        if done.get(vid) != _stamp(os.path.join(args.results_dir, vid, "detection_results.json"))
+    ]
+    if args.limit > 0:
+        todo = todo[: args.limit]
+    print(
+        f"{len(video_ids)} videos in {args.results_dir}; {len(video_ids) - len(todo)} up to date, "
+        f"{len(todo)} to index into {' + '.join(targets)} ({args.workers} workers, batch {args.batch})."
+    )
+    if not todo:
+        return 0
+
+    conn = search_index.connect(args.index_path) if "local" in targets else None
+    t0 = time.perf_counter()
+    indexed = failed = frames = 0
+    batch: List[Dict[str, Any]] = []
+
+    def flush() -> bool:
+        nonlocal indexed, frames
+        if not batch:
+            return True
+        if "mongodb" in targets:
+            if bulk_index_videos([item["mongodb"] for item in batch]) is None:
+                print("MongoDB write failed (see log); rerun to resume from the last checkpoint.")
+                return False
+        if conn is not None:
+            for item in batch:
+                payload, meta, source_url = item["local"]
+                search_index.index_detection_payload(payload, meta=meta, source_url=source_url, conn=conn)
+        if "vectors" in targets:
+            for item in batch:
+                base = os.path.join(args.results_dir, item["video_id"])
+                index_video_vectors(
+                    item["video_id"],
+                    face_embeddings_path=os.path.join(base, "face_embeddings.npz"),
+                    scene_features_path=os.path.join(base, "scene_features.npz"),
+                    frame_times=item["frame_times"],
+                )
+        for item in batch:
+            done[item["video_id"]] = item["stamp"]
+            frames += item["frames"]
+        indexed += len(batch)
+        batch.clear()
+        _save_checkpoint(checkpoint, done)
+        elapsed = time.perf_counter() - t0
+        rate = indexed / elapsed if elapsed > 0 else 0.0
+        eta = (len(todo) - indexed - failed) / rate if rate > 0 else 0.0
+        print(
+            f"  {indexed + failed}/{len(todo)} videos ({frames} frames, {failed} failed) "
+            f"{rate:.1f} videos/s, ETA {eta:.0f}s"
+        )
+        return True
+
+    ok = True
+    try:
+        tasks = [(args.results_dir, vid, targets) for vid in todo]
+        for item in _parallel(tasks, args.workers):
+            if item.get("error"):
+                failed += 1
+                print(f"  skipped {item['video_id']!r}: {item['error']}")
+                continue
+            batch.append(item)
+            if len(batch) >= max(1, args.batch):
+                ok = flush()
+                if not ok:
+                    break
+        if ok:
+            ok = flush()
+    except KeyboardInterrupt:
+        print("Interrupted; rerun to resume from the last checkpoint.")
+        ok = False
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if ok and "vectors" in targets:
+        # Re-indexed videos leave stale rows behind; rewrite shards without them
+        for kind in ("face", "scene"):
+            store = get_vector_store(kind)
+            if store.stats()["stale"]:
+                print(f"Compacting {kind} vectors: {store.compact()}")
+
+    elapsed = time.perf_counter() - t0
+    print(f"Done: {indexed} videos, {frames} frames indexed in {elapsed:.1f}s ({failed} failed). Checkpoint: {checkpoint}")
+    return 0 if ok and not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Rebuild the MongoDB label_stats and label_videos collections from the frames collection.
+
+Both are kept up to date by the indexer; run this after upgrading (videos indexed before
+label_stats existed, or label_stats documents with per-video maps) or if they were
+edited by hand. The new collections are built aside and swapped in at the end.
+
+Run from repo root: python scripts/backfill_label_stats.py
+"""
+
+import os
+import sys
+
+# Ensure repo root is on path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.mongodb_store import get_db, rebuild_label_stats
+
+
+def main():
+    if get_db() is None:
+        print("MongoDB is not configured or unreachable (set MONGODB_URI in .env or the environment).")
+        return 1
+    print("Rebuilding label_stats from frames ...")
+    result = rebuild_label_stats()
+    if result is None:
+        print("Backfill failed (see log).")
+        return 1
+    print(f"Done: {result['labels']} labels from {result['videos']} videos in {result['sec']}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark video encoder backends (encode fps and output size).
+
+Encodes the same frames with each backend from pipeline.render.open_encoder
+(OpenCV 'mp4v' and, when ffmpeg is installed, libx264 through an ffmpeg pipe).
+
+Run from repo root:
+  python scripts/benchmark_encoders.py                              # synthetic 1280x720 frames
+  python scripts/benchmark_encoders.py --images-dir vista-prototype/results/<video_id>/processed_frames
+  python scripts/benchmark_encoders.py --preset ultrafast --crf 28 --threads 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.render import open_encoder, find_ffmpeg
+
+
+def _synthetic_frames(n: int, width: int, height: int) -> list:
+    """Frames with a moving gradient and boxes, so encoders see realistic motion."""
+    rng = np.random.default_rng(0)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    frames = []
+    for i in range(n):
+        img = np.empty((height, width, 3), dtype=np.uint8)
+        shift = (i * 8) % width
+        grad = np.roll(xs, shift).astype(np.uint8)
+        img[:, :, 0] = grad
+        img[:, :, 1] = grad[::-1]
+        img[:, :, 2] = 128
+        for _ in range(5):
+            x, y = int(rng.integers(0, width - 100)), int(rng.integers(0, height - 100))
+            cv2.rectangle(img, (x, y), (x + 100, y + 80), (0, 0, 255), 2)
+            cv2.putText(img, "car 0.91", (x, y - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+        frames.append(img)
+    return frames
+
+
+def _load_frames(images_dir: str, limit: int) -> list:
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    frames = []
+    for name in names[:limit]:
+        img = cv2.imread(os.path.join(images_dir, name))
+        if img is not None:
+            if frames and img.shape != frames[0].shape:
+                img = cv2.resize(img, (frames[0].shape[1], frames[0].shape[0]))
+            frames.append(img)
+    return frames
+
+
+def _bench(backend: str, frames: list, fps: float, out_dir: str, **options) -> dict:
+    h, w = frames[0].shape[:2]
+    path = os.path.join(out_dir, f"bench_{backend}.mp4")
+    t0 = time.perf_counter()
+    encoder, out_path = open_encoder(path, fps, (w, h), backend=backend, **options)
+    if encoder is None:
+        return {"backend": backend, "error": "could not open encoder"}
+    for frame in frames:
+        encoder.write(frame)
+    encoder.release()
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(out_path) if out_path and os.path.isfile(out_path) else 0
+    return {
+        "backend": backend,
+        "output": os.path.basename(out_path or ""),
+        "sec": elapsed,
+        "fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+        "size_kb": size / 1024.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark video encoder backends (fps and output size).")
+    parser.add_argument("--images-dir", default=None, help="Encode these images instead of synthetic frames")
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    parser.add_argument("--fps", type=float, default=25, help="Output video fps")
+    parser.add_argument("--preset", default=None, help="libx264 preset (ffmpeg backend)")
+    parser.add_argument("--crf", type=int, default=None, help="libx264 CRF (ffmpeg backend)")
+    parser.add_argument("--threads", type=int, default=None, help="libx264 threads, 0 = auto (ffmpeg backend)")
+    args = parser.parse_args()
+
+    if args.images_dir:
+        frames = _load_frames(args.images_dir, args.frames)
+    else:
+        frames = _synthetic_frames(args.frames, args.width, args.height)
+    if not frames:
+        print("No frames to encode.")
+        return 1
+    h, w = frames[0].shape[:2]
+    print(f"Encoding {len(frames)} frames of {w}x{h} at {args.fps} fps")
+
+    backends = ["cv2"]
+    if find_ffmpeg():
+        backends.append("ffmpeg")
+    else:
+        print("ffmpeg not found on PATH (or VISTA_FFMPEG); benchmarking cv2 only.")
+
+    options = {"preset": args.preset, "crf": args.crf, "threads": args.threads}
+    with tempfile.TemporaryDirectory() as out_dir:
+        print(f"{'backend':<8} {'output':<22} {'sec':>8} {'fps':>9} {'size KB':>10}")
+        for backend in backends:
+            r = _bench(backend, frames, args.fps, out_dir, **options)
+            if r.get("error"):
+                print(f"{backend:<8} {r['error']}")
+                continue
+            print(f"{r['backend']:<8} {r['output']:<22} {r['sec']:>8.2f} {r['fps']:>9.1f} {r['size_kb']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
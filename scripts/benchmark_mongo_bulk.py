@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark MongoDB frame writes: delete + insert_many vs chunked bulk upserts.
+
+Writes synthetic frame documents (shaped like index_detection_results_to_mongodb builds
+them) for one video and reports frames/s for:
+  - legacy:   delete_many + one insert_many of every frame
+  - bulk:     pipeline.mongodb_store.bulk_upsert_frames, first index
+  - reindex:  the same frames again (idempotent upserts)
+  - shrink:   10% fewer frames (only the vanished ones are deleted)
+
+and the average BSON size of a frame document in the full and compact schemas
+(--schema picks the one the bulk runs write).
+
+Runs against mongomock by default (pip install mongomock), or a real server with --uri
+(a throwaway database, dropped afterwards).
+
+Run from repo root:
+  python scripts/benchmark_mongo_bulk.py                         # 100k frames, mongomock
+  python scripts/benchmark_mongo_bulk.py --frames 20000 --chunk 500
+  python scripts/benchmark_mongo_bulk.py --uri mongodb://localhost:27017
+  python scripts/benchmark_mongo_bulk.py --schema compact
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.mongodb_store import (
+    BULK_CHUNK_SIZE,
+    FRAME_SCHEMAS,
+    FRAMES_COLLECTION,
+    FRAMES_COMPACT_COLLECTION,
+    FrameDictionary,
+    bulk_upsert_frames,
+    encode_frame_document,
+)
+
+VIDEO_ID = "benchmark_video"
+
+
+def _frame_docs(n: int):
+    """Synthetic frame documents with a few objects and faces each."""
+    for i in range(1, n + 1):
+        yield {
+            "video_id": VIDEO_ID,
+            "frame_filename": f"frame_{i:06d}.jpg",
+            "frame_index": i,
+            "time_sec": float(i - 1),
+            "objects": [
+                {"class": "car", "color": "red", "label": "red car", "conf": 0.9134,
+                 "bbox": [10.37, 20.81, 110.52, 90.06]},
+                {"class": "person", "color": "", "label": "person", "conf": 0.8412,
+                 "bbox": [200.14, 40.66, 260.93, 200.2]},
+            ],
+            "faces": [{"label": "Unknown", "confidence": 0.77, "recognition_confidence": 0.0, "bbox": [210, 50, 240, 90]}]
+            if i % 3 == 0 else [],
+            "monument": {},
+        }
+
+
+def _open_db(uri: str):
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        return client, client["vista_benchmark_%d" % os.getpid()]
+    import mongomock
+    client = mongomock.MongoClient()
+    return client, client["vista_benchmark"]
+
+
+def _document_sizes(db, docs: list) -> None:
+    """Average BSON bytes per frame document in each schema."""
+    import bson
+
+    dictionary = FrameDictionary(db)
+    dictionary.ensure({"class": ["car", "person"], "color": ["red", ""], "face": ["Unknown"]})
+    sample = docs[:1000]
+    full = sum(len(bson.encode(d)) for d in sample) / len(sample)
+    compact = sum(len(bson.encode(encode_frame_document(d, dictionary))) for d in sample) / len(sample)
+    print(f"  document size  full {full:.0f} B  compact {compact:.0f} B  ({compact / full:.0%})")
+
+
+def _legacy(db, docs: list) -> float:
+    coll = db[FRAMES_COLLECTION]
+    t0 = time.perf_counter()
+    coll.delete_many({"video_id": VIDEO_ID})
+    coll.insert_many([dict(d) for d in docs])
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MongoDB frame write strategies")
+    parser.add_argument("--frames", type=int, default=100000, help="Frames per video (default 100000)")
+    parser.add_argument("--chunk", type=int, default=BULK_CHUNK_SIZE, help="Documents per bulk_write")
+    parser.add_argument("--uri", default="", help="Real MongoDB URI (default: mongomock)")
+    parser.add_argument("--schema", choices=FRAME_SCHEMAS, default="full", help="Frame schema for the bulk runs")
+    args = parser.parse_args()
+
+    try:
+        client, db = _open_db(args.uri)
+    except ImportError as e:
+        print(f"Missing dependency ({e}). Install mongomock, or pass --uri for a real server.")
+        return 1
+    db[FRAMES_COLLECTION].create_index([("video_id", 1), ("frame_filename", 1)], unique=True)
+    db[FRAMES_COMPACT_COLLECTION].create_index([("video_id", 1), ("n", 1)], unique=True)
+
+    docs = list(_frame_docs(args.frames))
+    print(
+        f"{args.frames} frames, chunk={args.chunk}, schema={args.schema}, "
+        f"backend={'mongodb' if args.uri else 'mongomock'}"
+    )
+    try:
+        _document_sizes(db, docs)
+        sec = _legacy(db, docs)
+        print(f"  legacy   delete+insert_many  {sec:8.2f} s  {args.frames / sec:10.0f} frames/s")
+        db[FRAMES_COLLECTION].delete_many({"video_id": VIDEO_ID})
+
+        for name, batch in (
+            ("bulk", docs),
+            ("reindex", docs),
+            ("shrink", docs[: int(len(docs) * 0.9)]),
+        ):
+            stats = bulk_upsert_frames(VIDEO_ID, batch, chunk_size=args.chunk, db=db, schema=args.schema)
+            if stats is None:
+                print(f"  {name}: write failed (see log)")
+                return 1
+            print(
+                f"  {name:<8} bulk upserts       {stats['sec']:8.2f} s  {stats['frames_per_sec']:10.0f} frames/s"
+                f"  (chunks={stats['chunks']} upserted={stats['upserted']} matched={stats['matched']}"
+                f" deleted={stats['deleted']})"
+            )
+        coll = FRAMES_COMPACT_COLLECTION if args.schema == "compact" else FRAMES_COLLECTION
+        remaining = db[coll].count_documents({"video_id": VIDEO_ID})
+        print(f"  frames stored after shrink: {remaining}")
+    finally:
+        if args.uri:
+            client.drop_database(db.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
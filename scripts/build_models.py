@@ -9,6 +9,7 @@ Run from repo root:
   python scripts/build_models.py              # build both
   python scripts/build_models.py --faces-only
   python scripts/build_models.py --monuments-only
+  python scripts/build_models.py --monuments-only --streaming   # large datasets, bounded memory
 """
 
 from __future__ import annotations
@@ -88,8 +89,16 @@ def build_face_model(device: str = "cpu", face_model: str = "buffalo_l") -> tupl
     return True, f"Registered {total} faces."
 
 
-def build_monument_model(device: str = "cpu") -> tuple[bool, str]:
-    """Train monument classifier from training_data/monuments/ and training_data/dataset/."""
+def build_monument_model(
+    device: str = "cpu",
+    streaming: bool = False,
+    chunk_size: int = 1024,
+    epochs: int = 5,
+) -> tuple[bool, str]:
+    """Train monument classifier from training_data/monuments/ and training_data/dataset/.
+
+    streaming: chunked features + SGD (bounded memory) for datasets larger than RAM.
+    """
     try:
         from pipeline.monuments import build_and_train_monument_model
     except Exception as e:
@@ -104,6 +113,9 @@ def build_monument_model(device: str = "cpu") -> tuple[bool, str]:
         model_dir=MONUMENT_MODEL_DIR,
         device=device,
         progress_callback=_progress,
+        streaming=streaming,
+        chunk_size=chunk_size,
+        epochs=epochs,
     )
     if result.get("trained"):
         n = result.get("n_samples", 0)
@@ -126,6 +138,9 @@ def main() -> int:
         help="Force device for both models (default: auto-detect GPU per backend)",
     )
     parser.add_argument("--face-model", default="buffalo_l", choices=["buffalo_l", "buffalo_s", "buffalo_sc"], help="InsightFace model for faces")
+    parser.add_argument("--streaming", action="store_true", help="Monuments: chunked features + SGD with bounded memory (large datasets)")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Monuments --streaming: images per chunk")
+    parser.add_argument("--epochs", type=int, default=5, help="Monuments --streaming: passes over the features")
     args = parser.parse_args()
 
     # Auto-detect GPU per backend when not forced: faces use ONNX/CUDA, monuments use PyTorch/CUDA
@@ -165,7 +180,12 @@ def main() -> int:
 
     if do_monuments:
         print("Building monument model from training_data/monuments/ and training_data/dataset/ ...")
-        ok, msg = build_monument_model(device=monument_device)
+        ok, msg = build_monument_model(
+            device=monument_device,
+            streaming=args.streaming,
+            chunk_size=args.chunk_size,
+            epochs=args.epochs,
+        )
         if ok:
             print("Monuments:", msg)
         else:
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Build the client-side overlay track (overlay.json, optional overlay.vtt) from detection_results.json (CLI).
+
+The web UI draws this track over the original video in the browser, so no annotated
+video has to be rendered.
+
+Run from repo root:
+  python scripts/build_overlay_track.py --video-id VIDEO_ID
+  python scripts/build_overlay_track.py --video-id VIDEO_ID --vtt
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.paths import get_video_results_paths
+from pipeline.overlay_track import build_overlay_track, save_overlay_track, save_overlay_vtt
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the browser overlay track for a processed video.")
+    parser.add_argument("--video-id", required=True, help="Processed video id (results/<video_id>/)")
+    parser.add_argument("--vtt", action="store_true", help="Also write a WebVTT metadata track (overlay.vtt)")
+    args = parser.parse_args()
+
+    paths = get_video_results_paths(args.video_id)
+    if not os.path.isfile(paths["detection_json"]):
+        print(f"Error: {paths['detection_json']} not found.", file=sys.stderr)
+        return 1
+    track = build_overlay_track(paths["detection_json"], video_id=args.video_id)
+    print(f"Wrote {save_overlay_track(track, paths['overlay_track'])} ({len(track['samples'])} samples)")
+    if args.vtt:
+        print(f"Wrote {save_overlay_vtt(track, paths['overlay_vtt'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Convert detection results between detection_results.json and the columnar format (CLI).
+
+The columnar copy (results/<video_id>/detection_columns/) is memory-mappable, so cached
+summaries and frame-range reads do not parse the whole JSON (see pipeline/columnar.py).
+
+Run from repo root:
+  python scripts/convert_results.py --video-id VIDEO_ID            # JSON -> columns
+  python scripts/convert_results.py --all                          # every video under results/
+  python scripts/convert_results.py --video-id VIDEO_ID --to-json  # columns -> JSON
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.paths import get_video_results_paths, RESULTS_DIR
+from pipeline.columnar import json_to_columnar, columnar_to_json, has_columnar_results
+
+
+def _convert(video_id: str, to_json: bool) -> bool:
+    paths = get_video_results_paths(video_id)
+    t0 = time.perf_counter()
+    if to_json:
+        if not has_columnar_results(paths["detection_columns"]):
+            print(f"{video_id}: no detection_columns/, skipped")
+            return False
+        columnar_to_json(paths["detection_columns"], paths["detection_json"])
+    else:
+        if not os.path.isfile(paths["detection_json"]):
+            print(f"{video_id}: no detection_results.json, skipped")
+            return False
+        json_to_columnar(paths["detection_json"], paths["detection_columns"])
+    print(f"{video_id}: converted in {time.perf_counter() - t0:.2f}s")
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert detection results between JSON and columnar format.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--video-id", help="Processed video id (results/<video_id>/)")
+    group.add_argument("--all", action="store_true", help="Convert every video under results/")
+    parser.add_argument("--to-json", action="store_true", help="Columns -> detection_results.json (default: JSON -> columns)")
+    args = parser.parse_args()
+
+    if args.all:
+        video_ids = sorted(os.listdir(RESULTS_DIR)) if os.path.isdir(RESULTS_DIR) else []
+    else:
+        video_ids = [args.video_id]
+    ok = [_convert(v, args.to_json) for v in video_ids if os.path.isdir(get_video_results_paths(v)["base"])]
+    return 0 if any(ok) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Re-identify faces in processed videos against the current known_faces (CLI, no re-detection).
+
+Uses the per-video face_embeddings.npz stored at processing time and updates
+faces[].label in detection_results.json and in MongoDB frames (when configured).
+Each video is relabeled under its lock (pipeline.locks), so a video that is being
+processed is waited for (VISTA_VIDEO_LOCK_TIMEOUT) rather than written concurrently.
+
+Run from repo root:
+  python scripts/reidentify_faces.py                  # all videos under results/
+  python scripts/reidentify_faces.py --video-id ID    # one video
+  python scripts/reidentify_faces.py --no-mongodb     # JSON only
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.paths import RESULTS_DIR, get_video_results_paths
+from pipeline.faces import reidentify_faces, reidentify_all_videos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-match stored face embeddings against known_faces and update labels."
+    )
+    parser.add_argument("--video-id", default=None, help="Only this video (default: every video in results/)")
+    parser.add_argument("--no-mongodb", action="store_true", help="Do not update MongoDB frames")
+    args = parser.parse_args()
+
+    update_mongodb = not args.no_mongodb
+    if args.video_id:
+        paths = get_video_results_paths(args.video_id)
+        result = reidentify_faces(paths["detection_json"], paths["face_embeddings"], update_mongodb=update_mongodb)
+        if result.get("error"):
+            print(f"{args.video_id}: {result['error']}")
+            return 1
+        print(f"{args.video_id}: {result['faces']} faces, {result['changed']} relabeled")
+        return 0
+
+    summary = reidentify_all_videos(RESULTS_DIR, update_mongodb=update_mongodb)
+    print(f"Known embeddings: {summary['known_embeddings']}")
+    for video_id, result in summary["videos"].items():
+        if result.get("error"):
+            print(f"  {video_id}: {result['error']}")
+        else:
+            print(f"  {video_id}: {result['faces']} faces, {result['changed']} relabeled")
+    print(f"Done. {len(summary['videos'])} videos.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
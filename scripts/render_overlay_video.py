@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Re-render a processed video at its source frame rate from detection_results.json (CLI).
+
+Decodes the original video and draws the stored detections on every frame
+(held or interpolated between samples); processed_frames/ is not used.
+
+Run from repo root:
+  python scripts/render_overlay_video.py --video-id VIDEO_ID
+  python scripts/render_overlay_video.py --video-id VIDEO_ID --video path/to/original.mp4 --mode hold --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+# Run from repo root
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pipeline.paths import get_video_results_paths
+from pipeline.source_render import render_overlay_video, RENDER_MODES
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Render detections on the original video at source fps.")
+    parser.add_argument("--video-id", required=True, help="Processed video id (results/<video_id>/)")
+    parser.add_argument("--video", default=None, help="Original video file (default: source_video recorded in the JSON)")
+    parser.add_argument("--out", default=None, help="Output path (default: results/<video_id>/detections_video.mp4)")
+    parser.add_argument("--mode", choices=list(RENDER_MODES), default="interpolate", help="Hold boxes or interpolate them by track")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Parallel segment renderers")
+    args = parser.parse_args()
+
+    paths = get_video_results_paths(args.video_id)
+    if not os.path.isfile(paths["detection_json"]):
+        print(f"Error: {paths['detection_json']} not found.", file=sys.stderr)
+        return 1
+    with open(paths["detection_json"], "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    video_path = args.video or payload.get("source_video")
+    if not video_path or not os.path.isfile(video_path):
+        print("Error: source video not found; pass --video.", file=sys.stderr)
+        return 1
+
+    out = args.out or os.path.join(paths["base"], "detections_video.mp4")
+    result = render_overlay_video(video_path, payload, out, mode=args.mode, workers=args.workers)
+    return 0 if result else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,8 +4,9 @@ import json
 import shutil
 import platform
 import time
+import threading
 import subprocess
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, send_file, stream_with_context
 
 # Ensure the parent directory is on sys.path for 'pipeline' imports
 CURRENT_DIR = os.path.dirname(__file__)
@@ -31,27 +32,79 @@ from pipeline.utils import (
     validate_video_id,
     sanitize_dataset_name,
 )
-from pipeline.video import download_video, extract_frames
+from pipeline.video import download_video, extract_frames, video_duration
 from pipeline.detection import (
     run_yolo,
     generate_summary,
     save_detection_results,
+    build_detection_payload,
     write_metadata,
+    save_summary,
+    load_summary,
     _resolve_model_path,
     OBJECT_MODEL_CHOICES,
 )
-from pipeline.render import make_video_from_images
-from pipeline.faces import run_face_detection
+from pipeline.render import StreamingVideoWriter
+from pipeline.annotate import annotate_frames
+from pipeline.source_render import render_overlay_video, RENDER_MODES
+from pipeline.columnar import ColumnarResults, has_columnar_results
+from pipeline.manifest import PIPELINE_STAGES, StageManifest
+from pipeline.progress import ProgressReporter, load_progress
+from pipeline.locks import VIDEO_LOCK_TIMEOUT, video_lock
+from pipeline.stage_cache import (
+    RAW_CONF_FLOOR,
+    stage_key,
+    stage_cache_path,
+    load_stage,
+    entry_covered,
+    update_stage,
+    window_frames,
+    filter_detections,
+    filter_monuments,
+)
+from pipeline.overlay_track import build_overlay_track, save_overlay_track, save_overlay_vtt
+from pipeline.faces import (
+    embed_faces,
+    run_face_detection,
+    merge_face_embeddings,
+    reidentify_faces,
+    reidentify_all_videos,
+)
+from pipeline.timeline import (
+    FrameStore,
+    covered_parts,
+    frames_in_intervals,
+    frames_in_window,
+    merge_intervals,
+    uncovered,
+)
 from pipeline.monuments import (
     build_and_train_monument_model,
     run_monument_recognition,
     load_monument_model,
+    extract_scene_features,
+    MONUMENT_GATING_CHOICES,
+)
+from pipeline.index_queue import get_index_queue
+from pipeline.jobs import FINISHED as JOB_FINISHED, JobPool, JobQueueFull
+from pipeline.search_index import index_detection_json, search as search_local_index
+from pipeline.vector_store import (
+    KINDS as VECTOR_KINDS,
+    SCENE_VECTORS,
+    get_vector_store,
+    index_video_vectors,
+    load_frame_vectors,
+    merge_frame_vectors,
 )
 from pipeline.mongodb_store import (
-    index_detection_results_to_mongodb,
+    find_label_segments,
     get_db,
+    get_label_stats,
+    label_facets,
+    SEGMENT_KINDS,
     VIDEOS_COLLECTION,
     FRAMES_COLLECTION,
+    FRAMES_COMPACT_COLLECTION,
 )
 
 try:
@@ -66,6 +119,8 @@ app = Flask(__name__, static_folder='static', template_folder='templates')
 # from `web/` or any directory still uses the same `vista-prototype/` data.
 BASE_DIR = PARENT_DIR
 RESULTS_BASE = RESULTS_DIR
+# False in /api/jobs worker processes: the index jobs they spool are drained by the server
+_START_INDEX_WORKER = True
 
 # Ensure runtime directories (including training_data) exist at startup
 ensure_directories()
@@ -96,6 +151,100 @@ def serve_results(filename: str):
     return send_from_directory(RESULTS_BASE, filename)
 
 
+@app.route('/api/source-video/<video_id>')
+def serve_source_video(video_id: str):
+    """Serve the original downloaded video (for the client-side overlay player).
+
+    The path is read from source_video in detection_results.json and must lie inside VIDEOS_DIR.
+    """
+    if not validate_video_id(video_id):
+        return jsonify({"error": "Invalid video ID"}), 400
+    try:
+        with open(get_video_results_paths(video_id)["detection_json"], "r", encoding="utf-8") as f:
+            source_video = json.load(f).get("source_video") or ""
+    except Exception:
+        return jsonify({"error": "No results for this video"}), 404
+    videos_root = os.path.realpath(VIDEOS_DIR)
+    real = os.path.realpath(source_video) if source_video else ""
+    if not real or os.path.commonpath([videos_root, real]) != videos_root or not os.path.isfile(real):
+        return jsonify({"error": "Source video not available"}), 404
+    return send_file(real, conditional=True)
+
+
+def _remove_render_outputs(paths: dict) -> None:
+    """Delete rendered artifacts of a previous run (videos, overlay track, annotated frames)."""
+    for name in ("detections_video.mp4", "detections_video.avi"):
+        try:
+            os.remove(os.path.join(paths["base"], name))
+        except OSError:
+            pass
+    for path in (paths["overlay_track"], paths["overlay_vtt"]):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if os.path.isdir(paths["processed_frames"]):
+        for entry in os.scandir(paths["processed_frames"]):
+            if entry.is_file():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+def _render_output_files(paths: dict) -> list:
+    """Rendered artifacts that exist (recorded in the manifest's render stage)."""
+    candidates = [
+        os.path.join(paths["base"], "detections_video.mp4"),
+        os.path.join(paths["base"], "detections_video.avi"),
+        paths["overlay_track"],
+        paths["overlay_vtt"],
+    ]
+    return [p for p in candidates if os.path.isfile(p)]
+
+
+def _summary_matches(cached: dict, request_params: dict) -> bool:
+    """True when a summary sidecar was produced by the same request parameters.
+
+    Sidecars written before parameters were recorded match on threshold and model only.
+    """
+    if cached.get("complete") is False:
+        # A stage failed in that run: process again so it is retried
+        return False
+    stored = cached.get("request")
+    if isinstance(stored, dict):
+        return stored == request_params
+    summary = cached.get("summary") or {}
+    return (
+        summary.get("confidence_threshold") == request_params["conf_threshold"]
+        and summary.get("object_model") == request_params["object_model"]
+    )
+
+
+def _monument_model_version() -> str:
+    """Identify the current monument model build (for the stage cache key)."""
+    try:
+        return "m%d" % int(os.path.getmtime(os.path.join(MONUMENT_MODEL_DIR, "meta.json")))
+    except OSError:
+        return "none"
+
+
+def _result_urls(video_id: str) -> dict:
+    """Download URLs for a processed video; overlay URLs only when the overlay track exists."""
+    urls = {
+        "output_video_url": f"/results/{video_id}/detections_video.mp4",
+        "detection_json_url": f"/results/{video_id}/detection_results.json",
+        "metadata_url": f"/results/{video_id}/metadata.txt",
+    }
+    paths = get_video_results_paths(video_id)
+    if os.path.isfile(paths["overlay_track"]):
+        if not os.path.isfile(os.path.join(paths["base"], "detections_video.mp4")):
+            urls["output_video_url"] = None
+        urls["overlay_url"] = f"/results/{video_id}/overlay.json"
+        urls["source_video_url"] = f"/api/source-video/{video_id}"
+    return urls
+
+
 # --- Training Data Manager API ---
 
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
@@ -214,10 +363,38 @@ def api_training_train_faces():
             return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/training/reidentify-faces", methods=["POST"])
+def api_training_reidentify_faces():
+    """Re-match stored face embeddings against the current known_faces (no re-detection).
+
+    JSON body: video_id (optional; all processed videos when omitted).
+    """
+    payload = request.get_json(force=True) or {}
+    video_id = (payload.get("video_id") or "").strip()
+    try:
+        if video_id:
+            if not validate_video_id(video_id):
+                return jsonify({"error": "Invalid video_id"}), 400
+            paths = get_video_results_paths(video_id)
+            result = reidentify_faces(paths["detection_json"], paths["face_embeddings"])
+            if result.get("busy"):
+                return jsonify(result), 409
+            if result.get("error"):
+                return jsonify(result), 404
+            return jsonify(result)
+        return jsonify(reidentify_all_videos(RESULTS_DIR))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/training/build-monument-model", methods=["POST"])
 def api_training_build_monument_model():
-    """Build and train the monument classifier from training_data/dataset and training_data/monuments."""
+    """Build and train the monument classifier from training_data/dataset and training_data/monuments.
+
+    JSON body (optional): streaming (bool), chunk_size, epochs – chunked SGD training for large datasets.
+    """
     ensure_directories()
+    payload = request.get_json(silent=True) or {}
     device = "cpu"
     try:
         import torch  # type: ignore
@@ -231,6 +408,9 @@ def api_training_build_monument_model():
             monuments_dir=TRAINING_MONUMENTS_DIR,
             model_dir=MONUMENT_MODEL_DIR,
             device=device,
+            streaming=bool(payload.get("streaming", False)),
+            chunk_size=int(payload.get("chunk_size", 1024)),
+            epochs=int(payload.get("epochs", 5)),
         )
         if result.get("trained"):
             return jsonify(result)
@@ -339,12 +519,16 @@ def get_system_info():
             mongo_db_name = str(db.name)
             try:
                 mongo_videos = db[VIDEOS_COLLECTION].estimated_document_count()
-                mongo_frames = db[FRAMES_COLLECTION].estimated_document_count()
+                mongo_frames = (
+                    db[FRAMES_COLLECTION].estimated_document_count()
+                    + db[FRAMES_COMPACT_COLLECTION].estimated_document_count()
+                )
             except Exception:
                 # Counting is best-effort; ignore failures here
                 pass
     except Exception:
         mongo_status = "error"
+    index_queue = get_index_queue(start=False)
     return {
         "python_version": python_version,
         "cpu": cpu_name,
@@ -353,6 +537,8 @@ def get_system_info():
         "mongo_db_name": mongo_db_name,
         "mongo_videos": mongo_videos,
         "mongo_frames": mongo_frames,
+        "mongo_index_queue": index_queue.status() if index_queue is not None else None,
+        "vector_store": {kind: get_vector_store(kind).stats() for kind in VECTOR_KINDS},
     }
 
 
@@ -361,6 +547,151 @@ def api_system_info():
     return jsonify(get_system_info())
 
 
+@app.route("/api/segments", methods=["GET"])
+def api_segments():
+    """Where does a label appear: time ranges from the MongoDB segments collection.
+
+    Query: label (required), kind (face | object | monument), video_id, limit.
+    """
+    label = (request.args.get("label") or "").strip()
+    if not label:
+        return jsonify({"error": "label is required"}), 400
+    kind = (request.args.get("kind") or "").strip().lower() or None
+    if kind is not None and kind not in SEGMENT_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(SEGMENT_KINDS)}"}), 400
+    if get_db() is None:
+        return jsonify({"error": "MongoDB is not configured"}), 503
+    try:
+        limit = max(1, min(int(request.args.get("limit", 500)), 5000))
+    except ValueError:
+        limit = 500
+    segments = find_label_segments(label, kind=kind, video_id=request.args.get("video_id") or None, limit=limit)
+    return jsonify({"label": label, "kind": kind, "segments": segments})
+
+
+@app.route("/api/label-stats", methods=["GET"])
+def api_label_stats():
+    """Search facets from the materialized label_stats collection.
+
+    Query: kind (face | object | monument, required); with label, that label's per-video
+    counts and first/last timestamps; without it, the top labels of the kind (limit).
+    """
+    kind = (request.args.get("kind") or "").strip().lower()
+    if kind not in SEGMENT_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(SEGMENT_KINDS)}"}), 400
+    if get_db() is None:
+        return jsonify({"error": "MongoDB is not configured"}), 503
+    label = (request.args.get("label") or "").strip()
+    if label:
+        stats = get_label_stats(kind, label)
+        if stats is None:
+            return jsonify({"error": "Label not found"}), 404
+        return jsonify(stats)
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 1000))
+    except ValueError:
+        limit = 50
+    return jsonify({"kind": kind, "labels": label_facets(kind, limit=limit)})
+
+
+@app.route("/api/search", methods=["GET"])
+def api_search():
+    """Boolean search over the local SQLite index (no MongoDB needed).
+
+    Query: q (e.g. alice "red car", face:alice AND class:car -person), start / end (seconds),
+    video_id, limit (videos), frames (frames per video).
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        start_sec = float(request.args["start"]) if request.args.get("start") else None
+        end_sec = float(request.args["end"]) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "start and end must be numbers (seconds)"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 200))
+    except ValueError:
+        limit = 20
+    try:
+        frames = max(0, min(int(request.args.get("frames", 50)), 1000))
+    except ValueError:
+        frames = 50
+    try:
+        result = search_local_index(
+            q,
+            start_sec=start_sec,
+            end_sec=end_sec,
+            video_id=request.args.get("video_id") or None,
+            limit_videos=limit,
+            limit_frames=frames,
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    return jsonify(result)
+
+
+@app.route("/api/search/similar", methods=["POST"])
+def api_search_similar():
+    """Query by example: frames whose faces (or scenes) look like an uploaded image.
+
+    Form: image (file), kind (face | scene, default face), k, video_id, min_score.
+    kind=face embeds the largest face of the image with the face model; kind=scene embeds
+    the whole image with ResNet18. Returns the top-k frames by cosine similarity.
+    """
+    import cv2
+    import numpy as np
+
+    kind = (request.form.get("kind") or "face").strip().lower()
+    if kind not in VECTOR_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(VECTOR_KINDS)}"}), 400
+    upload = request.files.get("image")
+    if upload is None:
+        return jsonify({"error": "image is required"}), 400
+    image = cv2.imdecode(np.frombuffer(upload.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return jsonify({"error": "Could not decode image"}), 400
+    try:
+        k = max(1, min(int(request.form.get("k", 20)), 500))
+    except ValueError:
+        k = 20
+    try:
+        min_score = float(request.form["min_score"]) if request.form.get("min_score") else None
+    except ValueError:
+        return jsonify({"error": "min_score must be a number"}), 400
+
+    device = "cpu"
+    try:
+        import torch  # type: ignore
+        if torch.cuda.is_available():
+            device = "cuda"
+    except Exception:
+        pass
+    query_face = None
+    try:
+        if kind == "face":
+            face_model = (request.form.get("face_model") or "buffalo_l").strip().lower()
+            faces = embed_faces(image, face_model=face_model, device=device)
+            if not faces:
+                return jsonify({"error": "No face found in the image"}), 422
+            query = faces[0]["embedding"]
+            query_face = {"bbox": faces[0]["bbox"], "confidence": faces[0]["confidence"]}
+        else:
+            query = extract_scene_features([image], device=device)[0]
+            if query is None:
+                return jsonify({"error": "Could not embed the image"}), 422
+    except Exception as e:
+        return jsonify({"error": f"Embedding model unavailable: {e}"}), 503
+
+    try:
+        result = get_vector_store(kind).search(
+            query, k=k, video_id=request.form.get("video_id") or None, min_score=min_score,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(dict(result, kind=kind, query_face=query_face))
+
+
 def get_video_metadata(url: str):
     if not yt_dlp:
         return {}
@@ -386,7 +717,44 @@ def get_video_metadata(url: str):
 
 @app.route('/api/process', methods=['POST'])
 def api_process():
-    payload = request.get_json(force=True) or {}
+    return process_request(request.get_json(force=True) or {})
+
+
+def process_request(payload):
+    """The processing pipeline behind /api/process (and /api/jobs worker processes).
+
+    Live progress goes to results/<video_id>/progress.json (streamed by /api/progress).
+    Runs of one video are serialized by its file lock (pipeline.locks), across threads and
+    processes: a concurrent request waits for the running one, then is answered from the
+    cache when its parameters match (or runs only the stages that differ).
+    """
+    url = str(payload.get('url') or '').strip()
+    video_id = (extract_video_id_from_url(url) or sanitize_id(url)) if url else None
+    lock = video_lock(video_id) if video_id and validate_video_id(video_id) else None
+    if lock is not None and not lock.acquire(timeout=0):
+        print(f"[lock] Video {video_id!r} is being processed by another request; waiting for it.")
+        if not lock.acquire(timeout=VIDEO_LOCK_TIMEOUT):
+            return jsonify({
+                "error": "This video is still being processed by another request; try again later.",
+            }), 409
+    try:
+        progress = ProgressReporter()
+        try:
+            resp = _process_request(payload, progress)
+        except Exception as e:
+            progress.finish("failed", str(e))
+            raise
+        if isinstance(resp, tuple) and resp[1] >= 400:
+            progress.finish("failed", (resp[0].get_json() or {}).get("error"))
+        else:
+            progress.finish("completed")
+        return resp
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def _process_request(payload, progress):
     url = payload.get('url', '').strip()
     conf_threshold = float(payload.get('conf_threshold', 0.5))
     fps = int(payload.get('fps', 1))
@@ -435,91 +803,256 @@ def api_process():
     if not ensure_video_results_dirs(video_id):
         return jsonify({"error": "Failed to create results directories"}), 500
 
-    # Return cached results if they exist and we're not forcing a rescan
-    if not force_rescan and (
+    # Everything that determines the results; a cached response is only served for the same request
+    face_model_name = payload.get("face_model", "buffalo_l")
+    try:
+        face_conf_threshold = float(payload.get("face_conf_threshold", 0.5))
+    except Exception:
+        face_conf_threshold = 0.5
+    monument_gating = str(payload.get("monument_gating", "none")).lower()
+    if monument_gating not in MONUMENT_GATING_CHOICES:
+        monument_gating = "none"
+    monument_stride = int(payload.get("monument_stride", 10))
+    render_mode = str(payload.get('render_mode', 'stills')).lower()
+    request_params = {
+        "conf_threshold": conf_threshold,
+        "object_model": object_model,
+        "face_model": face_model_name,
+        "face_conf_threshold": face_conf_threshold,
+        "scan_mode": scan_mode,
+        "scan_start_seconds": scan_start_seconds,
+        "scan_end_seconds": scan_end_seconds,
+        "monument_gating": monument_gating,
+        "monument_stride": monument_stride,
+        "render_mode": render_mode,
+        "fps": fps,
+    }
+
+    # Fast cache hit: everything the response needs is in the summary sidecar
+    # (no results parsing, no network metadata lookup)
+    previous = None if force_rescan else load_summary(paths['summary_json'])
+    if previous is not None and _summary_matches(previous, request_params):
+        return jsonify({
+            "status": "cached",
+            "video_id": video_id,
+            "metadata": previous.get("metadata") or {},
+            "summary": previous["summary"],
+            "results": _result_urls(video_id),
+        })
+
+    # Results written before the summary sidecar existed (no stage cache either): served
+    # when threshold and model match, and the sidecar is backfilled
+    meta = None
+    if not force_rescan and previous is None and not os.path.isdir(paths['stage_cache']) and (
         os.path.exists(paths['detection_json']) or (
             os.path.isdir(paths['processed_frames']) and any(os.scandir(paths['processed_frames']))
         )
     ):
-        print(f"[trace] Returning CACHED results (force_rescan={force_rescan})")
         meta = get_video_metadata(url)
         total_frames = 0
         total_dets = 0
         by_class = {}
         conf_used = conf_threshold
+        object_model_cached = 'yolov8n'
+        face_model_cached = face_model_name
+        total_face_detections = 0
         try:
-            with open(paths['detection_json'], 'r', encoding='utf-8') as f:
-                dj = json.load(f)
-            frames_list = dj.get('frames') or []
-            results_by_frame = { (fr.get('frame') or ''): (fr.get('detections') or []) for fr in frames_list }
-            total_dets, by_class = generate_summary(results_by_frame)
-            total_frames = len(results_by_frame)
-            total_face_detections = sum(len(fr.get('faces') or []) for fr in frames_list)
+            if has_columnar_results(paths['detection_columns']):
+                # Columnar results: counts come from the label column, no JSON parse
+                cols = ColumnarResults(paths['detection_columns'])
+                total_dets, by_class, total_face_detections = cols.summary()
+                total_frames = cols.frame_count
+                dj = cols.meta
+            else:
+                with open(paths['detection_json'], 'r', encoding='utf-8') as f:
+                    dj = json.load(f)
+                frames_list = dj.get('frames') or []
+                results_by_frame = { (fr.get('frame') or ''): (fr.get('detections') or []) for fr in frames_list }
+                total_dets, by_class = generate_summary(results_by_frame)
+                total_frames = len(results_by_frame)
+                total_face_detections = sum(len(fr.get('faces') or []) for fr in frames_list)
             conf_used = dj.get('confidence_threshold', conf_used)
             object_model_cached = dj.get('object_model', 'yolov8n')
-            face_model_cached = dj.get('face_model', payload.get('face_model', 'buffalo_l'))
+            face_model_cached = dj.get('face_model', face_model_cached)
         except Exception:
-            object_model_cached = 'yolov8n'
-            face_model_cached = payload.get('face_model', 'buffalo_l')
-            total_face_detections = 0
-
-        return jsonify({
-            "status": "cached",
-            "video_id": video_id,
-            "metadata": meta,
-            "summary": {
-                "total_frames": total_frames,
-                "total_detections": total_dets,
-                "total_face_detections": total_face_detections,
-                "by_class": by_class,
-                "confidence_threshold": conf_used,
-                "object_model": object_model_cached,
-                "face_model": face_model_cached,
-            },
-            "results": {
-                "output_video_url": f"/results/{video_id}/detections_video.mp4",
-                "detection_json_url": f"/results/{video_id}/detection_results.json",
-                "metadata_url": f"/results/{video_id}/metadata.txt",
-            }
-        })
+            pass
 
-    # Optional metadata
-    meta = get_video_metadata(url)
+        summary = {
+            "total_frames": total_frames,
+            "total_detections": total_dets,
+            "total_face_detections": total_face_detections,
+            "by_class": by_class,
+            "confidence_threshold": conf_used,
+            "object_model": object_model_cached,
+            "face_model": face_model_cached,
+        }
+        if float(conf_used) == conf_threshold and object_model_cached == object_model:
+            print(f"[trace] Returning CACHED results (force_rescan={force_rescan})")
+            if os.path.exists(paths['detection_json']):
+                try:
+                    save_summary(paths['summary_json'], video_id, meta, summary)
+                except Exception:
+                    pass
+            return jsonify({
+                "status": "cached",
+                "video_id": video_id,
+                "metadata": meta,
+                "summary": summary,
+                "results": _result_urls(video_id),
+            })
+
+    # Optional metadata (reused from the previous run of this video when available)
+    if meta is None:
+        meta = (previous or {}).get("metadata") or get_video_metadata(url)
     run_stats = {}
 
-    try:
-        print("[trace] Starting fresh run (download -> frames -> detection -> face)")
-        # Download video (required)
-        t0 = time.perf_counter()
-        video_path = download_video(url, VIDEOS_DIR)
-        run_stats["download_sec"] = round(time.perf_counter() - t0, 2)
-        if not video_path or not os.path.isfile(video_path):
-            return jsonify({
-                "error": "Video download failed. Try again or use a different URL; some videos may be restricted.",
-                "video_id": video_id
-            }), 500
+    # Decide which pipelines to run based on scan_mode
+    run_objects = scan_mode in ("objects", "both")
+    run_faces = scan_mode in ("faces", "both")
+    run_monuments = load_monument_model(MONUMENT_MODEL_DIR) is not None
+
+    # Stage cache: raw per-stage results per video timeline, keyed by (stage, model, params),
+    # with the scanned intervals recorded in each entry. A window only processes the seconds
+    # no earlier window covered. Objects are detected at a floor confidence so any higher
+    # threshold is served by filtering.
+    cache_dir = paths['stage_cache']
+    window = (scan_start_seconds, scan_end_seconds)
+    objects_floor = min(conf_threshold, RAW_CONF_FLOOR)
+    objects_key = stage_key("objects", object_model, None, None, floor=objects_floor)
+    faces_key = stage_key("faces", face_model_name, None, None, face_conf=face_conf_threshold)
+    monuments_key = stage_key(
+        "monuments", _monument_model_version(), None, None,
+        gating=monument_gating, stride=monument_stride,
+    )
+    objects_entry = load_stage(cache_dir, objects_key) if run_objects else None
+    faces_entry = load_stage(cache_dir, faces_key) if run_faces else None
+    monuments_entry = load_stage(cache_dir, monuments_key) if run_monuments else None
+    objects_missing = uncovered(entry_covered(objects_entry), *window) if run_objects else []
+    faces_missing = uncovered(entry_covered(faces_entry), *window) if run_faces else []
+    monuments_missing = uncovered(entry_covered(monuments_entry), *window) if run_monuments else []
+    need_objects = bool(objects_missing)
+    need_faces = bool(faces_missing)
+    need_monuments = bool(monuments_missing)
+    # Stages that failed in this run (results are served but neither cached nor committed)
+    failed_stages = []
+    run_stats["failed_stages"] = failed_stages
+    run_stats["stage_cache_hits"] = [
+        name for name, run, missing in (
+            ("objects", run_objects, objects_missing),
+            ("faces", run_faces, faces_missing),
+            ("monuments", run_monuments, monuments_missing),
+        )
+        if run and not missing
+    ]
+    stage_missing = merge_intervals(objects_missing + faces_missing + monuments_missing)
+    run_stats["scanned_intervals"] = stage_missing
+
+    # Stage manifest: committed stages with the same parameters are skipped, so a run that
+    # crashed (or timed out) resumes from its first incomplete stage
+    manifest = StageManifest(paths['manifest'], video_id)
+    stage_keys = {
+        "objects": objects_key if run_objects else None,
+        "faces": faces_key if run_faces else None,
+        "monuments": monuments_key if run_monuments else None,
+    }
 
-        # Per-video frames directory so we only process this video's frames
+    progress.bind(paths['progress'], video_id)
+    try:
+        # Per-video frames directory, frames named by absolute time and kept across windows
         frames_dir_this_video = os.path.join(FRAMES_DIR, video_id)
-        os.makedirs(frames_dir_this_video, exist_ok=True)
-        t1 = time.perf_counter()
-        saved_frames = extract_frames(
-            video_path,
-            frames_dir_this_video,
-            start_seconds=scan_start_seconds,
-            end_seconds=scan_end_seconds,
+        frame_store = FrameStore(frames_dir_this_video)
+        download_params = {"url": url}
+        downloaded = manifest.completed(
+            "download", download_params, validate=lambda out: os.path.isfile(out["video_path"]),
         )
-        run_stats["extract_frames_sec"] = round(time.perf_counter() - t1, 2)
-
-        if not saved_frames:
-            return jsonify({
-                "error": "No frames could be extracted from the video (file may be corrupted or unreadable).",
-                "video_id": video_id
-            }), 500
-
-        # Decide which pipelines to run based on scan_mode
-        run_objects = scan_mode in ("objects", "both")
-        run_faces = scan_mode in ("faces", "both")
+        video_path = downloaded["video_path"] if downloaded else None
+        # Inference needs the uncovered seconds on disk; stills need the whole window
+        frames_wanted = stage_missing if render_mode in ('overlay', 'source') else [list(window)]
+        extract_intervals = [gap for a, b in frames_wanted for gap in frame_store.missing(a, b)]
+
+        # Source and overlay rendering play the original video, so it must exist as well
+        if video_path is None and (extract_intervals or render_mode in ('source', 'overlay')):
+            print("[trace] Starting fresh run (download -> frames -> detection -> face)")
+            # Download video (required)
+            manifest.begin("download", download_params)
+            progress.stage("download")
+            t0 = time.perf_counter()
+            video_path = download_video(url, VIDEOS_DIR)
+            run_stats["download_sec"] = round(time.perf_counter() - t0, 2)
+            if not video_path or not os.path.isfile(video_path):
+                manifest.fail("download", "download failed")
+                return jsonify({
+                    "error": "Video download failed. Try again or use a different URL; some videos may be restricted.",
+                    "video_id": video_id
+                }), 500
+            manifest.commit("download", download_params, {"video_path": video_path}, run_stats["download_sec"])
+            progress.end_stage()
+
+        if extract_intervals:
+            extract_params = {"video_path": video_path, "intervals": extract_intervals}
+            manifest.begin("extract", extract_params)
+            # One frame per second: the seconds left in later intervals count towards the total
+            extract_progress = progress.stage("extract", total=int(sum(b - a for a, b in extract_intervals)))
+            os.makedirs(frames_dir_this_video, exist_ok=True)
+            t1 = time.perf_counter()
+            saved_count = 0
+            duration = video_duration(video_path)
+            failed_intervals = []
+            for i, (a, b) in enumerate(extract_intervals):
+                new_times: dict = {}
+                later = int(sum(hi - lo for lo, hi in extract_intervals[i + 1:]))
+                saved_count += len(extract_frames(
+                    video_path,
+                    frames_dir_this_video,
+                    start_seconds=a,
+                    end_seconds=b,
+                    frame_times=new_times,
+                    absolute_names=True,
+                    progress_callback=lambda done, total, offset=saved_count, later=later: extract_progress(
+                        offset + done, offset + total + later,
+                    ),
+                ))
+                # Only what was really extracted is recorded as on disk: extract_frames stops
+                # quietly on decode errors, and a covered interval is never extracted again.
+                # The last sample covers the second after it; past the end of the video (within
+                # a second, container durations are approximate) there is nothing to extract.
+                # With an unknown duration an empty interval stays uncovered and is retried.
+                if new_times:
+                    end = max(new_times.values()) + 1.0
+                    frame_store.add(a, b if duration is not None and end >= duration - 1.0 else min(b, end), new_times)
+                elif duration is not None and a >= duration - 1.0:
+                    frame_store.add(a, b)
+                elif duration is not None:
+                    failed_intervals.append([a, b])
+            run_stats["extract_frames_sec"] = round(time.perf_counter() - t1, 2)
+
+            if failed_intervals:
+                manifest.fail("extract", f"no frames extracted in {failed_intervals}")
+                return jsonify({
+                    "error": "Frames could not be extracted from part of the video (file may be corrupted or unreadable).",
+                    "video_id": video_id,
+                    "intervals": failed_intervals,
+                }), 500
+            if not frame_store.window(*window) and not saved_count:
+                manifest.fail("extract", "no frames extracted")
+                return jsonify({
+                    "error": "No frames could be extracted from the video (file may be corrupted or unreadable).",
+                    "video_id": video_id
+                }), 500
+            manifest.commit(
+                "extract", extract_params, {"frame_count": saved_count}, run_stats["extract_frames_sec"],
+            )
+            progress.end_stage()
+        stage_params = {"source_video": video_path}
+        # Stages only cover seconds whose frames are on disk (a truncated extraction leaves the
+        # rest uncovered, so a later request extracts and processes it)
+        objects_missing, faces_missing, monuments_missing = (
+            [part for a, b in missing for part in covered_parts(frame_store.intervals, a, b)]
+            for missing in (objects_missing, faces_missing, monuments_missing)
+        )
+        need_objects = bool(objects_missing)
+        need_faces = bool(faces_missing)
+        need_monuments = bool(monuments_missing)
 
         results_by_frame: dict = {}
         total_dets = 0
@@ -539,196 +1072,618 @@ def api_process():
         run_stats["device"] = device
         run_stats["gpu_name"] = gpu_name
 
-        # Object detection (YOLO) – only when enabled
+        # Object detection (YOLO) – only when enabled; runs on the seconds of this window that
+        # no earlier window covered and is merged into the timeline entry
         if run_objects:
-            model_path = _resolve_model_path(object_model, BASE_DIR)
-            t2 = time.perf_counter()
-            results_by_frame = run_yolo(
-                frames_dir=frames_dir_this_video,
-                detections_dir=paths['processed_frames'],
-                model_path=model_path,
-                conf_threshold=conf_threshold,
-                device=device,
-            )
-            run_stats["detection_sec"] = round(time.perf_counter() - t2, 2)
+            if need_objects:
+                model_path = _resolve_model_path(object_model, BASE_DIR)
+                manifest.begin("objects", {"cache_key": objects_key, "intervals": objects_missing})
+                t2 = time.perf_counter()
+                new_times = frames_in_intervals(frame_store.frame_times, objects_missing)
+                raw_new = run_yolo(
+                    frames_dir=frames_dir_this_video,
+                    detections_dir=paths['processed_frames'],
+                    model_path=model_path,
+                    conf_threshold=objects_floor,
+                    device=device,
+                    save_annotated=False,
+                    frame_names=new_times,
+                    progress_callback=progress.stage("objects", total=len(new_times)),
+                )
+                run_stats["detection_sec"] = round(time.perf_counter() - t2, 2)
+                objects_entry = update_stage(
+                    cache_dir, objects_key, "objects", objects_entry, raw_new, new_times, objects_missing, stage_params,
+                )
+                manifest.commit(
+                    "objects", {"cache_key": objects_key, "intervals": objects_missing},
+                    {"cache_key": objects_key}, run_stats["detection_sec"],
+                )
+                progress.end_stage()
+            raw_results = window_frames(objects_entry, *window)
+            results_by_frame = filter_detections(raw_results, conf_threshold)
             total_dets, by_class = generate_summary(results_by_frame)
-        else:
-            # Faces-only mode: copy raw frames into processed_frames so we can draw faces + render video
-            import cv2
-
-            os.makedirs(paths['processed_frames'], exist_ok=True)
-            for fname in sorted(os.listdir(frames_dir_this_video)):
-                if not fname.lower().endswith((".jpg", ".jpeg", ".png")):
-                    continue
-                src = os.path.join(frames_dir_this_video, fname)
-                dst = os.path.join(paths['processed_frames'], fname)
-                img = cv2.imread(src)
-                if img is None:
-                    continue
-                cv2.imwrite(dst, img)
-                results_by_frame[fname] = []
-
-        total_frames = len(results_by_frame)
 
-        # Face detection: run on original frames for better recall, draw on annotated frames (only when enabled)
-        face_model_name = payload.get("face_model", "buffalo_l")
+        # Face detection: run on original frames for better recall (only when enabled)
         faces_by_frame: dict = {}
         total_face_detections = 0
         print(f"[trace] scan_mode={scan_mode!r} run_objects={run_objects} run_faces={run_faces}")
-        if run_faces:
+        faces_embeddings_cache = stage_cache_path(cache_dir, faces_key)[:-len(".json")] + ".npz"
+        if need_faces:
             print("[trace] Calling run_face_detection(...)")
+            manifest.begin("faces", {"cache_key": faces_key, "intervals": faces_missing})
             t_face = time.perf_counter()
             try:
-                face_conf_threshold = float(payload.get("face_conf_threshold", 0.5))
-            except Exception:
-                face_conf_threshold = 0.5
-            try:
-                faces_by_frame = run_face_detection(
+                os.makedirs(cache_dir, exist_ok=True)
+                new_times = frames_in_intervals(frame_store.frame_times, faces_missing)
+                new_faces = run_face_detection(
                     paths["processed_frames"],
                     face_model=face_model_name,
                     device=device,
                     face_conf_threshold=face_conf_threshold,
                     source_frames_dir=frames_dir_this_video,
+                    embeddings_path=faces_embeddings_cache + ".new.npz",
+                    annotate=False,
+                    frame_names=new_times,
+                    progress_callback=progress.stage("faces", total=len(new_times)),
                 )
+                if new_faces is None:
+                    # Not scanned: the window must stay uncovered so a later request retries
+                    raise RuntimeError("face detection unavailable (insightface or detector not loaded)")
+                merge_face_embeddings(faces_embeddings_cache, faces_embeddings_cache + ".new.npz")
+                faces_entry = update_stage(
+                    cache_dir, faces_key, "faces", faces_entry, new_faces, new_times, faces_missing, stage_params,
+                )
+                manifest.commit(
+                    "faces", {"cache_key": faces_key, "intervals": faces_missing}, {"cache_key": faces_key},
+                    time.perf_counter() - t_face,
+                )
+                progress.end_stage()
             except Exception as e:
+                failed_stages.append("faces")
+                manifest.fail("faces", str(e))
+                progress.end_stage("failed")
                 import logging
                 logging.getLogger(__name__).warning(
                     "Face detection failed: %s", e, exc_info=True
                 )
             run_stats["face_detection_sec"] = round(time.perf_counter() - t_face, 2)
+        if run_faces and faces_entry is not None:
+            faces_by_frame = window_frames(faces_entry, *window)
             total_face_detections = sum(len(v) for v in faces_by_frame.values())
+            # face_embeddings.npz covers the faces in detection_results.json (and the rest of the
+            # timeline; reidentify_faces skips frames that are not in the results)
+            if os.path.isfile(faces_embeddings_cache):
+                shutil.copyfile(faces_embeddings_cache, paths["face_embeddings"])
 
         # Monument recognition (if model was built from training_data/dataset or monuments)
-        # Uses the same confidence_threshold as object detection (form "Confidence threshold").
+        # Uses the same confidence_threshold as object detection (form "Confidence threshold");
+        # raw labels are cached and the threshold is applied afterwards.
         monuments_by_frame = {}
-        if load_monument_model(MONUMENT_MODEL_DIR) is not None:
+        # ResNet18 features computed by the classifier are kept as scene vectors
+        scene_features: dict = {}
+        if need_monuments:
             try:
+                manifest.begin("monuments", {"cache_key": monuments_key, "intervals": monuments_missing})
                 t_mon = time.perf_counter()
-                monuments_by_frame = run_monument_recognition(
-                    paths["processed_frames"],
+                new_times = frames_in_intervals(frame_store.frame_times, monuments_missing)
+                # "shots"/"decimate" classify only some frames and propagate labels within the shot
+                raw_monuments = run_monument_recognition(
+                    frames_dir_this_video,
                     MONUMENT_MODEL_DIR,
                     device=device,
-                    confidence_threshold=conf_threshold,
+                    confidence_threshold=0.0,
+                    gating=monument_gating,
+                    stride=monument_stride,
+                    frame_names=new_times,
+                    feature_sink=scene_features.__setitem__ if SCENE_VECTORS else None,
+                    progress_callback=progress.stage("monuments", total=len(new_times)),
+                )
+                if raw_monuments is None:
+                    raise RuntimeError(f"no monument model in {MONUMENT_MODEL_DIR}")
+                monuments_entry = update_stage(
+                    cache_dir, monuments_key, "monuments", monuments_entry, raw_monuments, new_times,
+                    monuments_missing, stage_params,
                 )
                 run_stats["monument_recognition_sec"] = round(time.perf_counter() - t_mon, 2)
-                # Draw monument label on each frame (only when conf >= confidence_threshold)
-                import cv2
-                for fname, info in monuments_by_frame.items():
-                    label = info.get("label")
-                    conf = info.get("confidence", 0)
-                    if label and label != "Unknown" and conf >= conf_threshold:
-                        path_img = os.path.join(paths["processed_frames"], fname)
-                        img = cv2.imread(path_img)
-                        if img is not None:
-                            h_img, w_img = img.shape[:2]
-                            margin = max(6, int(round(0.02 * min(h_img, w_img))))
-                            x1, y1 = margin, margin
-                            x2, y2 = max(x1 + 1, w_img - margin), max(y1 + 1, h_img - margin)
-                            # Pseudo bounding box: this monument model is a frame-level classifier,
-                            # so we highlight the frame region rather than a true detected monument box.
-                            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 3)
-                            cv2.putText(
-                                img, f"Monument: {label} ({conf:.2f})",
-                                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2,
-                            )
-                            cv2.imwrite(path_img, img)
-                            # Persist bbox into JSON results so UI can show it in the modal.
-                            try:
-                                info["bbox"] = [int(x1), int(y1), int(x2), int(y2)]
-                            except Exception:
-                                pass
+                manifest.commit(
+                    "monuments", {"cache_key": monuments_key, "intervals": monuments_missing},
+                    {"cache_key": monuments_key}, run_stats["monument_recognition_sec"],
+                )
+                progress.end_stage()
             except Exception as e:
+                failed_stages.append("monuments")
+                manifest.fail("monuments", str(e))
+                progress.end_stage("failed")
                 import logging
                 logging.getLogger(__name__).warning("Monument recognition failed: %s", e)
+        if run_monuments and monuments_entry is not None:
+            monuments_by_frame = filter_monuments(window_frames(monuments_entry, *window), conf_threshold)
+
+        # Sample times of this window, from the frame store and every stage entry
+        frame_times: dict = frame_store.window(*window)
+        for entry in (objects_entry, faces_entry, monuments_entry):
+            if entry is not None:
+                frame_times.update(frames_in_window(entry.get("frame_times") or {}, *window))
+        # Scene features for similarity search: frames of this window not featurized yet
+        if SCENE_VECTORS:
+            t_scene = time.perf_counter()
+            try:
+                stored = load_frame_vectors(paths['scene_features'])
+                have = set(stored[0]) if stored is not None else set()
+                todo = sorted(f for f in frame_times if f not in have and f not in scene_features)
+                if todo:
+                    progress.stage("scene_features", total=len(todo))
+                    feats = extract_scene_features(
+                        [os.path.join(frames_dir_this_video, f) for f in todo], device=device,
+                    )
+                    scene_features.update({f: v for f, v in zip(todo, feats) if v is not None})
+                    progress.end_stage()
+                merge_frame_vectors(paths['scene_features'], scene_features)
+            except Exception as e:
+                print(f"[vectors] Scene features skipped for video {video_id!r}: {e}")
+            run_stats["scene_features_sec"] = round(time.perf_counter() - t_scene, 2)
 
-        write_metadata(
-            metadata_path=paths['metadata_txt'],
-            video_id=video_id,
-            source=url,
-            total_frames=total_frames,
-            total_detections=total_dets,
-            by_class=by_class,
-            model_name=f'{object_model}.pt',
-            device=device,
-            conf_threshold=conf_threshold,
-        )
+        if not run_objects:
+            # Faces-only mode: every extracted frame is still annotated (faces) and rendered
+            for fname in sorted(frame_times):
+                results_by_frame[fname] = []
+        total_frames = len(results_by_frame)
+        if monuments_by_frame:
+            run_stats["monument_gating"] = monument_gating
+            run_stats["monument_frames_inferred"] = sum(
+                1 for info in monuments_by_frame.values() if info.get("inferred", True)
+            )
 
-        # Render video
-        t3 = time.perf_counter()
+        # render_mode "stills": one annotated frame per sample (processed_frames + slideshow video).
+        # render_mode "source": overlays drawn on the original video at its frame rate from the
+        # detection results, with boxes interpolated between samples; no processed_frames.
+        # render_mode "overlay": no server-side annotation or encoding; a compact overlay track
+        # (overlay.json, optional overlay.vtt) is drawn over the original video by the browser.
         out_video = os.path.join(paths['base'], 'detections_video.mp4')
-        make_video_from_images(paths['processed_frames'], out_video, fps=fps)
-        run_stats["render_sec"] = round(time.perf_counter() - t3, 2)
+        save_processed_frames = bool(payload.get('save_processed_frames', True))
+        overlay_mode = str(payload.get('overlay_mode', 'interpolate')).lower()
+        render_params = {
+            "request": request_params,
+            "stages": stage_keys,
+            "overlay_mode": overlay_mode,
+            "overlay_vtt": bool(payload.get('overlay_vtt', False)),
+            "save_processed_frames": save_processed_frames,
+        }
+        rendered = manifest.completed(
+            "render", render_params, validate=lambda out: all(os.path.exists(f) for f in out["files"]),
+        )
+        if not rendered:
+            # Outputs of a previous run with other parameters must not be served with these results
+            _remove_render_outputs(paths)
+            manifest.begin("render", render_params)
+            render_progress = progress.stage("render", total=len(results_by_frame))
+        # Set by each render mode: the stage is committed only when its output was written
+        render_error = None
+        if rendered:
+            print("[trace] Render already committed for these parameters; skipping")
+        elif render_mode == 'overlay':
+            t3 = time.perf_counter()
+            track = build_overlay_track(
+                build_detection_payload(
+                    results_by_frame,
+                    video_id=video_id,
+                    conf_threshold=conf_threshold,
+                    faces_by_frame=faces_by_frame,
+                    monuments_by_frame=monuments_by_frame,
+                    frame_times=frame_times,
+                ),
+                video_id=video_id,
+            )
+            save_overlay_track(track, paths['overlay_track'])
+            if bool(payload.get('overlay_vtt', False)):
+                save_overlay_vtt(track, paths['overlay_vtt'])
+            run_stats["render_sec"] = round(time.perf_counter() - t3, 2)
+        elif render_mode == 'source':
+            t3 = time.perf_counter()
+            if not render_overlay_video(
+                video_path,
+                build_detection_payload(
+                    results_by_frame,
+                    video_id=video_id,
+                    conf_threshold=conf_threshold,
+                    faces_by_frame=faces_by_frame,
+                    monuments_by_frame=monuments_by_frame,
+                    frame_times=frame_times,
+                ),
+                out_video,
+                mode=overlay_mode if overlay_mode in RENDER_MODES else 'interpolate',
+                workers=int(payload.get('render_workers', min(4, os.cpu_count() or 1))),
+            ):
+                render_error = "overlay video rendering failed"
+            run_stats["render_sec"] = round(time.perf_counter() - t3, 2)
+        else:
+            # Draw objects, faces and monument banner on each clean frame in one read/write pass,
+            # streaming each annotated frame into the video encoder (background thread) as it is drawn.
+            # Also stores the monument pseudo bbox into monuments_by_frame for the JSON results.
+            # save_processed_frames=false skips the annotated JPEGs (the UI frame viewer uses them).
+            video_writer = StreamingVideoWriter(out_video, fps=fps)
+            t_ann = time.perf_counter()
+            try:
+                annotate_frames(
+                    frames_dir_this_video,
+                    paths['processed_frames'],
+                    results_by_frame,
+                    faces_by_frame=faces_by_frame,
+                    monuments_by_frame=monuments_by_frame,
+                    frame_sink=video_writer.write,
+                    write_images=save_processed_frames,
+                    progress_callback=render_progress,
+                )
+            finally:
+                run_stats["annotate_sec"] = round(time.perf_counter() - t_ann, 2)
+                # Render: only flushes the frames still queued in the encoder
+                t3 = time.perf_counter()
+                if not video_writer.close():
+                    render_error = video_writer.error or "no frames were encoded"
+                run_stats["render_sec"] = round(time.perf_counter() - t3, 2)
+        if not rendered:
+            if render_error is not None:
+                # Missing or partial video: not committed, so the next request renders again
+                failed_stages.append("render")
+                manifest.fail("render", render_error)
+                progress.end_stage("failed")
+            elif failed_stages:
+                # Drawn without the failed stages' results: render again on the retry
+                manifest.fail("render", f"incomplete: {', '.join(failed_stages)} failed")
+                progress.end_stage()
+            else:
+                manifest.commit(
+                    "render", render_params, {"files": _render_output_files(paths)},
+                    run_stats.get("annotate_sec", 0) + run_stats.get("render_sec", 0),
+                )
+                progress.end_stage()
+
         run_stats["total_sec"] = round(
             run_stats.get("download_sec", 0)
             + run_stats.get("extract_frames_sec", 0)
             + run_stats.get("detection_sec", 0)
             + run_stats.get("face_detection_sec", 0)
             + run_stats.get("monument_recognition_sec", 0)
+            + run_stats.get("annotate_sec", 0)
             + run_stats.get("render_sec", 0),
             2,
         )
 
-        save_detection_results(
-            results_by_frame=results_by_frame,
-            output_json_path=paths['detection_json'],
-            video_id=video_id,
-            conf_threshold=conf_threshold,
-            object_model=object_model,
-            face_model=face_model_name,
-            run_stats=run_stats,
-            faces_by_frame=faces_by_frame,
-            monuments_by_frame=monuments_by_frame,
-        )
+        results_params = {"request": request_params, "stages": stage_keys}
+        if manifest.completed(
+            "results", results_params, validate=lambda out: os.path.isfile(paths['detection_json']),
+        ) is None:
+            manifest.begin("results", results_params)
+            progress.stage("results")
+            write_metadata(
+                metadata_path=paths['metadata_txt'],
+                video_id=video_id,
+                source=url,
+                total_frames=total_frames,
+                total_detections=total_dets,
+                by_class=by_class,
+                model_name=f'{object_model}.pt',
+                device=device,
+                conf_threshold=conf_threshold,
+            )
 
-        # Persist to MongoDB for search engine (optional; set MONGODB_URI)
-        try:
-            mongo_ok = index_detection_results_to_mongodb(
+            save_detection_results(
+                results_by_frame=results_by_frame,
+                output_json_path=paths['detection_json'],
                 video_id=video_id,
-                source_url=url,
-                meta=meta,
+                conf_threshold=conf_threshold,
+                object_model=object_model,
+                face_model=face_model_name,
                 run_stats=run_stats,
-                results_by_frame=results_by_frame,
                 faces_by_frame=faces_by_frame,
                 monuments_by_frame=monuments_by_frame,
-                by_class=by_class,
-                confidence_threshold=conf_threshold,
-                object_model=object_model,
-                face_model=face_model_name,
-                fps=float(fps),
+                frame_times=frame_times,
+                source_video=video_path,
+                columns_dir=paths['detection_columns'],
             )
-            # Simple console message so it's obvious when indexing succeeds
-            if mongo_ok:
-                print(f"[mongo] Indexed video {video_id!r} into MongoDB.")
+            if failed_stages:
+                manifest.fail("results", f"incomplete: {', '.join(failed_stages)} failed")
             else:
-                print(f"[mongo] MongoDB indexing skipped or failed for video {video_id!r}.")
+                manifest.commit("results", results_params, {"detection_json": paths['detection_json']})
+            progress.end_stage()
+
+            # Local search index (SQLite, always on): replaces this video's postings
+            try:
+                index_detection_json(paths['detection_json'], meta=meta, source_url=url)
+            except Exception as e:
+                print(f"[search] Local search indexing failed for video {video_id!r}: {e}")
+            # Face / scene vectors for query-by-example (/api/search/similar)
+            try:
+                index_video_vectors(
+                    video_id,
+                    face_embeddings_path=paths['face_embeddings'],
+                    scene_features_path=paths['scene_features'],
+                    frame_times={**frame_store.frame_times, **frame_times},
+                )
+            except Exception as e:
+                print(f"[vectors] Vector indexing failed for video {video_id!r}: {e}")
+
+        # Persist to MongoDB for search engine (optional; set MONGODB_URI). The background
+        # worker writes it (durable spool, retries while MongoDB is down), so the response
+        # does not wait for the database; it commits the manifest "index" stage when done.
+        try:
+            index_queue = get_index_queue(start=_START_INDEX_WORKER)
+            if index_queue is None:
+                print(f"[mongo] MongoDB indexing skipped for video {video_id!r} (MONGODB_URI not set).")
+            elif manifest.completed("index", results_params) is None:
+                manifest.begin("index", results_params)
+                index_queue.enqueue({
+                    "video_id": video_id,
+                    "source_url": url,
+                    "meta": meta,
+                    "run_stats": run_stats,
+                    "by_class": by_class,
+                    "confidence_threshold": conf_threshold,
+                    "object_model": object_model,
+                    "face_model": face_model_name,
+                    "detection_json": paths['detection_json'],
+                    "manifest": paths['manifest'],
+                    "manifest_params": results_params,
+                })
+                print(f"[mongo] Queued video {video_id!r} for MongoDB indexing.")
         except Exception as e:
             import logging
             logging.getLogger(__name__).warning("MongoDB index skipped: %s", e)
 
+        summary = {
+            "total_frames": total_frames,
+            "total_detections": total_dets,
+            "total_face_detections": total_face_detections,
+            "by_class": by_class,
+            "confidence_threshold": conf_threshold,
+            "object_model": object_model,
+            "face_model": face_model_name,
+            "run_stats": run_stats,
+        }
+        save_summary(
+            paths['summary_json'], video_id, meta, summary, request=request_params, complete=not failed_stages,
+        )
+
         return jsonify({
             "status": "completed",
             "video_id": video_id,
             "metadata": meta,
-            "summary": {
-                "total_frames": total_frames,
-                "total_detections": total_dets,
-                "total_face_detections": total_face_detections,
-                "by_class": by_class,
-                "confidence_threshold": conf_threshold,
-                "object_model": object_model,
-                "face_model": face_model_name,
-                "run_stats": run_stats,
-            },
-            "results": {
-                "output_video_url": f"/results/{video_id}/detections_video.mp4",
-                "detection_json_url": f"/results/{video_id}/detection_results.json",
-                "metadata_url": f"/results/{video_id}/metadata.txt",
-            }
+            "summary": summary,
+            "results": _result_urls(video_id),
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _run_process_job(payload):
+    """JobPool target, run in a worker process: process_request -> (response body, status)."""
+    global _START_INDEX_WORKER
+    _START_INDEX_WORKER = False
+    with app.app_context():
+        resp = process_request(payload)
+    status = 200
+    if isinstance(resp, tuple):
+        resp, status = resp
+    return resp.get_json(), status
+
+
+_job_pool = None
+_job_pool_lock = threading.Lock()
+
+
+def get_job_pool():
+    """Process-wide JobPool for /api/jobs, created on first use.
+
+    Creating it also starts the index queue worker (draining jobs spooled before a restart)
+    and resubmits unfinished jobs from a previous run.
+    """
+    global _job_pool
+    with _job_pool_lock:
+        if _job_pool is None:
+            if _START_INDEX_WORKER:
+                get_index_queue()
+            _job_pool = JobPool(_run_process_job)
+            _job_pool.recover()
+    return _job_pool
+
+
+@app.before_request
+def _start_background_services():
+    # Any server (the dev server with or without the reloader, gunicorn, waitress) starts the
+    # index queue and job recovery on its first request; job workers never dispatch requests
+    get_job_pool()
+
+
+def _job_progress(job):
+    """Per-stage progress of a job's video from its stage manifest.
+
+    Stages finished before the job started were reused from an earlier run ("cached").
+    """
+    video_id = job.get("video_id")
+    started_at = job.get("started_at")
+    if not video_id or started_at is None:
+        return {"stages": {}, "current_stage": None}
+    manifest = StageManifest(get_video_results_paths(video_id)['manifest'], video_id)
+    stages = {}
+    current = None
+    for stage in PIPELINE_STAGES:
+        entry = manifest.entry(stage)
+        if not entry:
+            continue
+        status = entry.get("status")
+        if status == "done" and (entry.get("finished_at") or 0) < started_at:
+            status = "cached"
+        elif (entry.get("started_at") or 0) < started_at:
+            # Left over from an earlier run; this job has not reached the stage yet
+            continue
+        stages[stage] = {"status": status, "sec": entry.get("sec")}
+        if status == "running":
+            current = stage
+    return {"stages": stages, "current_stage": current}
+
+
+def _job_view(job):
+    view = {k: v for k, v in job.items() if k != "params"}
+    view["request"] = job.get("params")
+    if job.get("status") == "running":
+        view.update(_job_progress(job))
+    return view
+
+
+@app.route('/api/jobs', methods=['POST'])
+def api_jobs_submit():
+    """Queue /api/process work (same JSON body) for a worker process; returns a job id at once."""
+    payload = request.get_json(force=True) or {}
+    url = str(payload.get('url') or '').strip()
+    if not url:
+        return jsonify({"error": "URL is required"}), 400
+    video_id = extract_video_id_from_url(url) or sanitize_id(url)
+    if not validate_video_id(video_id):
+        return jsonify({"error": "Invalid or unsupported video ID derived from URL"}), 400
+    try:
+        # An identical request already queued or running is returned instead of a new job
+        job = get_job_pool().submit("process", payload, video_id=video_id)
+    except JobQueueFull as e:
+        return jsonify({"error": f"Too many jobs in progress, retry later ({e})."}), 429
+    return jsonify({
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "video_id": video_id,
+        "attached": bool(job.get("attached")),
+        "status_url": f"/api/jobs/{job['job_id']}",
+    }), 202
+
+
+@app.route('/api/jobs', methods=['GET'])
+def api_jobs_list():
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 500))
+    except ValueError:
+        limit = 50
+    pool = get_job_pool()
+    return jsonify({"pool": pool.status(), "jobs": [_job_view(job) for job in pool.store.list(limit=limit)]})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_jobs_get(job_id: str):
+    """Job status; stage progress while running, the /api/process response body once completed."""
+    job = get_job_pool().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_view(job))
+
+
+# Longest a progress stream stays open (seconds)
+PROGRESS_STREAM_TIMEOUT = float(os.environ.get('VISTA_PROGRESS_STREAM_TIMEOUT', '3600'))
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _progress_events(progress_path, since, finished=None):
+    """Server-Sent Events for a video's progress.json until its run ends.
+
+    "stage" on every stage transition, "progress" (frames done/total, fps, ETA of the
+    current stage) on every update of the file, "end" with the final status. A run that
+    finished before `since` is ignored, so the stream waits for the next one.
+    finished: optional callable returning the "end" payload once the caller's work is
+    over (e.g. a job answered from the cache, which writes no progress).
+    """
+    def file_mtime():
+        try:
+            return os.stat(progress_path).st_mtime_ns
+        except OSError:
+            return None
+
+    yield "retry: 2000\n\n"
+    seen_stages = {}
+    last_mtime = None
+    last_sent = time.monotonic()
+    deadline = last_sent + PROGRESS_STREAM_TIMEOUT
+    while time.monotonic() < deadline:
+        mtime = file_mtime()
+        state = None
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            state = load_progress(progress_path)
+        if state and (state.get("status") == "running" or (state.get("finished_at") or 0) >= since):
+            run_id = state.get("run_id")
+            for name, entry in (state.get("stages") or {}).items():
+                if seen_stages.get(name) != (run_id, entry.get("status")):
+                    seen_stages[name] = (run_id, entry.get("status"))
+                    yield _sse("stage", {"run_id": run_id, "stage": name, **entry})
+            current = state.get("stage")
+            if current in (state.get("stages") or {}):
+                yield _sse("progress", {"run_id": run_id, "stage": current, **state["stages"][current]})
+            if state.get("status") != "running":
+                yield _sse("end", {
+                    "run_id": run_id,
+                    "status": state.get("status"),
+                    "error": state.get("error"),
+                    "sec": round((state.get("finished_at") or 0) - (state.get("started_at") or 0), 2),
+                })
+                return
+            last_sent = time.monotonic()
+        else:
+            end = finished() if finished is not None else None
+            # The run's last progress write precedes the job's status; stream it first
+            if end is not None and file_mtime() == last_mtime:
+                yield _sse("end", end)
+                return
+            if time.monotonic() - last_sent >= 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+        time.sleep(0.25)
+
+
+def _progress_response(video_id, since, finished=None):
+    return Response(
+        stream_with_context(_progress_events(get_video_results_paths(video_id)['progress'], since, finished)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route('/api/progress', methods=['GET'])
+def api_progress_stream():
+    """Server-Sent Events: stage transitions and per-frame progress of a video's run.
+
+    Query: video_id or url (the /api/process URL); since (epoch seconds, default now):
+    runs that ended before it are not reported.
+    """
+    url = (request.args.get("url") or "").strip()
+    video_id = request.args.get("video_id") or (url and (extract_video_id_from_url(url) or sanitize_id(url)))
+    if not video_id or not validate_video_id(video_id):
+        return jsonify({"error": "video_id or a valid url is required"}), 400
+    try:
+        since = float(request.args.get("since", time.time()))
+    except ValueError:
+        return jsonify({"error": "since must be a number"}), 400
+    return _progress_response(video_id, since)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def api_jobs_events(job_id: str):
+    """Server-Sent Events for a job's run (see /api/progress); ends when the job does."""
+    store = get_job_pool().store
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def finished():
+        current = store.get(job_id) or {}
+        if current.get("status") not in JOB_FINISHED:
+            return None
+        return {"job_id": job_id, "status": current["status"], "error": current.get("error")}
+
+    return _progress_response(job["video_id"], job.get("created_at", time.time()), finished)
+
+
 if __name__ == '__main__':
+    # Pick up spooled indexing jobs and unfinished jobs at once rather than on the first
+    # request (with the debug reloader, only in the child process that serves requests)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_job_pool()
     # Use 0.0.0.0 so preview is accessible; port 8000 for clarity
     app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
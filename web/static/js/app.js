@@ -9,6 +9,7 @@ const objectModelSelect = document.getElementById('object-model');
 const faceModelSelect = document.getElementById('face-model');
 const processBtn = document.getElementById('process-btn');
 const statusEl = document.getElementById('status');
+const progressBarEl = document.getElementById('progress-bar');
 const errorEl = document.getElementById('error');
 const resultsEl = document.getElementById('results');
 const resultsPlaceholder = document.getElementById('results-placeholder');
@@ -39,6 +40,9 @@ const modalFrameListEl = document.getElementById('modal-frame-list');
 const frameCounterEl = document.getElementById('frame-counter');
 const thumbStripEl = document.getElementById('thumb-strip');
 const systemInfoListEl = document.getElementById('system-info-list');
+const playerCardEl = document.getElementById('player-card');
+const overlayVideoEl = document.getElementById('overlay-video');
+const overlayCanvasEl = document.getElementById('overlay-canvas');
 
 let lastActiveElement = null;
 let focusableModalEls = [];
@@ -50,6 +54,8 @@ let currentIndex = 0;
 let processedFramesBase = '';
 let zoomLevel = 1;
 const frameIntervalSec = 1;
+let overlayTrack = null;
+let overlayTimes = [];
 
 function prettifyLabel(s) {
   const str = String(s || '').trim();
@@ -114,6 +120,48 @@ function youtubeThumbUrl(videoId) {
   return 'https://img.youtube.com/vi/' + encodeURIComponent(videoId) + '/hqdefault.jpg';
 }
 
+const STAGE_LABELS = {
+  download: 'Downloading video',
+  extract: 'Extracting frames',
+  objects: 'Detecting objects',
+  faces: 'Detecting faces',
+  monuments: 'Recognizing monuments',
+  scene_features: 'Computing scene features',
+  render: 'Rendering',
+  results: 'Saving results',
+};
+
+/**
+ * Show live stage / frame progress from the /api/progress Server-Sent Events stream
+ * while a request runs. Returns the EventSource (close it when the request ends) or null.
+ */
+function openProgressStream(url) {
+  if (!window.EventSource) return null;
+  const source = new EventSource('/api/progress?url=' + encodeURIComponent(url));
+  const show = (e) => {
+    const d = JSON.parse(e.data);
+    if (d.status !== 'running') return;
+    let text = (STAGE_LABELS[d.stage] || d.stage) + '…';
+    if (d.total) text += ` ${d.done}/${d.total} frames`;
+    if (d.fps) text += ` · ${d.fps.toFixed(1)} fps`;
+    if (d.eta_sec != null && d.done) text += ` · ETA ${formatDuration(d.eta_sec)}`;
+    statusEl.textContent = text;
+    if (progressBarEl) {
+      progressBarEl.hidden = !d.total;
+      progressBarEl.value = d.total ? Math.min(1, d.done / d.total) : 0;
+    }
+  };
+  source.addEventListener('stage', show);
+  source.addEventListener('progress', show);
+  source.addEventListener('end', () => source.close());
+  return source;
+}
+
+function closeProgressStream(source) {
+  if (source) source.close();
+  if (progressBarEl) progressBarEl.hidden = true;
+}
+
 /**
  * Parse scan start/end input to total seconds.
  * - "6.30" → 6 min 30 sec = 390; "6.3" → same (3 = 30 sec)
@@ -147,11 +195,13 @@ form.addEventListener('submit', async (e) => {
   }
   thumbEl.src = '';
   thumbEl.alt = 'Video thumbnail';
+  resetOverlayPlayer();
 
   const scanStart = scanStartInput ? parseTimeToSeconds(scanStartInput.value, 0) : 0;
   const scanEnd = scanEndInput ? parseTimeToSeconds(scanEndInput.value, scanStart + 180) : (scanStart + 180);
 
   const scanModeEl = document.querySelector('input[name="scan-mode"]:checked');
+  const renderModeEl = document.querySelector('input[name="render-mode"]:checked');
   const payload = {
     url: urlInput.value.trim(),
     conf_threshold: parseFloat(thresholdInput.value),
@@ -162,8 +212,10 @@ form.addEventListener('submit', async (e) => {
     object_model: objectModelSelect ? objectModelSelect.value : 'yolov8n',
     face_model: faceModelSelect ? faceModelSelect.value : 'buffalo_l',
     scan_mode: scanModeEl ? scanModeEl.value : 'both',
+    render_mode: renderModeEl ? renderModeEl.value : 'stills',
   };
 
+  const progressStream = openProgressStream(payload.url);
   try {
     const res = await fetch('/api/process', {
       method: 'POST',
@@ -176,6 +228,7 @@ form.addEventListener('submit', async (e) => {
       }
       throw networkErr;
     });
+    closeProgressStream(progressStream);
 
     if (!res.ok) {
       const body = await res.json().catch(() => ({ error: 'Unknown error' }));
@@ -242,6 +295,7 @@ form.addEventListener('submit', async (e) => {
     errorEl.hidden = false;
     statusEl.textContent = '';
   } finally {
+    closeProgressStream(progressStream);
     processBtn.disabled = false;
   }
 });
@@ -249,6 +303,7 @@ form.addEventListener('submit', async (e) => {
 async function renderResultsFromVideoId(videoId) {
   processedFramesBase = `/results/${videoId}/processed_frames/`;
   objectsIndex = {};
+  loadOverlayPlayer(videoId);
   const out = {
     output_video_url: `/results/${videoId}/detections_video.mp4`,
     detection_json_url: `/results/${videoId}/detection_results.json`,
@@ -560,6 +615,135 @@ document.addEventListener('keydown', (e) => {
   }
 });
 
+// --- Overlay player (render_mode "overlay") ---
+// Plays the original video and draws the compact overlay track (overlay.json) on a canvas
+// over it, so the server does not annotate or re-encode anything.
+
+function resetOverlayPlayer() {
+  overlayTrack = null;
+  overlayTimes = [];
+  if (playerCardEl) playerCardEl.hidden = true;
+  if (overlayVideoEl) {
+    overlayVideoEl.removeAttribute('src');
+    overlayVideoEl.load();
+  }
+  if (overlayCanvasEl) {
+    const ctx = overlayCanvasEl.getContext('2d');
+    ctx.clearRect(0, 0, overlayCanvasEl.width, overlayCanvasEl.height);
+  }
+}
+
+async function loadOverlayPlayer(videoId) {
+  resetOverlayPlayer();
+  if (!playerCardEl || !overlayVideoEl || !overlayCanvasEl) return;
+  try {
+    const res = await fetch(`/results/${videoId}/overlay.json`);
+    if (!res.ok) return;
+    overlayTrack = await res.json();
+  } catch (err) {
+    overlayTrack = null;
+    return;
+  }
+  overlayTimes = (overlayTrack.samples || []).map((s) => s.t);
+  overlayVideoEl.src = `/api/source-video/${encodeURIComponent(videoId)}`;
+  playerCardEl.hidden = false;
+  // No server-rendered video in this mode
+  if (videoLinkEl) videoLinkEl.href = overlayVideoEl.src;
+}
+
+/** Index of the last sample at or before t, or -1. */
+function overlaySampleIndex(t) {
+  let lo = 0;
+  let hi = overlayTimes.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    if (overlayTimes[mid] <= t) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found;
+}
+
+function drawOverlayBox(ctx, box, color, text, scale) {
+  const [x1, y1, x2, y2] = box.map((v) => v * scale);
+  ctx.strokeStyle = color;
+  ctx.lineWidth = 2;
+  ctx.strokeRect(x1, y1, x2 - x1, y2 - y1);
+  const tw = ctx.measureText(text).width;
+  const ty = y1 - 18 >= 0 ? y1 - 18 : y1;
+  ctx.fillStyle = color;
+  ctx.fillRect(x1, ty, tw + 6, 18);
+  ctx.fillStyle = '#fff';
+  ctx.fillText(text, x1 + 3, ty + 13);
+}
+
+function drawOverlay() {
+  if (!overlayTrack || !overlayCanvasEl || !overlayVideoEl) return;
+  const video = overlayVideoEl;
+  const canvas = overlayCanvasEl;
+  const w = video.clientWidth;
+  const h = video.clientHeight;
+  const dpr = window.devicePixelRatio || 1;
+  canvas.style.left = video.offsetLeft + 'px';
+  canvas.style.top = video.offsetTop + 'px';
+  canvas.style.width = w + 'px';
+  canvas.style.height = h + 'px';
+  if (canvas.width !== Math.round(w * dpr) || canvas.height !== Math.round(h * dpr)) {
+    canvas.width = Math.round(w * dpr);
+    canvas.height = Math.round(h * dpr);
+  }
+  const ctx = canvas.getContext('2d');
+  ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+  ctx.clearRect(0, 0, w, h);
+  if (!video.videoWidth) return;
+
+  const k = overlaySampleIndex(video.currentTime);
+  const interval = overlayTrack.interval || 1;
+  if (k < 0 || video.currentTime - overlayTimes[k] > interval) return;
+  const sample = overlayTrack.samples[k];
+  const scale = w / video.videoWidth;
+  const classes = overlayTrack.classes || [];
+  const faceLabels = overlayTrack.faces || [];
+  ctx.font = '12px Inter, sans-serif';
+  for (const o of sample.o || []) {
+    const cls = classes[o[4]] || { name: 'object', color: '#ff3838' };
+    drawOverlayBox(ctx, o.slice(0, 4), cls.color, `${cls.name} ${o[5].toFixed(2)}`, scale);
+  }
+  for (const f of sample.f || []) {
+    const label = faceLabels[f[4]] || 'Unknown';
+    const text = label !== 'Unknown' ? `${label} ${f[5].toFixed(2)}` : `face ${f[5].toFixed(2)}`;
+    drawOverlayBox(ctx, f.slice(0, 4), '#00ffff', text, scale);
+  }
+  if (sample.m) {
+    const name = (overlayTrack.monuments || [])[sample.m[0]] || '';
+    ctx.strokeStyle = '#00ff00';
+    ctx.lineWidth = 3;
+    const margin = Math.max(6, Math.round(0.02 * Math.min(w, h)));
+    ctx.strokeRect(margin, margin, w - 2 * margin, h - 2 * margin);
+    ctx.fillStyle = '#00ff00';
+    ctx.font = '16px Inter, sans-serif';
+    ctx.fillText(`Monument: ${name} (${sample.m[1].toFixed(2)})`, 10, 30);
+  }
+}
+
+function overlayLoop() {
+  drawOverlay();
+  if (overlayVideoEl && !overlayVideoEl.paused && !overlayVideoEl.ended) {
+    window.requestAnimationFrame(overlayLoop);
+  }
+}
+
+if (overlayVideoEl) {
+  overlayVideoEl.addEventListener('play', () => window.requestAnimationFrame(overlayLoop));
+  overlayVideoEl.addEventListener('seeked', drawOverlay);
+  overlayVideoEl.addEventListener('loadeddata', drawOverlay);
+  window.addEventListener('resize', drawOverlay);
+}
+
 // Load system info (Python, CPU, GPU) on page load
 async function loadSystemInfo() {
   if (!systemInfoListEl) return;